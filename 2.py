@@ -2,6 +2,14 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import re
 
+from archive import archive_from_env
+from catalog import TaskCounts, load_catalog, update_task_options
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed, serve_from_env
+from dedup import PendingTaskSet
+from listview import sync_listbox
+from metrics import DebugPanel, instrument, metrics
+from records import TaskRecord
+
 class MaintenanceApp:
     def __init__(self, root):
         self.root = root
@@ -13,20 +21,9 @@ class MaintenanceApp:
         # Set the background color for the main window
         self.root.configure(bg="#f7f7f7")
 
-        # Predefined Task List
-        self.task_options = [
-            "Select an Operation",  # Default option
-            "Oil Change",
-            "Tire Rotation",
-            "Brake Inspection",
-            "Battery Check",
-            "Filter Replacement",
-            "Coolant Flush",
-            "Alignment Check",
-            "Spark Plug Replacement",
-            "Timing Belt Inspection",
-            "Transmission Fluid Change"
-        ]
+        # Task types come from the shared catalog; the dropdown shows pending counts
+        self.catalog = load_catalog()
+        self.task_options = self.catalog.options()
 
         # Title with more attractive font and color
         title_label = tk.Label(root, text="Car Maintenance Tracker", font=("Helvetica", 26, "bold"), bg="#4CAF50", fg="white")
@@ -69,12 +66,25 @@ class MaintenanceApp:
         tk.Button(action_frame, text="Remove from Front", command=self.remove_task_from_front, bg="#f44336", fg="white", font=("Helvetica", 14), relief="flat", width=16, height=2).grid(row=0, column=0, padx=5, pady=5)
         tk.Button(action_frame, text="Remove from Rear", command=self.remove_task_from_rear, bg="#FF9800", fg="white", font=("Helvetica", 14), relief="flat", width=16, height=2).grid(row=0, column=1, padx=5, pady=5)
 
-        # Initialize tasks list (deque)
+        # Initialize tasks list (deque of TaskRecords) and the set of pending tasks for duplicate rejection
         self.tasks = []
+        self.pending = PendingTaskSet()
+        self.counts = TaskCounts()  # Pending tasks per type
+        # Change feed for external consumers (served on MAINTENANCE_FEED_PORT when set)
+        self.feed = ChangeFeed()
+        self.feed_server = serve_from_env(self.feed)
+        # Completed tasks go to the service history under MAINTENANCE_ARCHIVE_DIR when set
+        self.archive = archive_from_env(self.feed)
+        self.shown_records = []  # Records currently displayed in the listbox
+        self.shown_counts_version = None
+        metrics.gauge("tasks.size", lambda: len(self.tasks))
 
         # Bind the close window event to show confirmation message
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # F12 opens the live metrics panel (timings need MAINTENANCE_METRICS=1)
+        self.root.bind("<F12>", lambda event: DebugPanel(self.root))
+
     def validate_plate_id(self, plate_id):
         """Validate the plate ID format for car."""
         # Regex for Car Plate ID: 'RAA123A' to 'RAG999Z' (Car format)
@@ -120,14 +130,14 @@ class MaintenanceApp:
 
     def add_task_to_front(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
 
         if not self.validate_plate_id(plate_id):
             self.show_custom_popup("Plate ID Error", "Invalid Plate ID. It must follow the format:\n"
                                                     "Car: RA[A-G]123A to RA[G]999Z", is_error=True)
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_custom_popup("Selection Error", "Please select a valid operation.", is_error=True)
         else:
             # Show confirmation dialog for adding to front
@@ -138,23 +148,29 @@ class MaintenanceApp:
                 lambda: None
             )
 
+    @instrument()
     def confirm_add_to_front(self, plate_id, task):
+        if not self.pending.add(task, plate_id):
+            self.show_custom_popup("Duplicate Task", f"Task '{task}' for Plate ID {plate_id} is already pending.", is_error=True)
+            return
         # Add to the front of the task list
-        self.tasks.insert(0, f"{task} - {plate_id}")
+        self.tasks.insert(0, TaskRecord(task, plate_id))
+        self.counts.add(task)
+        self.feed.publish(ADDED, task, plate_id)
         self.update_task_listbox()
         self.plate_id_entry.delete(0, tk.END)  # Clear Plate ID after use
         messagebox.showinfo("Task Added", f"Task '{task}' for Plate ID {plate_id} added to the front.")
 
     def add_task_to_rear(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
 
         if not self.validate_plate_id(plate_id):
             self.show_custom_popup("Plate ID Error", "Invalid Plate ID. It must follow the format:\n"
                                                     "Car: RA[A-G]123A to RA[G]999Z", is_error=True)
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_custom_popup("Selection Error", "Please select a valid operation.", is_error=True)
         else:
             # Show confirmation dialog for adding to rear
@@ -165,9 +181,15 @@ class MaintenanceApp:
                 lambda: None
             )
 
+    @instrument()
     def confirm_add_to_rear(self, plate_id, task):
+        if not self.pending.add(task, plate_id):
+            self.show_custom_popup("Duplicate Task", f"Task '{task}' for Plate ID {plate_id} is already pending.", is_error=True)
+            return
         # Add to the rear of the task list
-        self.tasks.append(f"{task} - {plate_id}")
+        self.tasks.append(TaskRecord(task, plate_id))
+        self.counts.add(task)
+        self.feed.publish(ADDED, task, plate_id)
         self.update_task_listbox()
         self.plate_id_entry.delete(0, tk.END)  # Clear Plate ID after use
         messagebox.showinfo("Task Added", f"Task '{task}' for Plate ID {plate_id} added to the rear.")
@@ -184,9 +206,14 @@ class MaintenanceApp:
         else:
             messagebox.showwarning("No Tasks", "No tasks to remove from the front.")
 
+    @instrument()
     def confirm_remove_from_front(self):
         # Remove the task from the front
-        self.tasks.pop(0)
+        record = self.tasks.pop(0)
+        self.pending.discard(record.task, record.plate_id)
+        self.counts.discard(record.task)
+        self.feed.publish(REMOVED, record.task, record.plate_id)
+        self.feed.publish(COMPLETED, record.task, record.plate_id)
         self.update_task_listbox()
         messagebox.showinfo("Task Removed", "The task was successfully removed from the front.")
 
@@ -202,17 +229,23 @@ class MaintenanceApp:
         else:
             messagebox.showwarning("No Tasks", "No tasks to remove from the rear.")
 
+    @instrument()
     def confirm_remove_from_rear(self):
         # Remove the task from the rear
-        self.tasks.pop()
+        record = self.tasks.pop()
+        self.pending.discard(record.task, record.plate_id)
+        self.counts.discard(record.task)
+        self.feed.publish(REMOVED, record.task, record.plate_id)
+        self.feed.publish(COMPLETED, record.task, record.plate_id)
         self.update_task_listbox()
         messagebox.showinfo("Task Removed", "The task was successfully removed from the rear.")
 
+    @instrument()
     def update_task_listbox(self):
         # Update the listbox with the current tasks
-        self.tasks_listbox.delete(0, tk.END)
-        for task in self.tasks:
-            self.tasks_listbox.insert(tk.END, task)
+        sync_listbox(self.tasks_listbox, self.shown_records, self.tasks)
+        self.shown_counts_version = update_task_options(self.catalog, self.task_dropdown, self.task_var,
+                                                        self.counts, self.shown_counts_version)
 
     def on_closing(self):
         """Prompt the user with a confirmation message before quitting."""
@@ -2,47 +2,123 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import re
 
+from archive import archive_from_env
+from capacity import bounded_from_env
+from catalog import TaskCounts, load_catalog, update_task_options
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed, feed_change, serve_from_env
+from dedup import PendingTaskSet
+from forecast import enqueue_due_from_env
+from listview import sync_listbox
+from metrics import DebugPanel, instrument, metrics
+from nodepool import recycle
+from records import TaskRecord
+from replication import replicate_from_env
+
 
 class Node:
     """Node class for the Singly Linked List"""
+    __slots__ = ("record", "next")
+
     def __init__(self, task, plate_id):
-        self.task = task
-        self.plate_id = plate_id
+        self.record = TaskRecord(task, plate_id)
         self.next = None
 
+    @property
+    def task(self):
+        return self.record.task
+
+    @property
+    def plate_id(self):
+        return self.record.plate_id
+
+    @property
+    def enqueued_at(self):
+        return self.record.enqueued_at
+
 
 class SinglyLinkedList:
     """Singly Linked List to manage tasks"""
-    def __init__(self):
+    def __init__(self, dedup=None, feed=None, pool=None):
         self.head = None
         self.tail = None
-
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.pool = pool  # Optional NodePool recycling removed nodes
+        self.counts = TaskCounts()  # Pending tasks per type
+        self.size = 0
+
+    @instrument()
+    @feed_change
     def add_task(self, task, plate_id):
-        new_node = Node(task, plate_id)
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False  # The same task is already pending for this plate
+        new_node = Node(task, plate_id) if self.pool is None else self.pool.acquire(TaskRecord(task, plate_id))
         if not self.head:  # If the list is empty, new task becomes both head and tail
             self.head = self.tail = new_node
         else:
             self.tail.next = new_node  # Add the new node at the end of the list
             self.tail = new_node  # Move the tail pointer to the new node
-
+        self.size += 1
+        self.counts.add(task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, task, plate_id)
+        return True
+
+    @instrument()
+    @feed_change
     def remove_task(self):
-        """Remove task from the front"""
+        """Remove the task at the front and return its TaskRecord"""
         if not self.head:  # List is empty
             return None
         removed_node = self.head
         self.head = self.head.next
         if not self.head:  # If the list becomes empty, set tail to None
             self.tail = None
-        return removed_node
-
+        self.size -= 1
+        self.counts.discard(removed_node.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, removed_node.task, removed_node.plate_id)
+        if self.dedup is not None:
+            self.dedup.discard(removed_node.task, removed_node.plate_id)
+        return recycle(removed_node, self.pool)
+
+    @instrument()
+    @feed_change
+    def remove_record(self, record):
+        """Remove exactly the given TaskRecord, wherever it is in the list"""
+        prev, node = None, self.head
+        while node and node.record.id != record.id:
+            prev, node = node, node.next
+        if node is None:
+            return False  # No matching task in the list
+        if prev is None:
+            self.remove_task()
+            return True
+        prev.next = node.next
+        if node is self.tail:
+            self.tail = prev
+        self.size -= 1
+        self.counts.discard(node.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, node.task, node.plate_id)
+        if self.dedup is not None:
+            self.dedup.discard(node.task, node.plate_id)
+        recycle(node, self.pool)
+        return True
+
+    @instrument()
     def get_all_tasks(self):
         """Get all tasks as a list of strings"""
-        tasks = []
+        return [record.label() for record in self.get_all_records()]
+
+    def get_all_records(self):
+        """Get all tasks as TaskRecords, front to back"""
+        records = []
         current = self.head
         while current:
-            tasks.append(f"{current.task} - {current.plate_id}")
+            records.append(current.record)
             current = current.next
-        return tasks
+        return records
 
 
 class MaintenanceApp:
@@ -56,20 +132,9 @@ class MaintenanceApp:
         # Set the background color for the main window
         self.root.configure(bg="#f7f7f7")
 
-        # Predefined Task List
-        self.task_options = [
-            "Select an Operation",  # Default option
-            "Oil Change",
-            "Tire Rotation",
-            "Brake Inspection",
-            "Battery Check",
-            "Filter Replacement",
-            "Coolant Flush",
-            "Alignment Check",
-            "Spark Plug Replacement",
-            "Timing Belt Inspection",
-            "Transmission Fluid Change"
-        ]
+        # Task types come from the shared catalog; the dropdown shows pending counts
+        self.catalog = load_catalog()
+        self.task_options = self.catalog.options()
 
         # Title with more attractive font and color
         title_label = tk.Label(root, text="Car Maintenance Tracker", font=("Helvetica", 26, "bold"), bg="#4CAF50", fg="white")
@@ -113,12 +178,31 @@ class MaintenanceApp:
         # Remove Task Button
         tk.Button(root, text="Remove Task", command=self.remove_task, bg="#FF5722", fg="white", font=("Helvetica", 14), relief="flat", width=20, height=2).pack(pady=10)
 
-        # Initialize tasks list (Singly Linked List)
-        self.tasks = SinglyLinkedList()
+        # Initialize tasks list (Singly Linked List) with duplicate rejection
+        # Change feed for external consumers (served on MAINTENANCE_FEED_PORT when set)
+        self.feed = ChangeFeed()
+        self.feed_server = serve_from_env(self.feed)
+        # Completed tasks go to the service history under MAINTENANCE_ARCHIVE_DIR when set
+        self.archive = archive_from_env(self.feed)
+        self.tasks = SinglyLinkedList(dedup=PendingTaskSet(), feed=self.feed)
+        # Capacity and overflow policy from MAINTENANCE_CAPACITY / MAINTENANCE_OVERFLOW (unbounded by default)
+        self.queue = bounded_from_env(self.tasks)
+        # Hot standby copy of the queue at MAINTENANCE_STANDBY (host:port) when set
+        self.replica = replicate_from_env(self.tasks)
+        self.shown_records = []  # Records currently displayed below the header rows
+        self.shown_counts_version = None
+        metrics.gauge("SinglyLinkedList.size", lambda: self.tasks.size)
+        # Tasks the service history says fall due within MAINTENANCE_FORECAST_DAYS are queued on start
+        self.forecast = enqueue_due_from_env(self.queue, self.archive)
+        if self.forecast is not None:
+            self.update_task_listbox()
 
         # Bind the window close event to the custom close method
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # F12 opens the live metrics panel (timings need MAINTENANCE_METRICS=1)
+        self.root.bind("<F12>", lambda event: DebugPanel(self.root))
+
     def validate_plate_id(self, plate_id):
         """Validate the plate ID format for car."""
         # Regex for Car Plate ID: 'RAA123A' to 'RAG999Z' (Car format)
@@ -131,7 +215,7 @@ class MaintenanceApp:
 
     def add_task(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
 
         # Error handling for Plate ID validation
         if not plate_id:
@@ -143,30 +227,37 @@ class MaintenanceApp:
                                               "Car: RA[A-G]123A to RA[G]999Z")
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_error("Selection Error", "Please select a valid operation from the dropdown.")
             return
         
         # Add task to the linked list
-        self.tasks.add_task(task, plate_id)
+        added = self.queue.offer(task, plate_id)
+        if added is None:
+            self.show_error("Duplicate Task", f"Task '{task}' for Plate ID {plate_id} is already pending.")
+            return
+        if not added:
+            self.show_error("Queue Full", "The task queue is full. Cannot add more tasks.")
+            return
         self.update_task_listbox()
         self.plate_id_entry.delete(0, tk.END)  # Clear Plate ID after use
         self.show_success(f"Task '{task}' for Plate ID {plate_id} added successfully.")
 
     def remove_task(self):
-        removed_node = self.tasks.remove_task()
-        if removed_node:
+        record = self.queue.get()
+        if record:
+            self.feed.publish(COMPLETED, record.task, record.plate_id)
             self.update_task_listbox()
-            self.show_success(f"Task '{removed_node.task}' for Plate ID {removed_node.plate_id} removed.")
+            self.show_success(f"Task '{record.task}' for Plate ID {record.plate_id} removed.")
         else:
             self.show_error("No Tasks", "No tasks to remove.")
 
+    @instrument()
     def update_task_listbox(self):
         """Update the listbox with the current tasks from the linked list"""
-        self.tasks_listbox.delete(2, tk.END)  # Remove the old tasks
-        tasks = self.tasks.get_all_tasks()
-        for task in tasks:
-            self.tasks_listbox.insert(tk.END, task)
+        sync_listbox(self.tasks_listbox, self.shown_records, self.tasks.get_all_records(), first_row=2)
+        self.shown_counts_version = update_task_options(self.catalog, self.task_dropdown, self.task_var,
+                                                        self.tasks.counts, self.shown_counts_version)
 
     def show_error(self, title, message):
         """Display custom error pop-up with attractive styling"""
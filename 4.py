@@ -1,93 +1,296 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import re
+import sys
+
+from archive import archive_from_env
+from capacity import bounded_from_env
+from catalog import TaskCounts, load_catalog, update_task_options
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed, serve_from_env
+from dedup import PendingTaskSet
+from listview import sync_listbox
+from metrics import DebugPanel, instrument, metrics
+from records import TaskRecord
 
 
 class Node:
     """Node class for the Binary Tree"""
     def __init__(self, task, plate_id):
-        self.task = task
-        self.plate_id = plate_id
+        self.record = TaskRecord(task, plate_id)
+        self.key = (task, plate_id, self.record.id)  # Unique, so equal task names still split the tree
         self.left = None
         self.right = None
+        self.count = 1  # Number of nodes in the subtree rooted here
+        self.height = 1
+
+    @property
+    def task(self):
+        return self.record.task
+
+    @property
+    def plate_id(self):
+        return self.record.plate_id
+
+    @property
+    def enqueued_at(self):
+        return self.record.enqueued_at
+
+
+def _count(node):
+    return node.count if node else 0
+
+
+def _height(node):
+    return node.height if node else 0
+
+
+def _update(node):
+    node.count = 1 + _count(node.left) + _count(node.right)
+    node.height = 1 + max(_height(node.left), _height(node.right))
+
+
+def _rotate_left(node):
+    top = node.right
+    node.right, top.left = top.left, node
+    _update(node)
+    _update(top)
+    return top
+
+
+def _rotate_right(node):
+    top = node.left
+    node.left, top.right = top.right, node
+    _update(node)
+    _update(top)
+    return top
+
+
+def _balance(node):
+    """Restore the AVL height invariant at node; return the subtree's new root"""
+    _update(node)
+    lean = _height(node.left) - _height(node.right)
+    if lean > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if lean < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
 
 
 class BinaryTree:
-    """Binary Tree to manage tasks with a fixed number of orders"""
-    def __init__(self, max_size):
+    """Binary Tree to manage tasks with a fixed number of orders
+
+    Nodes are ordered on (task, plate_id, record id) and kept height
+    balanced (AVL), so with only ten task names the tree still stays
+    O(log n) deep. Insert and remove walk a path instead of recursing.
+    """
+    def __init__(self, max_size, dedup=None, feed=None):
         self.root = None
         self.max_size = max_size
         self.size = 0
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.counts = TaskCounts()  # Pending tasks per type
 
+    @instrument()
     def insert(self, task, plate_id):
-        """Insert a task in the binary tree"""
+        """Insert a task in the binary tree; return True, False when the tree is full or None for a duplicate"""
         if self.size >= self.max_size:
             return False  # Tree is full, cannot add more tasks
-        if self.root is None:
-            self.root = Node(task, plate_id)
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return None  # The same task is already pending for this plate
+        new_node = Node(task, plate_id)
+        path = []  # (node, went left) from the root down
+        node = self.root
+        while node:
+            left = new_node.key < node.key
+            path.append((node, left))
+            node = node.left if left else node.right
+        if path:
+            parent, left = path[-1]
+            if left:
+                parent.left = new_node
+            else:
+                parent.right = new_node
         else:
-            self._insert(self.root, task, plate_id)
+            self.root = new_node
+        self._rebalance(path)
         self.size += 1
+        self.counts.add(task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, task, plate_id)
         return True
 
-    def _insert(self, node, task, plate_id):
-        """Recursive insertion helper"""
-        if task < node.task:
-            if node.left is None:
-                node.left = Node(task, plate_id)
+    def _rebalance(self, path):
+        """Rebalance the nodes on a root-first path from the bottom up, relinking each to its parent"""
+        for i in range(len(path) - 1, -1, -1):
+            subtree = _balance(path[i][0])
+            if i == 0:
+                self.root = subtree
+            elif path[i - 1][1]:
+                path[i - 1][0].left = subtree
             else:
-                self._insert(node.left, task, plate_id)
-        else:
-            if node.right is None:
-                node.right = Node(task, plate_id)
+                path[i - 1][0].right = subtree
+
+    def _lower_bound(self, prefix):
+        """The first node whose key is at or after a key prefix such as (task,) or (task, plate_id)"""
+        node, found = self.root, None
+        while node:
+            if node.key >= prefix:
+                found, node = node, node.left
             else:
-                self._insert(node.right, task, plate_id)
-
-    def remove(self, task):
-        """Remove a task from the binary tree"""
-        self.root = self._remove(self.root, task)
-        self.size -= 1
-
-    def _remove(self, node, task):
-        """Recursive removal helper"""
+                node = node.right
+        return found
+
+    def find(self, task, plate_id):
+        """The first pending TaskRecord for a task and plate, or None"""
+        node = self._lower_bound((task, plate_id))
+        return node.record if node is not None and node.key[:2] == (task, plate_id) else None
+
+    @instrument()
+    def remove(self, task, plate_id=None):
+        """Remove a task from the binary tree, matching the plate ID when given"""
+        node = self._lower_bound((task,) if plate_id is None else (task, plate_id))
+        if node is None or node.task != task or (plate_id is not None and node.plate_id != plate_id):
+            return False  # No matching task in the tree
+        return self._delete(node.key)
+
+    @instrument()
+    def remove_record(self, record):
+        """Remove exactly the given TaskRecord"""
+        return self._delete((record.task, record.plate_id, record.id))
+
+    def _delete(self, key):
+        path = []
+        node = self.root
+        while node and node.key != key:
+            left = key < node.key
+            path.append((node, left))
+            node = node.left if left else node.right
         if node is None:
-            return node
-
-        if task < node.task:
-            node.left = self._remove(node.left, task)
-        elif task > node.task:
-            node.right = self._remove(node.right, task)
+            return False  # No matching task in the tree
+        removed = node.record
+        if node.left and node.right:
+            # Move the successor's record here and unlink the successor instead
+            path.append((node, False))
+            successor = node.right
+            while successor.left:
+                path.append((successor, True))
+                successor = successor.left
+            node.record, node.key = successor.record, successor.key
+            node = successor
+        child = node.left or node.right
+        if not path:
+            self.root = child
+        elif path[-1][1]:
+            path[-1][0].left = child
         else:
-            # Node to be deleted found
-            if node.left is None:
-                return node.right
-            elif node.right is None:
-                return node.left
-            temp = self._min_value_node(node.right)
-            node.task = temp.task
-            node.plate_id = temp.plate_id
-            node.right = self._remove(node.right, temp.task)
-        return node
-
-    def _min_value_node(self, node):
-        """Get the node with the minimum task"""
-        current = node
-        while current.left:
-            current = current.left
-        return current
+            path[-1][0].right = child
+        self._rebalance(path)
+        self.size -= 1
+        self.counts.discard(removed.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, removed.task, removed.plate_id)
+        if self.dedup is not None:
+            self.dedup.discard(removed.task, removed.plate_id)
+        return True
+
+    def depth(self):
+        """Get the height of the tree (0 when empty)"""
+        return _height(self.root)
 
+    def rank(self, task):
+        """Count the tasks ordered strictly before the given task name"""
+        node, rank = self.root, 0
+        while node:
+            if task <= node.task:
+                node = node.left
+            else:
+                rank += 1 + _count(node.left)
+                node = node.right
+        return rank
+
+    def _rank_after(self, task):
+        """Count the tasks ordered at or before the given task name"""
+        node, rank = self.root, 0
+        while node:
+            if task < node.task:
+                node = node.left
+            else:
+                rank += 1 + _count(node.left)
+                node = node.right
+        return rank
+
+    def select(self, k):
+        """Get the node at sorted position k (0-based), or None if out of range"""
+        node = self.root
+        while node:
+            left = _count(node.left)
+            if k < left:
+                node = node.left
+            elif k == left:
+                return node
+            else:
+                k -= left + 1
+                node = node.right
+        return None
+
+    def count_range(self, lo, hi):
+        """Count the tasks whose names fall in [lo, hi]"""
+        if hi < lo:
+            return 0
+        return self._rank_after(hi) - self.rank(lo)
+
+    def range(self, lo, hi):
+        """Yield the TaskRecords with task names in [lo, hi] in sorted order"""
+        stack, node = [], self.root
+        while stack or node:
+            if node:
+                if node.task < lo:
+                    node = node.right  # The whole left subtree is below lo
+                else:
+                    stack.append(node)
+                    node = node.left
+                continue
+            node = stack.pop()
+            if node.task > hi:
+                return
+            yield node.record
+            node = node.right
+
+    def iter_from(self, k):
+        """Yield TaskRecords in sorted order starting at position k"""
+        stack, node = [], self.root
+        while node:
+            left = _count(node.left)
+            if k < left:
+                stack.append(node)
+                node = node.left
+            elif k == left:
+                stack.append(node)
+                break
+            else:
+                k -= left + 1
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node.record
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+
+    @instrument()
     def get_all_tasks(self):
         """Get all tasks from the binary tree in sorted order"""
-        tasks = []
-        self._inorder(self.root, tasks)
-        return tasks
+        return [record.label() for record in self.get_all_records()]
 
-    def _inorder(self, node, tasks):
-        """Inorder traversal helper to get tasks in sorted order"""
-        if node:
-            self._inorder(node.left, tasks)
-            tasks.append(f"{node.task} - {node.plate_id}")
-            self._inorder(node.right, tasks)
+    def get_all_records(self):
+        """Get all TaskRecords from the binary tree in sorted order"""
+        return list(self.iter_from(0))
 
 
 class MaintenanceApp:
@@ -101,20 +304,9 @@ class MaintenanceApp:
         # Set the background color for the main window
         self.root.configure(bg="#f7f7f7")
 
-        # Predefined Task List
-        self.task_options = [
-            "Select an Operation",  # Default option
-            "Oil Change",
-            "Tire Rotation",
-            "Brake Inspection",
-            "Battery Check",
-            "Filter Replacement",
-            "Coolant Flush",
-            "Alignment Check",
-            "Spark Plug Replacement",
-            "Timing Belt Inspection",
-            "Transmission Fluid Change"
-        ]
+        # Task types come from the shared catalog; the dropdown shows pending counts
+        self.catalog = load_catalog()
+        self.task_options = self.catalog.options()
 
         # Title with more attractive font and color
         title_label = tk.Label(root, text="Car Maintenance Tracker", font=("Helvetica", 26, "bold"), bg="#4CAF50", fg="white")
@@ -155,16 +347,46 @@ class MaintenanceApp:
         self.tasks_listbox.insert(tk.END, "OPERATION                PLATE ID")
         self.tasks_listbox.insert(tk.END, "-" * 50)  # Separator line
 
+        # Paging through the sorted view (rows below the two header lines)
+        self.page_size = 6
+        self.page = 0
+        self.shown_records = []  # Records on the current page, below the header rows
+        self.shown_counts_version = None
+        page_frame = tk.Frame(root, bg="#f7f7f7")
+        page_frame.pack(pady=5)
+        tk.Button(page_frame, text="< Prev", command=lambda: self.change_page(-1), font=("Helvetica", 12), relief="flat", bg="#2196F3", fg="white", width=8).grid(row=0, column=0, padx=5)
+        self.page_label = tk.Label(page_frame, text="", font=("Helvetica", 12), bg="#f7f7f7", fg="#333")
+        self.page_label.grid(row=0, column=1, padx=10)
+        tk.Button(page_frame, text="Next >", command=lambda: self.change_page(1), font=("Helvetica", 12), relief="flat", bg="#2196F3", fg="white", width=8).grid(row=0, column=2, padx=5)
+
+        # Pending count for the task type selected in the dropdown
+        self.type_count_label = tk.Label(root, text="", font=("Helvetica", 12, "italic"), bg="#f7f7f7", fg="#333")
+        self.type_count_label.pack()
+        self.task_var.trace_add("write", lambda *args: self.update_type_count())
+
         # Remove Task Button
         tk.Button(root, text="Remove Task", command=self.remove_task, bg="#FF5722", fg="white", font=("Helvetica", 14), relief="flat", width=20, height=2).pack(pady=10)
 
-        # Initialize tasks binary tree with a max size of 5
+        # At most 5 orders unless MAINTENANCE_CAPACITY says otherwise; the BoundedQueue enforces it
         self.max_size = 5
-        self.tasks = BinaryTree(self.max_size)
+        # Change feed for external consumers (served on MAINTENANCE_FEED_PORT when set)
+        self.feed = ChangeFeed()
+        self.feed_server = serve_from_env(self.feed)
+        # Completed tasks go to the service history under MAINTENANCE_ARCHIVE_DIR when set
+        self.archive = archive_from_env(self.feed)
+        self.tasks = BinaryTree(sys.maxsize, dedup=PendingTaskSet(), feed=self.feed)
+        self.queue = bounded_from_env(self.tasks, self.max_size)
+        metrics.gauge("BinaryTree.size", lambda: self.tasks.size)
+        metrics.gauge("BinaryTree.depth", self.tasks.depth)
+
+        self.update_task_listbox()
 
         # Bind the window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # F12 opens the live metrics panel (timings need MAINTENANCE_METRICS=1)
+        self.root.bind("<F12>", lambda event: DebugPanel(self.root))
+
     def validate_plate_id(self, plate_id):
         """Validate the plate ID format for car."""
         # Regex for Car Plate ID: 'RAA123A' to 'RAG999Z' (Car format)
@@ -177,7 +399,7 @@ class MaintenanceApp:
 
     def add_task(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
 
         # Error handling for Plate ID validation
         if not plate_id:
@@ -189,12 +411,16 @@ class MaintenanceApp:
                                               "Car: RA[A-G]123A to RA[G]999Z")
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_error("Selection Error", "Please select a valid operation from the dropdown.")
             return
 
         # Insert task into the binary tree
-        if not self.tasks.insert(task, plate_id):
+        added = self.queue.offer(task, plate_id)
+        if added is None:
+            self.show_error("Duplicate Task", f"Task '{task}' for Plate ID {plate_id} is already pending.")
+            return
+        if not added:
             self.show_error("Tree Full", "The task tree is full. Cannot add more tasks.")
             return
 
@@ -208,22 +434,41 @@ class MaintenanceApp:
             self.show_error("Selection Error", "Please select a valid task to remove.")
             return
 
-        task_info = self.tasks_listbox.get(selected[0])
-        task, plate_id = task_info.split(" - ")
+        record = self.shown_records[selected[0] - 2]
 
         # Show confirmation dialog to remove task
-        response = messagebox.askyesno("Confirm Removal", f"Are you sure you want to remove the operation '{task}' for Plate ID {plate_id}?")
+        response = messagebox.askyesno("Confirm Removal", f"Are you sure you want to remove the operation '{record.task}' for Plate ID {record.plate_id}?")
         if response:
-            self.tasks.remove(task)
+            self.queue.remove_record(record)
+            self.feed.publish(COMPLETED, record.task, record.plate_id)
             self.update_task_listbox()
-            self.show_success(f"Task '{task}' for Plate ID {plate_id} removed.")
+            self.show_success(f"Task '{record.task}' for Plate ID {record.plate_id} removed.")
 
+    @instrument()
     def update_task_listbox(self):
-        """Update the listbox with the current tasks from the binary tree"""
-        self.tasks_listbox.delete(2, tk.END)  # Remove the old tasks
-        tasks = self.tasks.get_all_tasks()
-        for task in tasks:
-            self.tasks_listbox.insert(tk.END, task)
+        """Update the listbox with the current page of tasks from the binary tree"""
+        pages = max(1, -(-self.tasks.size // self.page_size))
+        self.page = min(self.page, pages - 1)
+        rows = self.tasks.iter_from(self.page * self.page_size)
+        records = [record for _, record in zip(range(self.page_size), rows)]
+        sync_listbox(self.tasks_listbox, self.shown_records, records, first_row=2)
+        self.page_label.config(text=f"Page {self.page + 1} of {pages}")
+        self.shown_counts_version = update_task_options(self.catalog, self.task_dropdown, self.task_var,
+                                                        self.tasks.counts, self.shown_counts_version)
+        self.update_type_count()
+
+    def change_page(self, step):
+        """Move to the previous or next page of the sorted view"""
+        self.page = max(0, self.page + step)
+        self.update_task_listbox()
+
+    def update_type_count(self):
+        """Show how many tasks of the selected type are pending"""
+        task = self.catalog.task_for_option(self.task_var.get())
+        if task is None:
+            self.type_count_label.config(text=f"{self.tasks.size} task(s) pending")
+        else:
+            self.type_count_label.config(text=f"{self.tasks.counts[task]:,} '{task}' task(s) pending")
 
     def show_error(self, title, message):
         """Display custom error pop-up with attractive styling"""
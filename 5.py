@@ -2,30 +2,71 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import re
 
+from archive import archive_from_env
+from catalog import TaskCounts, load_catalog, update_task_options
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed, feed_change, serve_from_env
+from dedup import PendingTaskSet
+from listview import sync_listbox
+from metrics import DebugPanel, instrument, metrics
+from nodepool import recycle
+from records import TaskRecord
+from replication import replicate_from_env
+from search import TaskSearchIndex
+
 class Node:
     """Node class for the Doubly Linked List"""
+    __slots__ = ("record", "next", "prev")
+
     def __init__(self, task, plate_id):
-        self.task = task
-        self.plate_id = plate_id
+        self.record = TaskRecord(task, plate_id)
         self.next = None
         self.prev = None
 
+    @property
+    def task(self):
+        return self.record.task
+
+    @property
+    def plate_id(self):
+        return self.record.plate_id
+
+    @property
+    def enqueued_at(self):
+        return self.record.enqueued_at
+
 class DoublyLinkedList:
     """Doubly Linked List to manage tasks"""
-    def __init__(self):
+    def __init__(self, dedup=None, feed=None, pool=None):
         self.head = None
         self.tail = None
-
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.pool = pool  # Optional NodePool recycling removed nodes
+        self.counts = TaskCounts()  # Pending tasks per type
+        self.size = 0
+
+    @instrument()
+    @feed_change
     def add_task(self, task, plate_id):
-        new_node = Node(task, plate_id)
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False
+        new_node = Node(task, plate_id) if self.pool is None else self.pool.acquire(TaskRecord(task, plate_id))
         if not self.head:
             self.head = self.tail = new_node
         else:
             self.tail.next = new_node
             new_node.prev = self.tail
             self.tail = new_node
-
+        self.size += 1
+        self.counts.add(task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, task, plate_id)
+        return True
+
+    @instrument()
+    @feed_change
     def remove_task(self):
+        """Remove the task at the front and return its TaskRecord"""
         if not self.head:
             return None
         removed_node = self.head
@@ -34,15 +75,57 @@ class DoublyLinkedList:
             self.head.prev = None
         else:
             self.tail = None
-        return removed_node
-
+        self.size -= 1
+        self.counts.discard(removed_node.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, removed_node.task, removed_node.plate_id)
+        if self.dedup is not None:
+            self.dedup.discard(removed_node.task, removed_node.plate_id)
+        return recycle(removed_node, self.pool)
+
+    @instrument()
+    @feed_change
+    def remove_node(self, node):
+        """Unlink any node from the list in O(1) and return its TaskRecord"""
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        node.prev = node.next = None
+        self.size -= 1
+        self.counts.discard(node.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, node.task, node.plate_id)
+        if self.dedup is not None:
+            self.dedup.discard(node.task, node.plate_id)
+        return recycle(node, self.pool)
+
+    def remove_record(self, record):
+        """Remove exactly the given TaskRecord, wherever it is in the list"""
+        node = self.head
+        while node and node.record.id != record.id:
+            node = node.next
+        if node is None:
+            return False  # No matching task in the list
+        self.remove_node(node)
+        return True
+
+    @instrument()
     def get_all_tasks(self):
-        tasks = []
+        return [record.label() for record in self.get_all_records()]
+
+    def get_all_records(self):
+        """Get all tasks as TaskRecords, front to back"""
+        records = []
         current = self.head
         while current:
-            tasks.append(f"{current.task} - {current.plate_id}")
+            records.append(current.record)
             current = current.next
-        return tasks
+        return records
 
 class MaintenanceApp:
     def __init__(self, root):
@@ -51,20 +134,9 @@ class MaintenanceApp:
         self.root.state("zoomed")
         self.root.configure(bg="#f7f7f7")
 
-        # Predefined Task List
-        self.task_options = [
-            "Select an Operation",  # Default option
-            "Oil Change",
-            "Tire Rotation",
-            "Brake Inspection",
-            "Battery Check",
-            "Filter Replacement",
-            "Coolant Flush",
-            "Alignment Check",
-            "Spark Plug Replacement",
-            "Timing Belt Inspection",
-            "Transmission Fluid Change"
-        ]
+        # Task types come from the shared catalog; the dropdown shows pending counts
+        self.catalog = load_catalog()
+        self.task_options = self.catalog.options()
 
         title_label = tk.Label(root, text="Car Maintenance Tracker", font=("Helvetica", 26, "bold"), bg="#4CAF50", fg="white")
         title_label.pack(pady=20)
@@ -92,6 +164,15 @@ class MaintenanceApp:
 
         tk.Label(root, text="Pending Maintenance Tasks:", font=("Helvetica", 18, "bold"), bg="#f7f7f7", fg="#333").pack(pady=10)
 
+        # Filter-as-you-type by plate ID or task name
+        search_frame = tk.Frame(root, bg="#f7f7f7")
+        search_frame.pack(pady=5)
+        tk.Label(search_frame, text="Search:", font=("Helvetica", 14), bg="#f7f7f7", fg="#333").grid(row=0, column=0, padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=("Helvetica", 14), width=20, bd=2, relief="solid")
+        search_entry.grid(row=0, column=1, padx=5)
+        search_entry.bind("<KeyRelease>", lambda event: self.update_task_listbox())
+
         self.tasks_listbox = tk.Listbox(root, font=("Helvetica", 14), height=8, width=50, bd=2, relief="solid", selectmode=tk.SINGLE, bg="#f0f0f0", fg="#333")
         self.tasks_listbox.pack(pady=5)
 
@@ -100,11 +181,26 @@ class MaintenanceApp:
 
         tk.Button(root, text="Remove Task", command=self.remove_task, bg="#FF5722", fg="white", font=("Helvetica", 14), relief="flat", width=20, height=2).pack(pady=10)
 
-        self.tasks = DoublyLinkedList()
+        # Change feed for external consumers (served on MAINTENANCE_FEED_PORT when set)
+        self.feed = ChangeFeed()
+        self.feed_server = serve_from_env(self.feed)
+        # Completed tasks go to the service history under MAINTENANCE_ARCHIVE_DIR when set
+        self.archive = archive_from_env(self.feed)
+        self.tasks = DoublyLinkedList(dedup=PendingTaskSet(), feed=self.feed)
+        # Hot standby copy of the queue at MAINTENANCE_STANDBY (host:port) when set
+        self.replica = replicate_from_env(self.tasks)
+        self.search_index = TaskSearchIndex()
+        self.shown_records = []
+        self.shown_counts_version = None
+        self.max_search_rows = 200
+        metrics.gauge("DoublyLinkedList.size", lambda: self.tasks.size)
 
         # Close button handler
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # F12 opens the live metrics panel (timings need MAINTENANCE_METRICS=1)
+        self.root.bind("<F12>", lambda event: DebugPanel(self.root))
+
     def validate_plate_id(self, plate_id):
         car_pattern = r"^RA[A-G]\d{3}[A-Z]$"
         if re.match(car_pattern, plate_id):
@@ -113,7 +209,7 @@ class MaintenanceApp:
 
     def add_task(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
 
         if not plate_id:
             self.show_error("Plate ID Error", "Plate ID cannot be empty. Please enter a valid Plate ID.")
@@ -123,28 +219,42 @@ class MaintenanceApp:
             self.show_error("Plate ID Error", "Invalid Plate ID. It must follow the format:\nCar: RA[A-G]123A to RA[G]999Z")
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_error("Selection Error", "Please select a valid operation from the dropdown.")
             return
 
-        self.tasks.add_task(task, plate_id)
+        if not self.tasks.add_task(task, plate_id):
+            self.show_error("Duplicate Task", f"Task '{task}' for Plate ID {plate_id} is already pending.")
+            return
+        self.search_index.add(self.tasks.tail.record)
         self.update_task_listbox()
         self.plate_id_entry.delete(0, tk.END)
         self.show_success(f"Task '{task}' for Plate ID {plate_id} added successfully.")
 
     def remove_task(self):
-        removed_node = self.tasks.remove_task()
-        if removed_node:
+        record = self.tasks.remove_task()
+        if record:
+            self.feed.publish(COMPLETED, record.task, record.plate_id)
+            self.search_index.remove(record)
             self.update_task_listbox()
-            self.show_success(f"Task '{removed_node.task}' for Plate ID {removed_node.plate_id} removed.")
+            self.show_success(f"Task '{record.task}' for Plate ID {record.plate_id} removed.")
         else:
             self.show_error("No Tasks", "No tasks to remove.")
 
+    @instrument()
     def update_task_listbox(self):
+        self.shown_counts_version = update_task_options(self.catalog, self.task_dropdown, self.task_var,
+                                                        self.tasks.counts, self.shown_counts_version)
+        query = self.search_var.get()
+        if not query.strip():
+            sync_listbox(self.tasks_listbox, self.shown_records, self.tasks.get_all_records(), first_row=2)
+            return
         self.tasks_listbox.delete(2, tk.END)
-        tasks = self.tasks.get_all_tasks()
-        for task in tasks:
-            self.tasks_listbox.insert(tk.END, task)
+        self.shown_records = []  # The listbox also holds a "more matches" row; redraw fully afterwards
+        total, matches = self.search_index.search(query, limit=self.max_search_rows)
+        self.tasks_listbox.insert(tk.END, *[record.label() for record in matches])
+        if total > len(matches):
+            self.tasks_listbox.insert(tk.END, f"... {total - len(matches):,} more matches")
 
     def show_error(self, title, message):
         messagebox.showerror(title, message)
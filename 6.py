@@ -2,16 +2,77 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import re
 
+from archive import archive_from_env
+from catalog import TaskCounts, load_catalog, update_task_options
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed, serve_from_env
+from metrics import DebugPanel, instrument, metrics
+
 class TreeNode:
     """TreeNode class for representing tasks and sub-tasks in a hierarchical structure"""
     def __init__(self, task, plate_id=None):
         self.task = task
         self.plate_id = plate_id
-        self.children = []  # List of child nodes (sub-tasks)
+        self.parent = None
+        self.children = {}  # Child nodes (sub-tasks) in insertion order; a dict gives O(1) removal
+        self.size = 1  # Number of nodes in the subtree rooted here
+        self.jobs = None  # TaskCounts of the jobs in the subtree; None while that is just this node's own
+        self.height = 1  # Levels in the subtree rooted here
+        self.child_heights = {}  # How many children have each height, so removing the tallest needs no scan
 
     def add_child(self, child_node):
         """Add a sub-task (child node) to the current node"""
-        self.children.append(child_node)
+        child_node.parent = self
+        self.children[child_node] = None
+        self._update_totals(child_node, 1)
+        self._update_heights(None, child_node.height)
+
+    def detach(self):
+        """Unlink this node (and its whole subtree) from its parent"""
+        if self.parent is not None:
+            del self.parent.children[self]
+            self.parent._update_totals(self, -1)
+            self.parent._update_heights(self.height, None)
+            self.parent = None
+
+    def job_counts(self):
+        """Pending jobs (nodes with a plate ID) per type in the subtree rooted here"""
+        if self.jobs is None:
+            self.jobs = TaskCounts()
+            if self.plate_id:
+                self.jobs.add(self.task)
+        return self.jobs
+
+    def _update_totals(self, child, sign):
+        """Add (sign 1) or take off (sign -1) child's subtree size and job counts, from this node up to the root"""
+        size = sign * child.size
+        if child.jobs is not None:
+            change, jobs = (TaskCounts.update if sign > 0 else TaskCounts.subtract), child.jobs
+        elif child.plate_id:
+            change, jobs = (TaskCounts.add if sign > 0 else TaskCounts.discard), child.task
+        else:
+            change = None
+        node = self
+        while node is not None:
+            node.size += size
+            if change is not None:
+                change(node.job_counts(), jobs)
+            node = node.parent
+
+    def _update_heights(self, old, new):
+        """A child's height went from old to new (None for a child leaving or arriving); fix heights up the tree"""
+        node = self
+        while node is not None:
+            heights = node.child_heights
+            if old is not None:
+                heights[old] -= 1
+                if not heights[old]:
+                    del heights[old]
+            if new is not None:
+                heights[new] = heights.get(new, 0) + 1
+            old, node.height = node.height, 1 + max(heights, default=0)
+            if node.height == old:
+                break  # Ancestors see no change
+            new, node = node.height, node.parent
 
     def __str__(self):
         """Return a string representation of the task"""
@@ -19,40 +80,106 @@ class TreeNode:
 
 class TaskTree:
     """TaskTree class to manage the tree structure of tasks"""
-    def __init__(self):
+    def __init__(self, feed=None):
         self.root = None
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+
+    @property
+    def counts(self):
+        """Pending jobs (nodes with a plate ID) per type, kept up to date by every node under the root"""
+        return self.root.job_counts() if self.root is not None else TaskCounts()
 
     def set_root(self, root_node):
         """Set the root node of the tree"""
         self.root = root_node
 
+    @instrument()
     def add_task(self, parent_task, task, plate_id=None):
         """Add a new task under the specified parent task"""
         parent_node = self.find_task(self.root, parent_task)
         if parent_node:
             new_task_node = TreeNode(task, plate_id)
             parent_node.add_child(new_task_node)
+            if plate_id and self.feed is not None:
+                self.feed.publish(ADDED, task, plate_id)
 
+    @instrument()
     def find_task(self, node, task):
         """Find a task in the tree by task name"""
+        return self._find_task(node, task)
+
+    def _find_task(self, node, task):
+        """Recursive search helper"""
         if node.task == task:
             return node
         for child in node.children:
-            result = self.find_task(child, task)
+            result = self._find_task(child, task)
             if result:
                 return result
         return None
 
+    @instrument()
     def get_all_tasks(self, node=None, prefix=""):
-        """Recursively get all tasks as a list of strings"""
+        """Get all tasks as a list of strings"""
         if node is None:
             node = self.root
 
         tasks = []
+        self._collect_tasks(node, prefix, tasks)
+        return tasks
+
+    def _collect_tasks(self, node, prefix, tasks):
+        """Recursive pre-order traversal helper"""
         tasks.append(f"{prefix}{node.task} - {node.plate_id if node.plate_id else ''}")
         for child in node.children:
-            tasks.extend(self.get_all_tasks(child, prefix + "  "))
-        return tasks
+            self._collect_tasks(child, prefix + "  ", tasks)
+
+    def iter_nodes(self, node=None):
+        """Yield (depth, node) in the pre-order get_all_tasks lists them in"""
+        stack = [(0, self.root if node is None else node)]
+        while stack:
+            depth, node = stack.pop()
+            yield depth, node
+            stack.extend((depth + 1, child) for child in reversed(node.children))
+
+    @instrument()
+    def remove_task(self, task_node):
+        """Delete a task together with all of its sub-tasks; return how many nodes were removed"""
+        if task_node is self.root or task_node.parent is None:
+            return 0  # The root (or a node outside the tree) cannot be removed
+        task_node.detach()  # Takes the subtree's job counts off every ancestor
+        if self.feed is not None:  # Only the feed needs a visit to each removed job
+            stack = [task_node]
+            while stack:
+                node = stack.pop()
+                if node.plate_id:
+                    self.feed.publish(REMOVED, node.task, node.plate_id)
+                stack.extend(node.children)
+        return task_node.size
+
+    @instrument()
+    def move_task(self, task_node, new_parent):
+        """Re-parent a task (with its sub-tasks) under new_parent"""
+        ancestor = new_parent
+        while ancestor is not None:
+            if ancestor is task_node:
+                return False  # Cannot move a task under itself
+            ancestor = ancestor.parent
+        task_node.detach()
+        new_parent.add_child(task_node)
+        return True
+
+    def count(self, node=None):
+        """Count the nodes in the tree (or in the subtree under node)"""
+        if node is None:
+            node = self.root
+        return node.size
+
+    def depth(self, node=None):
+        """Get the height of the tree (or of the subtree under node), kept up to date by every add and remove"""
+        if node is None:
+            node = self.root
+        return node.height
 
 class MaintenanceApp:
     def __init__(self, root):
@@ -61,20 +188,9 @@ class MaintenanceApp:
         self.root.state("zoomed")
         self.root.configure(bg="#f7f7f7")
 
-        # Predefined Task List
-        self.task_options = [
-            "Select an Operation",  # Default option
-            "Oil Change",
-            "Tire Rotation",
-            "Brake Inspection",
-            "Battery Check",
-            "Filter Replacement",
-            "Coolant Flush",
-            "Alignment Check",
-            "Spark Plug Replacement",
-            "Timing Belt Inspection",
-            "Transmission Fluid Change"
-        ]
+        # Task types come from the shared catalog; the dropdown shows pending counts
+        self.catalog = load_catalog()
+        self.task_options = self.catalog.options()
 
         title_label = tk.Label(root, text="Car Maintenance Tracker", font=("Helvetica", 26, "bold"), bg="#4CAF50", fg="white")
         title_label.pack(pady=20)
@@ -110,7 +226,14 @@ class MaintenanceApp:
 
         tk.Button(root, text="Remove Task", command=self.remove_task, bg="#FF5722", fg="white", font=("Helvetica", 14), relief="flat", width=20, height=2).pack(pady=10)
 
-        self.task_tree = TaskTree()
+        # Change feed for external consumers (served on MAINTENANCE_FEED_PORT when set)
+        self.feed = ChangeFeed()
+        self.feed_server = serve_from_env(self.feed)
+        # Completed tasks go to the service history under MAINTENANCE_ARCHIVE_DIR when set
+        self.archive = archive_from_env(self.feed)
+        self.task_tree = TaskTree(feed=self.feed)
+        self.shown_nodes = []  # Node behind each listbox row below the header lines
+        self.shown_counts_version = None
 
         # Root task (e.g., "Maintenance")
         self.root_task = TreeNode("Maintenance")
@@ -120,6 +243,13 @@ class MaintenanceApp:
         oil_change = TreeNode("Oil Change")
         self.root_task.add_child(oil_change)
         self.task_tree.add_task("Oil Change", "Engine Oil Change")
+        self.update_task_listbox()
+
+        metrics.gauge("TaskTree.size", self.task_tree.count)
+        metrics.gauge("TaskTree.depth", self.task_tree.depth)
+
+        # F12 opens the live metrics panel (timings need MAINTENANCE_METRICS=1)
+        self.root.bind("<F12>", lambda event: DebugPanel(self.root))
 
         # Close button handler
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -132,7 +262,7 @@ class MaintenanceApp:
 
     def add_task(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
 
         if not plate_id:
             self.show_error("Plate ID Error", "Plate ID cannot be empty. Please enter a valid Plate ID.")
@@ -142,7 +272,7 @@ class MaintenanceApp:
             self.show_error("Plate ID Error", "Invalid Plate ID. It must follow the format:\nCar: RA[A-G]123A to RA[G]999Z")
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_error("Selection Error", "Please select a valid operation from the dropdown.")
             return
 
@@ -152,26 +282,33 @@ class MaintenanceApp:
         self.show_success(f"Task '{task}' for Plate ID {plate_id} added successfully.")
 
     def remove_task(self):
-        task_to_remove = self.task_var.get()
-        task_node = self.task_tree.find_task(self.root_task, task_to_remove)
-        if task_node:
-            self.show_remove_confirmation(task_node)
-        else:
-            self.show_error("No Tasks", "No tasks to remove.")
+        selected = self.tasks_listbox.curselection()
+        if not selected or selected[0] < 2:  # Ignore header lines
+            self.show_error("Selection Error", "Please select a task to remove.")
+            return
+        # The row's own node: a task name alone would also match its category node
+        self.show_remove_confirmation(self.shown_nodes[selected[0] - 2])
 
     def show_remove_confirmation(self, task_node):
         """Show confirmation popup before removing the task"""
         response = messagebox.askyesno("Remove Task", f"Are you sure you want to remove '{task_node.task}' with Plate ID '{task_node.plate_id}'?")
         if response:
-            self.task_tree.remove_task(task_node)
+            if not self.task_tree.remove_task(task_node):
+                self.show_error("Remove Error", f"'{task_node.task}' cannot be removed.")
+                return
+            if task_node.plate_id and not task_node.children:  # One job done, not a category or a subtree cleared
+                self.feed.publish(COMPLETED, task_node.task, task_node.plate_id)
             self.update_task_listbox()
             self.show_success(f"Task '{task_node.task}' removed successfully.")
 
+    @instrument()
     def update_task_listbox(self):
         self.tasks_listbox.delete(2, tk.END)
-        tasks = self.task_tree.get_all_tasks(self.root_task)
-        for task in tasks:
-            self.tasks_listbox.insert(tk.END, task)
+        rows = list(self.task_tree.iter_nodes(self.root_task))
+        self.shown_nodes = [node for _, node in rows]
+        self.tasks_listbox.insert(tk.END, *[f"{'  ' * depth}{node}" for depth, node in rows])
+        self.shown_counts_version = update_task_options(self.catalog, self.task_dropdown, self.task_var,
+                                                        self.task_tree.counts, self.shown_counts_version)
 
     def show_error(self, title, message):
         messagebox.showerror(title, message)
@@ -2,22 +2,56 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 import re
 
+from adaptive import adaptive_from_env
+from archive import archive_from_env
+from capacity import bounded_from_env
+from catalog import TaskCounts, load_catalog, update_task_options
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed, feed_change, serve_from_env
+from dedup import PendingTaskSet
+from forecast import enqueue_due_from_env
+from listview import sync_listbox
+from metrics import DebugPanel, instrument, metrics
+from records import TaskRecord
+from replication import replicate_from_env
+
 class Node:
     """Node class for the Doubly Linked List"""
     def __init__(self, task, plate_id, priority):
-        self.task = task
-        self.plate_id = plate_id
-        self.priority = priority
+        self.record = TaskRecord(task, plate_id, priority)
         self.prev = None
         self.next = None
 
+    @property
+    def task(self):
+        return self.record.task
+
+    @property
+    def plate_id(self):
+        return self.record.plate_id
+
+    @property
+    def enqueued_at(self):
+        return self.record.enqueued_at
+
+    @property
+    def priority(self):
+        return self.record.priority
+
 class DoublyLinkedList:
     """Doubly Linked List to manage tasks"""
-    def __init__(self):
+    def __init__(self, dedup=None, feed=None):
         self.head = None
         self.tail = None
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.counts = TaskCounts()  # Pending tasks per type
+        self.size = 0
 
+    @instrument()
+    @feed_change
     def add_task(self, task, plate_id, priority):
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False  # The same task is already pending for this plate
         new_node = Node(task, plate_id, priority)
         if not self.head:  # If the list is empty
             self.head = self.tail = new_node
@@ -25,7 +59,14 @@ class DoublyLinkedList:
             self.tail.next = new_node
             new_node.prev = self.tail
             self.tail = new_node
-
+        self.size += 1
+        self.counts.add(task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, task, plate_id, priority)
+        return True
+
+    @instrument()
+    @feed_change
     def insertion_sort(self):
         """Sort tasks in the linked list by priority using Insertion Sort"""
         if not self.head or not self.head.next:
@@ -38,24 +79,60 @@ class DoublyLinkedList:
 
             while prev and key.priority < prev.priority:
                 # Swap data between nodes
-                prev.task, key.task = key.task, prev.task
-                prev.plate_id, key.plate_id = key.plate_id, prev.plate_id
-                prev.priority, key.priority = key.priority, prev.priority
+                prev.record, key.record = key.record, prev.record
 
                 key = prev
                 prev = prev.prev
 
             current = current.next
 
+    @instrument()
     def get_all_tasks(self):
         """Get all tasks as a list of strings"""
-        tasks = []
+        return [record.label() for record in self.get_all_records()]
+
+    def get_all_records(self):
+        """Get all tasks as TaskRecords, front to back"""
+        records = []
         current = self.head
         while current:
-            tasks.append(f"{current.task} - {current.plate_id} (Priority: {current.priority})")
+            records.append(current.record)
             current = current.next
-        return tasks
-
+        return records
+
+    @instrument()
+    @feed_change
+    def remove_node(self, node):
+        """Unlink any node from the list in O(1)"""
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        node.prev = node.next = None
+        self.size -= 1
+        self.counts.discard(node.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, node.task, node.plate_id, node.priority)
+        if self.dedup is not None:
+            self.dedup.discard(node.task, node.plate_id)
+        return node.record
+
+    def remove_record(self, record):
+        """Remove exactly the given TaskRecord, wherever it is in the list"""
+        node = self.head
+        while node and node.record.id != record.id:
+            node = node.next
+        if node is None:
+            return False  # No matching task in the list
+        self.remove_node(node)
+        return True
+
+    @instrument()
+    @feed_change
     def remove_task(self):
         """Remove task from the front"""
         if not self.head:  # List is empty
@@ -66,7 +143,13 @@ class DoublyLinkedList:
             self.head.prev = None
         if not self.head:  # If the list becomes empty, set tail to None
             self.tail = None
-        return removed_node
+        self.size -= 1
+        self.counts.discard(removed_node.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, removed_node.task, removed_node.plate_id, removed_node.priority)
+        if self.dedup is not None:
+            self.dedup.discard(removed_node.task, removed_node.plate_id)
+        return removed_node.record
 
 class MaintenanceApp:
     def __init__(self, root):
@@ -77,20 +160,9 @@ class MaintenanceApp:
         self.root.state("zoomed")
         self.root.configure(bg="#f7f7f7")
 
-        # Predefined Task List
-        self.task_options = [
-            "Select an Operation",  # Default option
-            "Oil Change",
-            "Tire Rotation",
-            "Brake Inspection",
-            "Battery Check",
-            "Filter Replacement",
-            "Coolant Flush",
-            "Alignment Check",
-            "Spark Plug Replacement",
-            "Timing Belt Inspection",
-            "Transmission Fluid Change"
-        ]
+        # Task types come from the shared catalog; the dropdown shows pending counts
+        self.catalog = load_catalog()
+        self.task_options = self.catalog.options()
 
         # Title Label
         title_label = tk.Label(root, text="Car Maintenance Tracker", font=("Helvetica", 26, "bold"), bg="#4CAF50", fg="white")
@@ -138,8 +210,29 @@ class MaintenanceApp:
         # Remove Task Button
         tk.Button(root, text="Remove Task", command=self.remove_task, bg="#FF5722", fg="white", font=("Helvetica", 14), relief="flat", width=20, height=2).pack(pady=10)
 
-        # Initialize Doubly Linked List
-        self.tasks = DoublyLinkedList()
+        # Initialize Doubly Linked List with duplicate rejection
+        # Change feed for external consumers (served on MAINTENANCE_FEED_PORT when set)
+        self.feed = ChangeFeed()
+        self.feed_server = serve_from_env(self.feed)
+        # Completed tasks go to the service history under MAINTENANCE_ARCHIVE_DIR when set
+        self.archive = archive_from_env(self.feed)
+        # The self-tuning AdaptiveQueue stands in for the list when MAINTENANCE_ADAPTIVE=1
+        self.tasks = (adaptive_from_env(dedup=PendingTaskSet(), feed=self.feed)
+                      or DoublyLinkedList(dedup=PendingTaskSet(), feed=self.feed))
+        # Capacity and overflow policy from MAINTENANCE_CAPACITY / MAINTENANCE_OVERFLOW (unbounded by default)
+        self.queue = bounded_from_env(self.tasks)
+        # Hot standby copy of the queue at MAINTENANCE_STANDBY (host:port) when set
+        self.replica = replicate_from_env(self.tasks)
+        self.shown_records = []  # Records currently displayed below the header rows
+        self.shown_counts_version = None
+        metrics.gauge(f"{type(self.tasks).__name__}.size", lambda: self.tasks.size)
+        # Tasks the service history says fall due within MAINTENANCE_FORECAST_DAYS are queued on start
+        self.forecast = enqueue_due_from_env(self.queue, self.archive)
+        if self.forecast is not None:
+            self.update_task_listbox()
+
+        # F12 opens the live metrics panel (timings need MAINTENANCE_METRICS=1)
+        self.root.bind("<F12>", lambda event: DebugPanel(self.root))
 
     def validate_plate_id(self, plate_id):
         """Validate Plate ID format"""
@@ -148,7 +241,7 @@ class MaintenanceApp:
 
     def add_task(self):
         plate_id = self.plate_id_entry.get()
-        task = self.task_var.get()
+        task = self.catalog.task_for_option(self.task_var.get())
         priority = self.priority_var.get()
 
         if not plate_id:
@@ -159,30 +252,36 @@ class MaintenanceApp:
             self.show_message("Plate ID Error", "Invalid Plate ID format.", "error")
             return
 
-        if task == "Select an Operation":
+        if task is None:
             self.show_message("Selection Error", "Please select a valid operation.", "error")
             return
 
-        self.tasks.add_task(task, plate_id, priority)
-        self.tasks.insertion_sort()
+        added = self.queue.offer(task, plate_id, priority)  # Keeps the list sorted by priority
+        if added is None:
+            self.show_message("Duplicate Task", f"Task '{task}' for Plate ID {plate_id} is already pending.", "error")
+            return
+        if not added:
+            self.show_message("Queue Full", f"The task queue is full; Task '{task}' was not added.", "error")
+            return
         self.update_task_listbox()
         self.show_message("Success", f"Task '{task}' added successfully.", "success")
         self.plate_id_entry.delete(0, tk.END)
 
     def remove_task(self):
-        removed_node = self.tasks.remove_task()
-        if removed_node:
+        record = self.queue.get()
+        if record:
+            self.feed.publish(COMPLETED, record.task, record.plate_id, record.priority)
             self.update_task_listbox()
-            self.show_message("Success", f"Task '{removed_node.task}' removed.", "success")
+            self.show_message("Success", f"Task '{record.task}' removed.", "success")
         else:
             self.show_message("No Tasks", "No tasks to remove.", "error")
 
+    @instrument()
     def update_task_listbox(self):
         """Update the listbox with sorted tasks"""
-        self.tasks_listbox.delete(2, tk.END)
-        tasks = self.tasks.get_all_tasks()
-        for task in tasks:
-            self.tasks_listbox.insert(tk.END, task)
+        sync_listbox(self.tasks_listbox, self.shown_records, self.tasks.get_all_records(), first_row=2)
+        self.shown_counts_version = update_task_options(self.catalog, self.task_dropdown, self.task_var,
+                                                        self.tasks.counts, self.shown_counts_version)
 
     def show_message(self, title, message, msg_type):
         """Custom message popup"""
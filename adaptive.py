@@ -0,0 +1,469 @@
+"""Adaptive task queue that picks its backend from the observed workload.
+
+Each app hard-wires one structure whether or not it suits the way the
+queue is used. AdaptiveQueue keeps the same order in all cases: lowest
+priority number first (tasks without one count as priority 1, as in
+capacity.py), then arrival order, with tasks added at the front going
+ahead of their priority. It stores the tasks in whichever backend is
+cheapest for the recent mix of operations:
+
+    fifo     deque of records, as 2.py; O(1) at both ends, but a priority
+             insert, an arbitrary removal or a search scans the queue
+    buckets  one deque per priority plus a plate index; O(1) priority
+             inserts, removals and searches, at a higher fixed cost;
+             removed tasks are marked and skipped when they reach the front
+
+Every operation is counted. Every ``check_every`` operations the decayed
+counts are priced against each backend's cost model at the current size.
+The queue switches when another backend is cheaper by more than
+``hysteresis``. A switch does not copy the queue in one go. The new backend
+takes new work at once and every later operation moves ``migrate_step``
+tasks across from the old one, so no single call stalls. Until the old
+backend is empty, pops take the earlier task of the two heads.
+
+Set MAINTENANCE_ADAPTIVE=1 to have 7.py keep its tasks in an AdaptiveQueue
+instead of its sorted list. Run ``python adaptive.py`` to compare it with
+each fixed backend over a workload that shifts from FIFO to lookups to
+priority work.
+"""
+import argparse
+import bisect
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+
+from catalog import TaskCounts
+from changefeed import ADDED, REMOVED, feed_change
+from metrics import instrument
+from records import TaskRecord, plate_from_code
+
+ADD_REAR = "add_rear"  # Lands behind everything pending
+ADD_FRONT = "add_front"
+ADD_PRIORITY = "add_priority"  # Lands in the middle, by priority
+POP = "pop"
+REMOVE = "remove"  # A given task, wherever it is
+SEARCH = "search"
+OPERATIONS = (ADD_REAR, ADD_FRONT, ADD_PRIORITY, POP, REMOVE, SEARCH)
+
+# Cost of each operation in microseconds as (fixed, per pending task), measured
+# through AdaptiveQueue at 20k tasks; the scans cover half the queue on average
+COSTS = {
+    "fifo": {ADD_REAR: (4.5, 0), ADD_FRONT: (4.5, 0), ADD_PRIORITY: (5.0, 0.06), POP: (2.0, 0),
+             REMOVE: (3.0, 0.05), SEARCH: (3.0, 0.045)},
+    "buckets": {ADD_REAR: (6.5, 0), ADD_FRONT: (6.5, 0), ADD_PRIORITY: (7.0, 0), POP: (2.7, 0),
+                REMOVE: (2.9, 0), SEARCH: (2.8, 0)},
+}
+
+
+class FifoBackend:
+    """Entries of (key, record) in a deque, in key order"""
+    name = "fifo"
+
+    def __init__(self):
+        self.entries = deque()
+
+    def insert(self, key, record):
+        entries = self.entries
+        if not entries or entries[-1][0] < key:
+            entries.append((key, record))
+        elif entries[0][0] > key:
+            entries.appendleft((key, record))
+        else:
+            for back, (other, _) in enumerate(reversed(entries)):  # Walk back from the tail
+                if other < key:
+                    entries.insert(len(entries) - back, (key, record))
+                    return
+            entries.appendleft((key, record))
+
+    def peek(self):
+        return self.entries[0] if self.entries else None
+
+    def tail_key(self):
+        return self.entries[-1][0] if self.entries else None
+
+    def pop(self):
+        return self.entries.popleft() if self.entries else None
+
+    def find_entry(self, task, plate_id, record_id=None):
+        for entry in self.entries:
+            if entry[1].plate_id == plate_id and entry[1].task == task and record_id in (None, entry[1].id):
+                return entry
+        return None
+
+    def remove(self, task, plate_id, record_id=None):
+        entry = self.find_entry(task, plate_id, record_id)
+        if entry is None:
+            return None
+        self.entries.remove(entry)
+        return entry[1]
+
+    def find(self, plate_id):
+        return [record for _, record in self.entries if record.plate_id == plate_id]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class BucketBackend:
+    """One deque of (key, record) per priority, a plate index of entries and lazily removed entries"""
+    name = "buckets"
+
+    def __init__(self):
+        self.buckets = {}
+        self.ranks = []  # Priorities that have a bucket, most urgent first
+        self.by_plate = {}
+        self.removed = set()  # Ids of records removed but still in a bucket
+        self.size = 0
+
+    def insert(self, key, record):
+        bucket = self.buckets.get(key[0])
+        if bucket is None:
+            bucket = self.buckets[key[0]] = deque()
+            bisect.insort(self.ranks, key[0])
+        if not bucket or bucket[-1][0] < key:
+            bucket.append((key, record))
+        elif bucket[0][0] > key:
+            bucket.appendleft((key, record))
+        else:
+            for back, (other, _) in enumerate(reversed(bucket)):
+                if other < key:
+                    bucket.insert(len(bucket) - back, (key, record))
+                    break
+        self.by_plate.setdefault(record.plate_id, []).append((key, record))
+        self.size += 1
+
+    def _first(self, take):
+        for rank in self.ranks:
+            bucket = self.buckets[rank]
+            while bucket:
+                entry = bucket[0]
+                if entry[1].id in self.removed:
+                    self.removed.discard(bucket.popleft()[1].id)
+                    continue
+                if take:
+                    bucket.popleft()
+                    self._forget(entry)
+                return entry
+        return None
+
+    def peek(self):
+        return self._first(False)
+
+    def tail_key(self):
+        for rank in reversed(self.ranks):
+            if self.buckets[rank]:
+                return self.buckets[rank][-1][0]
+        return None
+
+    def pop(self):
+        return self._first(True)
+
+    def _forget(self, entry):
+        entries = self.by_plate[entry[1].plate_id]
+        entries.remove(entry)
+        if not entries:
+            del self.by_plate[entry[1].plate_id]
+        self.size -= 1
+
+    def find_entry(self, task, plate_id, record_id=None):
+        matches = [entry for entry in self.by_plate.get(plate_id, ())
+                   if entry[1].task == task and record_id in (None, entry[1].id)]
+        return min(matches, default=None, key=lambda entry: entry[0])
+
+    def remove(self, task, plate_id, record_id=None):
+        entry = self.find_entry(task, plate_id, record_id)
+        if entry is None:
+            return None
+        self._forget(entry)
+        self.removed.add(entry[1].id)  # Dropped from its bucket when it reaches the front
+        return entry[1]
+
+    def find(self, plate_id):
+        return sorted((record for _, record in self.by_plate.get(plate_id, ())), key=lambda r: r.id)
+
+    def __iter__(self):
+        for rank in self.ranks:
+            for entry in self.buckets[rank]:
+                if entry[1].id not in self.removed:
+                    yield entry
+
+    def __len__(self):
+        return self.size
+
+
+BACKENDS = {backend.name: backend for backend in (FifoBackend, BucketBackend)}
+
+
+class AdaptiveQueue:
+    """Priority-then-arrival task queue that moves between backends as its workload shifts"""
+    def __init__(self, backend="fifo", dedup=None, feed=None, adaptive=True, check_every=1024,
+                 migrate_step=256, hysteresis=0.25, decay=0.5):
+        self.backend = BACKENDS[backend]()
+        self.draining = None  # Previous backend while its tasks are being moved over
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.counts = TaskCounts()  # Pending tasks per type
+        self.size = 0
+        self.adaptive = adaptive
+        self.check_every = check_every
+        self.migrate_step = migrate_step  # Tasks moved per operation during a switch; None moves all at once
+        self.hysteresis = hysteresis
+        self.decay = decay
+        self.mix = dict.fromkeys(OPERATIONS, 0.0)  # Decayed operation counts
+        self.since_check = 0
+        self.switches = []  # (operation number, from, to)
+        self.operations = 0
+        self.back_seq = itertools.count()
+        self.front_seq = itertools.count(-1, -1)
+
+    # Bookkeeping
+
+    def _count(self, operation):
+        self.mix[operation] += 1
+        self.operations += 1
+        if self.draining is not None:
+            self._migrate()
+        self.since_check += 1
+        if self.adaptive and self.since_check >= self.check_every:
+            self.since_check = 0
+            self._choose()
+
+    def estimated_cost(self, name):
+        """Microseconds per operation for the recent mix on one backend at the current size"""
+        total = sum(self.mix.values()) or 1
+        return sum(count / total * (fixed + per_task * self.size)
+                   for (fixed, per_task), count in ((COSTS[name][op], self.mix[op]) for op in OPERATIONS))
+
+    def _choose(self):
+        if self.draining is None:
+            current = self.estimated_cost(self.backend.name)
+            best = min(BACKENDS, key=self.estimated_cost)
+            if best != self.backend.name and self.estimated_cost(best) < current * (1 - self.hysteresis):
+                self.switch(best)
+        for operation in OPERATIONS:
+            self.mix[operation] *= self.decay
+
+    @feed_change
+    def switch(self, name):
+        """Move to another backend; the tasks follow a few at a time"""
+        if self.draining is not None:
+            self._migrate(all_tasks=True)
+        self.switches.append((self.operations, self.backend.name, name))
+        self.draining, self.backend = self.backend, BACKENDS[name]()
+        if self.migrate_step is None:
+            self._migrate(all_tasks=True)
+
+    def _migrate(self, all_tasks=False):
+        old, new = self.draining, self.backend
+        for _ in itertools.repeat(None) if all_tasks else range(self.migrate_step):
+            entry = old.pop()
+            if entry is None:
+                self.draining = None
+                return
+            new.insert(*entry)
+        if not len(old):
+            self.draining = None
+
+    def _added(self, record):
+        self.size += 1
+        self.counts.add(record.task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, record.task, record.plate_id, record.priority)
+
+    def _removed(self, record):
+        self.size -= 1
+        self.counts.discard(record.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, record.task, record.plate_id, record.priority)
+        if self.dedup is not None:
+            self.dedup.discard(record.task, record.plate_id)
+
+    # Operations
+
+    @instrument()
+    @feed_change
+    def add_task(self, task, plate_id, priority=None, front=False):
+        """Add a task behind its priority (ahead of it when front is set); False if dedup rejects it"""
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False  # The same task is already pending for this plate
+        record = TaskRecord(task, plate_id, priority)
+        rank = priority or 1
+        key = (rank, next(self.front_seq)) if front else (rank, next(self.back_seq))
+        if front:
+            operation = ADD_FRONT
+        else:
+            tails = [self.backend.tail_key()] + ([self.draining.tail_key()] if self.draining is not None else [])
+            tail = max((t for t in tails if t is not None), default=None)
+            operation = ADD_REAR if tail is None or key > tail else ADD_PRIORITY
+        self.backend.insert(key, record)
+        self._added(record)
+        self._count(operation)
+        return True
+
+    @instrument()
+    @feed_change
+    def remove_task(self):
+        """Remove and return the next TaskRecord, or None when empty"""
+        source = self.backend
+        if self.draining is not None:
+            new, old = self.backend.peek(), self.draining.peek()
+            if new is None or (old is not None and old[0] < new[0]):
+                source = self.draining
+        entry = source.pop()
+        if entry is None:
+            return None
+        self._removed(entry[1])
+        self._count(POP)
+        return entry[1]
+
+    @instrument()
+    def remove(self, task, plate_id):
+        """Remove a given task wherever it is, the oldest first; return its TaskRecord or None"""
+        return self._remove(task, plate_id, None)
+
+    def remove_record(self, record):
+        """Remove exactly the given TaskRecord"""
+        return self._remove(record.task, record.plate_id, record.id) is not None
+
+    @feed_change
+    def _remove(self, task, plate_id, record_id):
+        source = self.backend
+        if self.draining is not None:
+            # Migration moves the old backend's front across, so either one may hold the first match
+            new = self.backend.find_entry(task, plate_id, record_id)
+            old = self.draining.find_entry(task, plate_id, record_id)
+            if new is None or (old is not None and old[0] < new[0]):
+                source = self.draining
+        record = source.remove(task, plate_id, record_id)
+        if record is not None:
+            self._removed(record)
+        self._count(REMOVE)
+        return record
+
+    @instrument()
+    @feed_change  # Lookups can move tasks between backends too
+    def find(self, plate_id):
+        """Pending TaskRecords for a plate, oldest first"""
+        records = self.backend.find(plate_id)
+        if self.draining is not None:
+            records = sorted(records + self.draining.find(plate_id), key=lambda r: r.id)
+        self._count(SEARCH)
+        return records
+
+    def get_all_records(self):
+        """Get all TaskRecords in the order they will be removed"""
+        sources = [self.backend] if self.draining is None else [self.backend, self.draining]
+        return [record for _, record in heapq.merge(*sources, key=lambda entry: entry[0])]
+
+    @instrument()
+    def get_all_tasks(self):
+        """Get all tasks as a list of strings"""
+        return [record.label() for record in self.get_all_records()]
+
+    @property
+    def backend_name(self):
+        return self.backend.name
+
+    def stats(self):
+        total = sum(self.mix.values()) or 1
+        return {
+            "backend": self.backend.name,
+            "migrating": self.draining is not None,
+            "mix": {op: round(count / total, 3) for op, count in self.mix.items()},
+            "estimated_us": {name: round(self.estimated_cost(name), 2) for name in BACKENDS},
+            "switches": list(self.switches),
+        }
+
+
+def adaptive_from_env(**options):
+    """An AdaptiveQueue when MAINTENANCE_ADAPTIVE is set to 1, else None"""
+    if os.environ.get("MAINTENANCE_ADAPTIVE") != "1":
+        return None
+    return AdaptiveQueue(**options)
+
+
+PHASES = {
+    # Phase name -> cumulative probabilities of add, priority add, pop, remove and search
+    "FIFO": (0.5, 0.5, 1.0, 1.0, 1.0),
+    "LOOKUP": (0.3, 0.3, 0.4, 0.6, 1.0),
+    "PRIORITY": (0.0, 0.5, 1.0, 1.0, 1.0),
+}
+
+
+def workload(phases, phase_ops, backlog, seed=42):
+    """Operations for a backlog of plain adds, then phase_ops operations per phase"""
+    rng = random.Random(seed)
+    plate = itertools.count()
+    ops = [("add", next(plate), None) for _ in range(backlog)]
+    pending = list(range(backlog))  # Plates that may still be queued, as removal and search targets
+    for phase in phases:
+        thresholds = PHASES[phase]
+        for _ in range(phase_ops):
+            r = rng.random()
+            op = next(name for name, limit in zip(("add", "padd", "pop", "remove", "search"), thresholds) if r < limit)
+            if op in ("add", "padd"):
+                code = next(plate)
+                ops.append((op, code, rng.randint(1, 5) if op == "padd" else None))
+                pending.append(code)
+            elif op == "pop":
+                ops.append(("pop", None, None))
+            else:
+                ops.append((op, pending[rng.randrange(len(pending))] if pending else 0, None))
+    return ops
+
+
+def run(queue, ops, phase_ops, backlog):
+    """Time each phase and the slowest single operation"""
+    add, pop, remove, find = queue.add_task, queue.remove_task, queue.remove, queue.find
+    plates = {code: plate_from_code(code % 182_000) for _, code, _ in ops if code is not None}
+    phases = []
+    slowest = 0.0
+    for i, (op, code, priority) in enumerate(ops):
+        if i == backlog or (i > backlog and (i - backlog) % phase_ops == 0):
+            if i > backlog:
+                phases.append(time.perf_counter() - phase_start)
+            phase_start = time.perf_counter()
+        before = time.perf_counter()
+        if op == "add":
+            add("Oil Change", plates[code])
+        elif op == "padd":
+            add("Oil Change", plates[code], priority)
+        elif op == "pop":
+            pop()
+        elif op == "remove":
+            remove("Oil Change", plates[code])
+        else:
+            find(plates[code])
+        if i >= backlog:
+            slowest = max(slowest, time.perf_counter() - before)
+    phases.append(time.perf_counter() - phase_start)
+    return phases, slowest
+
+
+def benchmark(phases=("FIFO", "LOOKUP", "FIFO", "PRIORITY"), phase_ops=20_000, backlog=10_000):
+    ops = workload(phases, phase_ops, backlog)
+    print(f"{backlog:,} pending tasks, then {phase_ops:,} operations per phase")
+    print(f"{'QUEUE':<24}" + "".join(f"{name + ' s':>11}" for name in phases) + f"{'TOTAL s':>10}{'SLOWEST OP ms':>15}")
+    candidates = [(f"fixed {name}", dict(backend=name, adaptive=False)) for name in BACKENDS]
+    candidates += [("adaptive, incremental", dict()), ("adaptive, all at once", dict(migrate_step=None))]
+    for name, options in candidates:
+        queue = AdaptiveQueue(**options)
+        times, slowest = run(queue, ops, phase_ops, backlog)
+        print(f"{name:<24}" + "".join(f"{t:>11.2f}" for t in times) + f"{sum(times):>10.2f}{slowest * 1000:>15.2f}")
+        if queue.switches:
+            print(f"{'':<24}switched " + ", ".join(f"{a} -> {b} at op {n:,}" for n, a, b in queue.switches))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the adaptive queue against fixed backends")
+    parser.add_argument("--phases", nargs="+", choices=sorted(PHASES), default=["FIFO", "LOOKUP", "FIFO", "PRIORITY"])
+    parser.add_argument("--ops", type=int, default=20_000, help="operations per phase")
+    parser.add_argument("--backlog", type=int, default=10_000)
+    args = parser.parse_args()
+    benchmark(args.phases, args.ops, args.backlog)
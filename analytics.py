@@ -0,0 +1,125 @@
+"""Vectorized analytics over the pending backlog.
+
+The active structure is exported once into columnar NumPy arrays (task codes,
+plate codes, priorities, enqueue timestamps); every query afterwards is a
+handful of array operations instead of a walk over get_all_tasks() strings.
+
+Run ``python analytics.py`` to time the queries on 10M synthetic rows.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from records import PLATE_COUNT, TASK_NAMES, plate_code, plate_from_code, task_code
+
+MAX_PRIORITY = 5
+
+
+class TaskColumns:
+    """Columnar snapshot of pending tasks"""
+    def __init__(self, tasks, plates, priorities, enqueued_at):
+        self.tasks = np.asarray(tasks, dtype=np.int8)
+        self.plates = np.asarray(plates, dtype=np.int32)
+        self.priorities = np.asarray(priorities, dtype=np.int8)
+        self.enqueued_at = np.asarray(enqueued_at, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (task, plate_id, priority, enqueued_at) tuples"""
+        rows = list(rows)
+        return cls([task_code(r[0]) for r in rows], [plate_code(r[1]) for r in rows],
+                   [r[2] for r in rows], [r[3] for r in rows])
+
+    @classmethod
+    def from_structure(cls, structure):
+        """Export any tracker structure: the 2.py-7.py structures, a SharedTaskTable, or anything with get_all_records()"""
+        return cls.from_rows(iter_structure(structure))
+
+    def counts_by_task_priority(self):
+        """Matrix of pending counts, rows indexed by task code and columns by priority 0-5"""
+        width = MAX_PRIORITY + 1
+        flat = np.bincount(self.tasks.astype(np.int64) * width + self.priorities,
+                           minlength=len(TASK_NAMES) * width)
+        return flat.reshape(len(TASK_NAMES), width)
+
+    def counts_by_task(self):
+        """Pending count per task name"""
+        counts = np.bincount(self.tasks, minlength=len(TASK_NAMES))
+        return dict(zip(TASK_NAMES, counts.tolist()))
+
+    def plate_counts(self):
+        return np.bincount(self.plates, minlength=PLATE_COUNT)
+
+    def plates_with_more_than(self, jobs):
+        """Plate IDs with more than the given number of pending jobs"""
+        return [plate_from_code(code) for code in np.flatnonzero(self.plate_counts() > jobs).tolist()]
+
+    def top_plates(self, k=10):
+        """The k plates with the most pending jobs, as (plate_id, count), busiest first"""
+        counts = self.plate_counts()
+        k = min(k, len(counts))
+        top = np.argpartition(counts, -k)[-k:]
+        top = top[np.argsort(-counts[top], kind="stable")]
+        return [(plate_from_code(code), int(counts[code])) for code in top.tolist() if counts[code]]
+
+    def age_histogram(self, bins=10, now=None):
+        """Histogram of task ages in hours; returns (counts, bin edges)"""
+        now = time.time() if now is None else now
+        ages = (now - self.enqueued_at[~np.isnan(self.enqueued_at)]) / 3600.0
+        return np.histogram(ages, bins=bins)
+
+
+def iter_structure(structure):
+    """Yield (task, plate_id, priority, enqueued_at) from any tracker structure"""
+    nan = float("nan")
+    if isinstance(structure, list):  # 2.py keeps a list of TaskRecords
+        for record in structure:
+            yield record.task, record.plate_id, record.priority or 0, record.enqueued_at
+    elif hasattr(structure, "snapshot"):  # SharedTaskTable
+        for task, plate, priority in structure.snapshot():
+            yield TASK_NAMES[task], plate_from_code(plate), priority, nan
+    elif hasattr(structure, "get_all_records"):  # 3.py-5.py, 7.py and the queue/store modules
+        for record in structure.get_all_records():
+            yield record.task, record.plate_id, record.priority or 0, record.enqueued_at
+    else:  # TaskTree in 6.py: only nodes carrying a plate ID are jobs
+        stack = [structure.root] if structure.root else []
+        while stack:
+            node = stack.pop()
+            if node.plate_id:
+                yield node.task, node.plate_id, 0, getattr(node, "enqueued_at", nan)
+            stack.extend(reversed(node.children))
+
+
+def synthetic(rows, seed=42):
+    """Random columns for benchmarking"""
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    return TaskColumns(rng.integers(0, len(TASK_NAMES), rows, dtype=np.int8),
+                       rng.integers(0, PLATE_COUNT, rows, dtype=np.int32),
+                       rng.integers(1, MAX_PRIORITY + 1, rows, dtype=np.int8),
+                       now - rng.random(rows) * 30 * 24 * 3600)
+
+
+def benchmark(rows=10_000_000):
+    columns = synthetic(rows)
+    queries = [
+        ("counts by task x priority", columns.counts_by_task_priority),
+        ("plates with > 3 pending", lambda: columns.plates_with_more_than(3)),
+        ("top 10 plates", lambda: columns.top_plates(10)),
+        ("age histogram", columns.age_histogram),
+    ]
+    print(f"{rows:,} rows")
+    for name, query in queries:
+        start = time.perf_counter()
+        query()
+        print(f"  {name:<28}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the backlog analytics queries")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    benchmark(parser.parse_args().rows)
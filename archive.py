@@ -0,0 +1,409 @@
+"""Archive of completed tasks for per-plate service history.
+
+Every task an operator completes in an app is appended here. Completed
+tasks are written in columns and split into one partition per month. Each
+partition is a set of run files:
+
+- a run is sorted by (plate, completed time) and cut into blocks of
+  ``block_rows`` rows;
+- in a block, each column is stored as an int array, plates and times
+  as deltas from the previous row, and compressed with zlib;
+- a run ends with a sparse index: the first and last plate of every
+  block and its time span.
+
+A query for one plate opens only the partitions that overlap the time
+range. It bisects each run's index and decompresses only the blocks that
+can hold the plate, so "all services for RAD789K in Q3" reads a handful
+of blocks whatever the size of the archive. A time range over every
+plate is pruned by partition only, as each run is ordered by plate.
+
+Tasks are buffered and written as a new run every ``flush_rows`` rows and
+on close. compact() merges the runs of a partition into one; a run that
+a query is still reading is deleted when that query finishes.
+
+Set MAINTENANCE_ARCHIVE_DIR to have the apps archive the tasks they
+complete. Run ``python archive.py`` to benchmark writing and querying a
+large history.
+"""
+import argparse
+import atexit
+import bisect
+import calendar
+import heapq
+import json
+import operator
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from itertools import accumulate
+
+from changefeed import COMPLETED
+from records import PLATE_COUNT, TASK_NAMES, plate_code, plate_from_code, task_code
+
+ArchivedTask = namedtuple("ArchivedTask", "task plate_id priority completed_at")
+
+MAGIC = b"MTAR0001"
+BLOCK = struct.Struct("<IIIII")  # Rows, then compressed length of the plate, time, task and priority columns
+FOOTER = struct.Struct("<Q8s")  # Length of the JSON index, magic
+
+
+def month_key(timestamp):
+    """Partition name, such as 2026-07, for a Unix time"""
+    t = time.gmtime(timestamp)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}"
+
+
+def _row(task, plate_id, completed_at=None, priority=None):
+    """Archive row (plate code, completed at, task code, priority) for one completed task"""
+    completed_at = int(time.time() if completed_at is None else completed_at)
+    return plate_code(plate_id), completed_at, task_code(task), -1 if priority is None else priority
+
+
+def month_range(key):
+    """Start and end (exclusive) of a partition as Unix times"""
+    year, month = map(int, key.split("-"))
+    start = calendar.timegm((year, month, 1, 0, 0, 0))
+    if month == 12:
+        year, month = year + 1, 0
+    return start, calendar.timegm((year, month + 1, 1, 0, 0, 0))
+
+
+def quarter(year, number):
+    """Start and end (exclusive) of a calendar quarter, for query()"""
+    first = 3 * number - 2
+    return month_range(f"{year:04d}-{first:02d}")[0], month_range(f"{year:04d}-{first + 2:02d}")[1]
+
+
+def _deltas(values, typecode):
+    return array(typecode, map(operator.sub, values, (0,) + values[:-1]))
+
+
+def encode_block(rows, level=6):
+    """Pack rows of (plate code, completed time, task code, priority) into one block"""
+    plates, times, tasks, priorities = zip(*rows)
+    columns = [
+        zlib.compress(_deltas(plates, "i").tobytes(), level),
+        zlib.compress(_deltas(times, "q").tobytes(), level),
+        zlib.compress(bytes(tasks), level),
+        zlib.compress(array("b", priorities).tobytes(), level),
+    ]
+    return BLOCK.pack(len(rows), *map(len, columns)) + b"".join(columns)
+
+
+def decode_block(data):
+    """Unpack a block into its plate, time, task and priority columns"""
+    rows, *lengths = BLOCK.unpack_from(data)
+    columns = []
+    offset = BLOCK.size
+    for length in lengths:
+        columns.append(zlib.decompress(data[offset:offset + length]))
+        offset += length
+    plates = list(accumulate(array("i", columns[0])))
+    times = list(accumulate(array("q", columns[1])))
+    return plates, times, columns[2], array("b", columns[3])
+
+
+class RunWriter:
+    """Stream rows, already in (plate, time) order, into a run file"""
+    def __init__(self, path, block_rows, level=6):
+        self.path = path
+        self.block_rows = block_rows
+        self.level = level
+        self.file = open(path + ".tmp", "wb")
+        self.pending = []
+        self.blocks = []  # [offset, length, rows, first plate, last plate, min time, max time]
+
+    def add(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.block_rows:
+            self._write_block()
+
+    def _write_block(self):
+        rows = self.pending
+        times = [row[1] for row in rows]
+        payload = encode_block(rows, self.level)
+        self.blocks.append([self.file.tell(), len(payload), len(rows), rows[0][0], rows[-1][0], min(times), max(times)])
+        self.file.write(payload)
+        self.pending = []
+
+    def close(self):
+        if self.pending:
+            self._write_block()
+        index = json.dumps({"blocks": self.blocks}, separators=(",", ":")).encode()
+        self.file.write(index)
+        self.file.write(FOOTER.pack(len(index), MAGIC))
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)  # Readers only ever see complete runs
+
+
+class Run:
+    """A run file and its sparse index"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(-FOOTER.size, os.SEEK_END)
+            length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not an archive run: {path}")
+            f.seek(-FOOTER.size - length, os.SEEK_END)
+            self.blocks = json.loads(f.read(length))["blocks"]
+        self.last_plates = [block[4] for block in self.blocks]
+        self.rows = sum(block[2] for block in self.blocks)
+
+    def candidate_blocks(self, plate=None, start=None, end=None):
+        """Blocks that can hold rows for the plate (any plate when None) in [start, end)"""
+        if plate is None:
+            first, blocks = 0, self.blocks
+        else:
+            first = bisect.bisect_left(self.last_plates, plate)  # The first block that reaches the plate
+            blocks = self.blocks[first:]
+        for block in blocks:
+            if plate is not None and block[3] > plate:
+                break
+            if (start is None or block[6] >= start) and (end is None or block[5] < end):
+                yield block
+
+    def read_block(self, f, block):
+        f.seek(block[0])
+        return decode_block(f.read(block[1]))
+
+    def rows_in_order(self):
+        """Every row, in (plate, time) order, one block in memory at a time"""
+        with open(self.path, "rb") as f:
+            for block in self.blocks:
+                yield from zip(*self.read_block(f, block))
+
+
+class TaskArchive:
+    """Append-only store of completed tasks, partitioned by month"""
+    def __init__(self, directory, block_rows=4096, flush_rows=262144, level=6):
+        self.directory = directory
+        self.block_rows = block_rows
+        self.flush_rows = flush_rows
+        self.level = level
+        os.makedirs(directory, exist_ok=True)
+        self.buffer = {}  # Partition -> rows not yet written
+        self.buffered = 0
+        self.runs = {}  # Partition -> list of Run
+        self.next_run = 0
+        self.lock = threading.RLock()
+        self.pins = {}  # Run path -> queries reading it; compact() leaves pinned files for the last one to delete
+        self.retired = set()  # Compacted-away run files still pinned
+        self.subscription = None
+        self.blocks_read = 0
+        self.bytes_read = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".run"):
+                key, number, _ = name.split(".")
+                self.runs.setdefault(key, []).append(Run(os.path.join(directory, name)))
+                self.next_run = max(self.next_run, int(number) + 1)
+
+    def append(self, task, plate_id, completed_at=None, priority=None):
+        """Archive one completed task"""
+        self._append_rows([_row(task, plate_id, completed_at, priority)])
+
+    def _append_rows(self, rows):
+        with self.lock:
+            for row in rows:
+                self.buffer.setdefault(month_key(row[1]), []).append(row)
+            self.buffered += len(rows)
+            if self.buffered >= self.flush_rows:
+                self.flush()
+
+    def follow(self, feed):
+        """Archive every task completed in the apps publishing to a ChangeFeed; other removals are not work done"""
+        def archive_batch(events):
+            # Build every row first, so a bad event fails the batch before any of it is archived
+            self._append_rows([_row(event.task, event.plate_id, event.at, event.priority)
+                               for event in events if event.kind == COMPLETED])
+        self.subscription = feed.subscribe(archive_batch)
+        return self.subscription
+
+    def flush(self):
+        """Write the buffered tasks as one new run per partition"""
+        with self.lock:
+            for key, rows in self.buffer.items():
+                rows.sort()
+                writer = RunWriter(self._run_path(key), self.block_rows, self.level)
+                for row in rows:
+                    writer.add(row)
+                writer.close()
+                self.runs.setdefault(key, []).append(Run(writer.path))
+            self.buffer = {}
+            self.buffered = 0
+
+    def _run_path(self, key):
+        path = os.path.join(self.directory, f"{key}.{self.next_run:06d}.run")
+        self.next_run += 1
+        return path
+
+    def compact(self, key=None):
+        """Merge the runs of one partition (every partition when None) into a single run"""
+        with self.lock:
+            for key in [key] if key is not None else list(self.runs):
+                runs = self.runs.get(key, [])
+                if len(runs) < 2:
+                    continue
+                writer = RunWriter(self._run_path(key), self.block_rows, self.level)
+                for row in heapq.merge(*(run.rows_in_order() for run in runs)):
+                    writer.add(row)
+                writer.close()
+                self.runs[key] = [Run(writer.path)]
+                for run in runs:
+                    if self.pins.get(run.path):
+                        self.retired.add(run.path)
+                    else:
+                        os.remove(run.path)
+
+    def partitions(self, start=None, end=None):
+        """Partitions that overlap [start, end)"""
+        keys = sorted(set(self.runs) | set(self.buffer))
+        for key in keys:
+            first, last = month_range(key)
+            if (start is None or last > start) and (end is None or first < end):
+                yield key
+
+    def query(self, plate_id=None, start=None, end=None):
+        """Yield ArchivedTasks for a plate (all plates when None) completed in [start, end)
+
+        Within each run rows come in (plate, time) order; history() sorts one
+        plate's tasks by time.
+        """
+        plate = None if plate_id is None else plate_code(plate_id)
+        with self.lock:
+            partitions = list(self.partitions(start, end))
+            runs = [run for key in partitions for run in self.runs.get(key, [])]
+            buffered = [row for key in partitions for row in self.buffer.get(key, [])]
+            for run in runs:  # A compact() while we read must not delete these files
+                self.pins[run.path] = self.pins.get(run.path, 0) + 1
+        try:
+            for run in runs:
+                with open(run.path, "rb") as f:
+                    for block in run.candidate_blocks(plate, start, end):
+                        self.blocks_read += 1
+                        self.bytes_read += block[1]
+                        plates, times, tasks, priorities = run.read_block(f, block)
+                        if plate is None:
+                            lo, hi = 0, len(plates)
+                        else:
+                            lo, hi = bisect.bisect_left(plates, plate), bisect.bisect_right(plates, plate)
+                        for i in range(lo, hi):
+                            if (start is None or times[i] >= start) and (end is None or times[i] < end):
+                                yield self._task(plates[i], times[i], tasks[i], priorities[i])
+        finally:
+            self._unpin(runs)
+        for row in buffered:
+            if (plate is None or row[0] == plate) and (start is None or row[1] >= start) and (end is None or row[1] < end):
+                yield self._task(*row)
+
+    def _unpin(self, runs):
+        """Release a query's runs, deleting any that compact() replaced while it read them"""
+        with self.lock:
+            for run in runs:
+                self.pins[run.path] -= 1
+                if not self.pins[run.path]:
+                    del self.pins[run.path]
+                    if run.path in self.retired:
+                        self.retired.discard(run.path)
+                        os.remove(run.path)
+
+    @staticmethod
+    def _task(plate, completed_at, task, priority):
+        return ArchivedTask(TASK_NAMES[task], plate_from_code(plate), None if priority < 0 else priority, completed_at)
+
+    def history(self, plate_id, start=None, end=None):
+        """A plate's completed tasks in [start, end), oldest first"""
+        return sorted(self.query(plate_id, start, end), key=operator.attrgetter("completed_at"))
+
+    def stats(self):
+        with self.lock:
+            runs = [run for runs in self.runs.values() for run in runs]
+            return {
+                "partitions": len(self.runs),
+                "runs": len(runs),
+                "rows": sum(run.rows for run in runs),
+                "buffered": self.buffered,
+                "bytes": sum(os.path.getsize(run.path) for run in runs),
+                "blocks_read": self.blocks_read,
+                "bytes_read": self.bytes_read,
+            }
+
+    def close(self):
+        if self.subscription is not None:
+            self.subscription.feed.flush()  # Take in the events still waiting in the feed
+            self.subscription.close()
+            self.subscription = None
+        self.flush()
+
+
+def archive_from_env(feed):
+    """Archive the tasks completed in a feed's app when MAINTENANCE_ARCHIVE_DIR is set"""
+    directory = os.environ.get("MAINTENANCE_ARCHIVE_DIR")
+    if not directory:
+        return None
+    archive = TaskArchive(directory)
+    archive.follow(feed)
+    atexit.register(archive.close)  # Write out what is still buffered when the app exits
+    return archive
+
+
+def benchmark(records=100_000_000, directory=None, queries=200, seed=42):
+    """Write a synthetic two-year history, compact it, then time plate and range queries"""
+    rng = random.Random(seed)
+    own_directory = directory is None
+    directory = directory or tempfile.mkdtemp(prefix="archive-bench-")
+    archive = TaskArchive(directory)
+    start_time = calendar.timegm((2024, 1, 1, 0, 0, 0))
+    step = 2 * 365 * 86400 / records
+    print(f"writing {records:,} completed tasks to {directory}")
+    started = time.perf_counter()
+    append = archive.append
+    for i in range(records):
+        plate = plate_from_code(rng.randrange(PLATE_COUNT))
+        append(TASK_NAMES[i % len(TASK_NAMES)], plate, start_time + i * step, i % 5 + 1)
+    archive.flush()
+    write_s = time.perf_counter() - started
+    started = time.perf_counter()
+    archive.compact()
+    compact_s = time.perf_counter() - started
+    stats = archive.stats()
+    print(f"  append {records / write_s:>12,.0f} tasks/s   compact {compact_s:.1f}s   "
+          f"{stats['bytes'] / 2 ** 20:,.1f} MiB on disk ({stats['bytes'] / records:.2f} bytes/task, "
+          f"{stats['partitions']} partitions)")
+
+    q3 = quarter(2025, 3)
+    plates = [plate_from_code(rng.randrange(PLATE_COUNT)) for _ in range(queries)]
+    for name, span in (("one plate, Q3 2025", q3), ("one plate, all time", (None, None))):
+        archive.blocks_read = archive.bytes_read = 0
+        found = 0
+        started = time.perf_counter()
+        for plate in plates:
+            found += len(archive.history(plate, *span))
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<22}{elapsed * 1000 / queries:>8.2f} ms/query   {found / queries:>6.1f} tasks   "
+              f"{archive.blocks_read / queries:>5.1f} blocks ({archive.bytes_read / queries / 1024:,.0f} KiB) read")
+
+    archive.blocks_read = 0
+    day = (calendar.timegm((2025, 8, 1, 0, 0, 0)), calendar.timegm((2025, 8, 2, 0, 0, 0)))
+    started = time.perf_counter()
+    found = sum(1 for _ in archive.query(None, *day))
+    print(f"  {'every plate, one day':<22}{(time.perf_counter() - started) * 1000:>8.2f} ms         "
+          f"{found:>8,} tasks   {archive.blocks_read} blocks read")
+    if own_directory:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the completed-task archive")
+    parser.add_argument("--records", type=int, default=100_000_000)
+    parser.add_argument("--directory", help="keep the archive here instead of a temporary directory")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.records, args.directory, args.queries)
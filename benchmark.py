@@ -0,0 +1,420 @@
+"""Headless benchmark comparing the six task tracker structures.
+
+Usage:
+    python benchmark.py                       # sizes 10^1..10^4, text report
+    python benchmark.py --max-exp 7 --json report.json
+    python benchmark.py --structure 3 --structure 5   # only 3.py and 5.py
+    python benchmark.py --save-baseline       # store results as the baseline
+    python benchmark.py --compare             # flag regressions vs the baseline
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from records import TASK_NAMES, TaskRecord  # noqa: E402
+
+BASELINE_FILE = os.path.join(HERE, "benchmark_baseline.json")
+
+
+def load_script(name):
+    """Import one of the numbered scripts (2.py ... 7.py) without starting its GUI"""
+    return importlib.import_module(name)
+
+
+def make_plate(i):
+    return f"RA{'ABCDEFG'[i % 7]}{i % 1000:03d}{chr(65 + (i // 1000) % 26)}"
+
+
+class Unsupported(Exception):
+    """Raised by an adapter for an operation its structure does not offer"""
+
+
+class Adapter:
+    """Uniform driver over one structure; subclasses map to the real API"""
+    name = ""
+    script = ""  # Number of the script holding the structure
+
+    def push_rear(self, task, plate_id, priority):
+        raise Unsupported("push_rear")
+
+    def push_front(self, task, plate_id, priority):
+        raise Unsupported("push_front")
+
+    def pop_front(self):
+        raise Unsupported("pop_front")
+
+    def pop_rear(self):
+        raise Unsupported("pop_rear")
+
+    def contains(self, task, plate_id):
+        raise Unsupported("contains")
+
+    def finish_bulk(self):
+        """Hook run after a bulk load (e.g. a deferred sort)"""
+
+
+class ListAdapter(Adapter):
+    """2.py keeps a plain Python list of TaskRecords"""
+    name = "list (2.py)"
+    script = "2"
+
+    def __init__(self, size):
+        self.tasks = []
+
+    def push_rear(self, task, plate_id, priority):
+        self.tasks.append(TaskRecord(task, plate_id))
+
+    def push_front(self, task, plate_id, priority):
+        self.tasks.insert(0, TaskRecord(task, plate_id))
+
+    def pop_front(self):
+        return self.tasks.pop(0) if self.tasks else None
+
+    def pop_rear(self):
+        return self.tasks.pop() if self.tasks else None
+
+    def contains(self, task, plate_id):
+        return any(record.task == task and record.plate_id == plate_id for record in self.tasks)
+
+
+class LinkedAdapter(Adapter):
+    """Shared search for the head/next linked lists"""
+    def contains(self, task, plate_id):
+        current = self.tasks.head
+        while current:
+            if current.task == task and current.plate_id == plate_id:
+                return True
+            current = current.next
+        return False
+
+    def pop_front(self):
+        return self.tasks.remove_task()
+
+
+class SinglyAdapter(LinkedAdapter):
+    name = "SinglyLinkedList (3.py)"
+    script = "3"
+
+    def __init__(self, size):
+        self.tasks = load_script("3").SinglyLinkedList()
+
+    def push_rear(self, task, plate_id, priority):
+        self.tasks.add_task(task, plate_id)
+
+
+class TreeAdapter(Adapter):
+    name = "BinaryTree (4.py)"
+    script = "4"
+
+    def __init__(self, size):
+        self.tasks = load_script("4").BinaryTree(max_size=size + 1)
+
+    def push_rear(self, task, plate_id, priority):
+        self.tasks.insert(task, plate_id)
+
+    def pop_front(self):
+        node = self.tasks.root
+        if node is None:
+            return None
+        while node.left:
+            node = node.left
+        self.tasks.remove(node.task, node.plate_id)
+        return node
+
+    def contains(self, task, plate_id):
+        return self.tasks.find(task, plate_id) is not None
+
+
+class DoublyAdapter(LinkedAdapter):
+    name = "DoublyLinkedList (5.py)"
+    script = "5"
+
+    def __init__(self, size):
+        self.tasks = load_script("5").DoublyLinkedList()
+
+    def push_rear(self, task, plate_id, priority):
+        self.tasks.add_task(task, plate_id)
+
+
+class TaskTreeAdapter(Adapter):
+    name = "TaskTree (6.py)"
+    script = "6"
+
+    def __init__(self, size):
+        module = load_script("6")
+        self.tasks = module.TaskTree()
+        self.tasks.set_root(module.TreeNode("Maintenance"))
+
+    def push_rear(self, task, plate_id, priority):
+        self.tasks.add_task("Maintenance", task, plate_id)
+
+    def pop_front(self):
+        children = self.tasks.root.children
+        if not children:
+            return None
+        node = next(iter(children))
+        self.tasks.remove_task(node)
+        return node
+
+    def contains(self, task, plate_id):
+        for child in self.tasks.root.children:
+            if child.task == task and child.plate_id == plate_id:
+                return True
+        return False
+
+
+class PriorityAdapter(LinkedAdapter):
+    """7.py re-sorts the whole list after every add, as its GUI does"""
+    name = "priority DoublyLinkedList (7.py)"
+    script = "7"
+
+    def __init__(self, size):
+        self.tasks = load_script("7").DoublyLinkedList()
+        self.bulk = False
+
+    def push_rear(self, task, plate_id, priority):
+        self.tasks.add_task(task, plate_id, priority)
+        if not self.bulk:
+            self.tasks.insertion_sort()
+
+    def finish_bulk(self):
+        self.tasks.insertion_sort()
+
+
+ADAPTERS = [ListAdapter, SinglyAdapter, TreeAdapter, DoublyAdapter, TaskTreeAdapter, PriorityAdapter]
+
+
+def workload_fifo_churn(adapter, n, rng):
+    """Keep n/10 tasks pending while n tasks flow through"""
+    window = max(1, n // 10)
+    for i in range(n):
+        adapter.push_rear(TASK_NAMES[i % len(TASK_NAMES)], make_plate(i), i % 5 + 1)
+        if i >= window:
+            adapter.pop_front()
+
+
+def workload_front_rear_mix(adapter, n, rng):
+    """Random adds and removes at both ends"""
+    for i in range(n):
+        task, plate = TASK_NAMES[i % len(TASK_NAMES)], make_plate(i)
+        choice = rng.random()
+        if choice < 0.3:
+            adapter.push_front(task, plate, 1)
+        elif choice < 0.6:
+            adapter.push_rear(task, plate, 1)
+        elif choice < 0.8:
+            adapter.pop_front()
+        else:
+            adapter.pop_rear()
+
+
+def workload_priority_heavy(adapter, n, rng):
+    """Random-priority adds followed by draining in order"""
+    for i in range(n):
+        adapter.push_rear(TASK_NAMES[i % len(TASK_NAMES)], make_plate(i), rng.randint(1, 5))
+    for _ in range(n):
+        adapter.pop_front()
+
+
+def workload_search_heavy(adapter, n, rng):
+    """Load n tasks, then run n/10 lookups (half of them misses)"""
+    adapter.bulk = True
+    for i in range(n):
+        adapter.push_rear(TASK_NAMES[i % len(TASK_NAMES)], make_plate(i), i % 5 + 1)
+    adapter.finish_bulk()
+    for _ in range(max(1, n // 10)):
+        i = rng.randrange(2 * n)
+        adapter.contains(TASK_NAMES[i % len(TASK_NAMES)], make_plate(i))
+
+
+def workload_bulk_load(adapter, n, rng):
+    """Load n tasks in one go"""
+    adapter.bulk = True
+    for i in range(n):
+        adapter.push_rear(TASK_NAMES[rng.randrange(len(TASK_NAMES))], make_plate(i), i % 5 + 1)
+    adapter.finish_bulk()
+
+
+WORKLOADS = {
+    "fifo_churn": workload_fifo_churn,
+    "front_rear_mix": workload_front_rear_mix,
+    "priority_heavy": workload_priority_heavy,
+    "search_heavy": workload_search_heavy,
+    "bulk_load": workload_bulk_load,
+}
+
+
+def _run_once(adapter_cls, workload, n, seed):
+    adapter = adapter_cls(n)
+    try:
+        workload(adapter, n, random.Random(seed))
+    except Unsupported as error:
+        return f"n/a ({error})"
+    except RecursionError:
+        return "recursion limit"
+    return "ok"
+
+
+def run_cell(adapter_cls, workload, n, seed=42):
+    """Run one workload at one size; return a result dict.
+
+    Time and peak memory are measured in separate runs so tracemalloc
+    overhead does not inflate the timings.
+    """
+    start = time.perf_counter()
+    status = _run_once(adapter_cls, workload, n, seed)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if status == "ok":
+        tracemalloc.start()
+        _run_once(adapter_cls, workload, n, seed)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"seconds": elapsed, "peak_bytes": peak, "status": status}
+
+
+def run_suite(max_exp=4, budget=10.0, workloads=None, structures=None):
+    """Run every structure x workload x size; stop growing a cell once it exceeds budget seconds"""
+    for name in ("3", "4", "5", "6", "7"):
+        load_script(name)  # Keep import time out of the first measurement
+    results = {}
+    for adapter_cls in ADAPTERS:
+        if structures and adapter_cls.script not in structures:
+            continue
+        for workload_name, workload in WORKLOADS.items():
+            if workloads and workload_name not in workloads:
+                continue
+            for exp in range(1, max_exp + 1):
+                n = 10 ** exp
+                result = run_cell(adapter_cls, workload, n)
+                results[f"{adapter_cls.name}|{workload_name}|{n}"] = result
+                if result["status"] != "ok" or result["seconds"] > budget:
+                    break  # Larger sizes would only take longer
+    return results
+
+
+def wide_tree_benchmark(children=1_000_000, operations=10000, seed=42):
+    """Time detach, move and bulk subtree delete on a TaskTree with many children under the root"""
+    module = load_script("6")
+    rng = random.Random(seed)
+    tree = module.TaskTree()
+    tree.set_root(module.TreeNode("Maintenance"))
+    start = time.perf_counter()
+    nodes = []
+    for i in range(children):
+        node = module.TreeNode(TASK_NAMES[i % len(TASK_NAMES)], make_plate(i))
+        tree.root.add_child(node)
+        nodes.append(node)
+    timings = {"build": time.perf_counter() - start}
+
+    # Move random tasks under a bay node, then move them back
+    bay = module.TreeNode("Bay 1")
+    tree.root.add_child(bay)
+    picked = rng.sample(nodes, operations)
+    start = time.perf_counter()
+    for node in picked:
+        tree.move_task(node, bay)
+    for node in picked:
+        tree.move_task(node, tree.root)
+    timings["move (x2)"] = time.perf_counter() - start
+
+    # Detach single tasks at random positions
+    start = time.perf_counter()
+    for node in rng.sample(nodes, operations):
+        tree.remove_task(node)
+    timings["remove"] = time.perf_counter() - start
+
+    # Bulk delete: put half of the remaining tasks under the bay, then drop the bay
+    for node in list(tree.root.children)[:tree.root.size // 2]:
+        if node is not bay:
+            tree.move_task(node, bay)
+    moved = bay.size - 1
+    start = time.perf_counter()
+    tree.remove_task(bay)
+    timings[f"subtree delete ({moved:,} tasks)"] = time.perf_counter() - start
+
+    print(f"Wide TaskTree with {children:,} children, {operations:,} operations per step")
+    for name, seconds in timings.items():
+        print(f"  {name:<36}{seconds * 1000:>10.1f} ms")
+    print(f"  remaining nodes (O(1) count)       {tree.count():>10,}")
+    return timings
+
+
+def compare(results, baseline, threshold=1.25, min_seconds=0.005):
+    """Return cells that got more than threshold times slower than the baseline"""
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if not old or result["status"] != "ok" or old["status"] != "ok":
+            continue
+        if result["seconds"] > min_seconds and result["seconds"] > old["seconds"] * threshold:
+            regressions.append((key, old["seconds"], result["seconds"]))
+    return regressions
+
+
+def format_report(results):
+    lines = [f"{'STRUCTURE':<34}{'WORKLOAD':<16}{'N':>10}{'TIME (s)':>12}{'PEAK MEM':>12}  STATUS"]
+    lines.append("-" * 96)
+    for key, result in results.items():
+        structure, workload, n = key.split("|")
+        lines.append(f"{structure:<34}{workload:<16}{int(n):>10,}{result['seconds']:>12.4f}"
+                     f"{result['peak_bytes'] / 1024:>10.0f}KB  {result['status']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the task tracker structures")
+    parser.add_argument("--max-exp", type=int, default=4, help="largest size as a power of ten (1-7)")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds after which larger sizes are skipped")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS), help="limit to these workloads")
+    parser.add_argument("--structure", action="append", choices=[a.script for a in ADAPTERS],
+                        help="limit to the structures of these scripts (2-7)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file for --save-baseline/--compare")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="report regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    parser.add_argument("--wide-tree", type=int, metavar="N", help="only run the wide TaskTree benchmark with N children")
+    args = parser.parse_args(argv)
+
+    if args.wide_tree:
+        wide_tree_benchmark(args.wide_tree)
+        return 0
+
+    results = run_suite(min(max(args.max_exp, 1), 7), args.budget, args.workload, args.structure)
+    print(format_report(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for key, old, new in regressions:
+                print(f"  {key}: {old:.4f}s -> {new:.4f}s ({new / old:.2f}x)")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""Bounded capacity with overflow policies for any of the tracker structures.
+
+BoundedQueue wraps a core structure (the list of 2.py, SinglyLinkedList,
+BinaryTree, DoublyLinkedList, the priority DoublyLinkedList or an
+AdaptiveQueue) and keeps it
+at or below a fixed capacity. When a task arrives at a full queue the policy
+decides what happens:
+
+    reject                - refuse the new task
+    drop-oldest           - evict the task that has waited longest
+    drop-lowest-priority  - evict the least urgent task (highest priority number)
+    spill                 - park the new task on disk until space frees up
+    block                 - make the producer wait for space (put / put_async)
+
+offer() returns True when the task is pending (or spilled), False when it
+was turned away or dropped and None when the structure's PendingTaskSet
+already holds it. Spilled tasks stay in that PendingTaskSet while on disk,
+and one the structure refuses when it is read back counts as rejected. The apps get their queue from bounded_from_env(), sized
+by MAINTENANCE_CAPACITY with the policy in MAINTENANCE_OVERFLOW. A GUI
+never waits for space, so there block turns new tasks away like reject.
+
+Run ``python capacity.py`` for a burst-load benchmark of every policy.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from records import TaskRecord
+
+REJECT = "reject"
+DROP_OLDEST = "drop-oldest"
+DROP_LOWEST_PRIORITY = "drop-lowest-priority"
+SPILL = "spill"
+BLOCK = "block"
+POLICIES = (REJECT, DROP_OLDEST, DROP_LOWEST_PRIORITY, SPILL, BLOCK)
+
+
+class FileSpill:
+    """FIFO of overflow tasks kept in a JSON-lines file"""
+    def __init__(self, path=None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="maintenance-spill-", suffix=".jsonl")
+            os.close(fd)
+        self.path = path
+        self.writer = open(path, "a", encoding="utf-8")
+        self.reader = open(path, "r", encoding="utf-8")
+        self.count = 0
+
+    def put(self, task, plate_id, priority):
+        self.writer.write(json.dumps([task, plate_id, priority]) + "\n")
+        self.count += 1
+
+    def get(self):
+        """Return the oldest spilled (task, plate_id, priority), or None"""
+        if not self.count:
+            return None
+        self.writer.flush()
+        task, plate_id, priority = json.loads(self.reader.readline())
+        self.count -= 1
+        if not self.count:
+            # Everything has been read back: start the file over
+            self.writer.truncate(0)
+            self.writer.seek(0)
+            self.reader.seek(0)
+        return task, plate_id, priority
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.writer.close()
+        self.reader.close()
+        os.remove(self.path)
+
+
+class BoundedQueue:
+    """Capacity-limited front for a tracker structure"""
+    def __init__(self, structure, capacity, policy=REJECT, spill=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy!r}")
+        self.structure = structure
+        self.capacity = capacity
+        self.policy = policy
+        self.spill = spill if spill is not None else (FileSpill() if policy == SPILL else None)
+        self.space = threading.Condition()
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.waits = 0
+
+    # Structure adapters
+
+    def __len__(self):
+        if isinstance(self.structure, list):
+            return len(self.structure)
+        return self.structure.size
+
+    def _add(self, task, plate_id, priority):
+        structure = self.structure
+        if isinstance(structure, list):
+            structure.append(TaskRecord(task, plate_id, priority))
+            return True
+        if hasattr(structure, "insert"):  # BinaryTree: None for a duplicate
+            return structure.insert(task, plate_id)
+        if hasattr(structure, "insertion_sort"):  # Priority list in 7.py
+            added = structure.add_task(task, plate_id, priority or 1)
+            structure.insertion_sort()
+            return added or None
+        if hasattr(structure, "switch"):  # AdaptiveQueue keeps its own priority order
+            return structure.add_task(task, plate_id, priority) or None
+        return structure.add_task(task, plate_id) or None  # The lists only refuse duplicates
+
+    def _records(self):
+        if isinstance(self.structure, list):
+            return list(self.structure)
+        return self.structure.get_all_records()
+
+    def _remove_record(self, record):
+        """Remove one specific record; used by the drop policies"""
+        if isinstance(self.structure, list):
+            self.structure.remove(record)
+        else:
+            self.structure.remove_record(record)
+
+    def _take(self):
+        """Remove the next task in the structure's own order"""
+        structure = self.structure
+        if isinstance(structure, list):
+            return structure.pop(0) if structure else None
+        if hasattr(structure, "insert"):  # BinaryTree: first in sorted order
+            node = structure.select(0)
+            if node is None:
+                return None
+            record = node.record
+            structure.remove_record(record)
+            return record
+        return structure.remove_task()
+
+    def _least_urgent(self):
+        """The task drop-lowest-priority evicts from a priority structure, or None"""
+        structure = self.structure
+        if hasattr(structure, "insertion_sort"):  # Kept sorted, so the least urgent task is at the tail
+            return structure.tail.record if structure.tail is not None else None
+        if hasattr(structure, "switch"):
+            records = structure.get_all_records()
+            return records[-1] if records else None
+        return None
+
+    def _evict(self):
+        structure = self.structure
+        if not len(self):
+            return False
+        if self.policy == DROP_LOWEST_PRIORITY and hasattr(structure, "insertion_sort"):
+            structure.remove_node(structure.tail)
+        elif self.policy == DROP_LOWEST_PRIORITY and hasattr(structure, "switch"):
+            structure.remove_record(self._least_urgent())
+        elif isinstance(structure, list) or not hasattr(structure, "insert"):
+            self._take()  # FIFO structures: the front is the oldest task
+        else:
+            records = self._records()
+            self._remove_record(min(records, key=lambda r: r.enqueued_at))
+        self.dropped += 1
+        return True
+
+    # Producer side
+
+    def offer(self, task, plate_id, priority=None):
+        """Add a task without waiting; return True if it is now pending (or spilled)"""
+        with self.space:
+            return self._offer(task, plate_id, priority)
+
+    def _offer(self, task, plate_id, priority):
+        dedup = getattr(self.structure, "dedup", None)
+        if dedup is not None and (task, plate_id) in dedup:
+            return None  # Already pending: evicting or spilling for it would lose a task
+        if len(self) < self.capacity and not (self.spill and len(self.spill)):
+            added = self._add(task, plate_id, priority)
+            self.accepted += bool(added)
+            return added
+        if self.policy == DROP_LOWEST_PRIORITY and priority is not None:
+            least_urgent = self._least_urgent()
+            if least_urgent is not None and (least_urgent.priority or 1) <= priority:
+                self.dropped += 1  # The new task is the least urgent one, so it is the one dropped
+                return False
+        if self.policy in (DROP_OLDEST, DROP_LOWEST_PRIORITY) and self._evict():
+            added = self._add(task, plate_id, priority)
+            self.accepted += bool(added)
+            return added
+        if self.policy == SPILL:
+            self.spill.put(task, plate_id, priority)
+            if dedup is not None:
+                dedup.add(task, plate_id)  # Held while on disk, so a second copy is seen as pending
+            self.spilled += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def put(self, task, plate_id, priority=None, timeout=None):
+        """Add a task, waiting for space when the policy is block"""
+        with self.space:
+            if self.policy == BLOCK:
+                if len(self) >= self.capacity:
+                    self.waits += 1
+                if not self.space.wait_for(lambda: len(self) < self.capacity, timeout):
+                    self.rejected += 1
+                    return False
+            return self._offer(task, plate_id, priority)
+
+    async def put_async(self, task, plate_id, priority=None, timeout=None, poll=0.005):
+        """Asyncio producer: wait for space without blocking the event loop"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.space:
+                if self.policy != BLOCK or len(self) < self.capacity:
+                    return self._offer(task, plate_id, priority)
+            if deadline is not None and time.monotonic() >= deadline:
+                self.rejected += 1
+                return False
+            await asyncio.sleep(poll)
+
+    # Consumer side
+
+    def get(self):
+        """Remove the next task, refill from the spill file and wake waiting producers"""
+        with self.space:
+            record = self._take()
+            self._refill()
+            return record
+
+    def remove_record(self, record):
+        """Remove one given task, such as the row picked in a GUI, refilling as get() does"""
+        with self.space:
+            self._remove_record(record)
+            self._refill()
+
+    def _refill(self):
+        dedup = getattr(self.structure, "dedup", None)
+        while self.spill and len(self.spill) and len(self) < self.capacity:
+            task, plate_id, priority = self.spill.get()
+            if dedup is not None:
+                dedup.discard(task, plate_id)  # The structure takes the key over as it adds the task
+            if not self._add(task, plate_id, priority):
+                self.rejected += 1  # Spilled, then turned away by the structure
+        self.space.notify_all()
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "spill_backlog": len(self.spill) if self.spill else 0,
+            "producer_waits": self.waits,
+        }
+
+    def close(self):
+        if self.spill:
+            self.spill.close()
+
+
+def bounded_from_env(structure, capacity=None):
+    """Front an app's structure with a BoundedQueue of MAINTENANCE_CAPACITY tasks (else capacity, else unbounded)"""
+    capacity = os.environ.get("MAINTENANCE_CAPACITY") or capacity
+    queue = BoundedQueue(structure, sys.maxsize if capacity is None else int(capacity),
+                         os.environ.get("MAINTENANCE_OVERFLOW", REJECT))
+    atexit.register(queue.close)  # Removes the spill file
+    return queue
+
+
+def burst_benchmark(structure_factory, capacity=1000, burst=50000, service_time=0.0001, policies=POLICIES):
+    """Push a burst much larger than capacity through each policy while a slower consumer drains"""
+    results = {}
+    for policy in policies:
+        queue = BoundedQueue(structure_factory(), capacity, policy)
+        stop = threading.Event()
+
+        def consume():
+            while not stop.is_set() or len(queue):
+                if queue.get() is not None:
+                    time.sleep(service_time)  # One bay finishing one task
+
+        consumer = threading.Thread(target=consume, daemon=True)
+        tracemalloc.start()
+        start = time.perf_counter()
+        consumer.start()
+        peak_size = 0
+        for i in range(burst):
+            plate = f"RA{'ABCDEFG'[i % 7]}{i % 1000:03d}{chr(65 + i // 1000 % 26)}"
+            queue.put("Oil Change", plate, i % 5 + 1, timeout=5)
+            peak_size = max(peak_size, len(queue))
+        stop.set()
+        consumer.join()
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = queue.stats()
+        queue.close()
+        results[policy] = dict(stats, seconds=elapsed, peak_size=peak_size, peak_kb=peak_bytes // 1024)
+        print(f"{policy:<22}{elapsed:>8.2f}s  peak size {peak_size:>6}  peak mem {peak_bytes // 1024:>7} KB  "
+              f"accepted {stats['accepted']:>6}  rejected {stats['rejected']:>6}  "
+              f"dropped {stats['dropped']:>6}  spilled {stats['spilled']:>6}  waits {stats['producer_waits']:>5}")
+    return results
+
+
+if __name__ == "__main__":
+    import importlib
+
+    parser = argparse.ArgumentParser(description="Burst-load benchmark for the overflow policies")
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--burst", type=int, default=50000)
+    parser.add_argument("--service-time", type=float, default=0.0001, help="consumer seconds per task")
+    args = parser.parse_args()
+    singly = importlib.import_module("3").SinglyLinkedList
+    print(f"SinglyLinkedList (3.py), capacity {args.capacity:,}, burst of {args.burst:,} tasks")
+    burst_benchmark(singly, args.capacity, args.burst, args.service_time)
@@ -0,0 +1,125 @@
+"""Shared task catalog and per-type pending counters.
+
+The catalog (task codes, display names and estimated durations) is built once
+per process by load_catalog() and gives every MaintenanceApp its dropdown
+options. TaskCounts is kept by each structure and updated on every add and
+remove, so reading how many tasks of a type are pending never needs a scan.
+"""
+import functools
+from collections import namedtuple
+
+from records import TASK_NAMES
+
+PROMPT = "Select an Operation"  # Default dropdown option
+
+# Estimated minutes per job, used for backlog estimates
+DURATIONS = {
+    "Oil Change": 30,
+    "Tire Rotation": 45,
+    "Brake Inspection": 40,
+    "Battery Check": 15,
+    "Filter Replacement": 20,
+    "Coolant Flush": 60,
+    "Alignment Check": 60,
+    "Spark Plug Replacement": 45,
+    "Timing Belt Inspection": 30,
+    "Transmission Fluid Change": 75,
+}
+
+TaskType = namedtuple("TaskType", "code name minutes")
+
+
+class TaskCatalog:
+    """The known task types, in dropdown order"""
+    def __init__(self, types):
+        self.types = list(types)
+        self.by_name = {task_type.name: task_type for task_type in self.types}
+
+    def names(self):
+        return [task_type.name for task_type in self.types]
+
+    def option(self, task, counts=None):
+        """Dropdown text for a task, annotated with its pending count when counts are given"""
+        if counts is None:
+            return task
+        return f"{task} ({counts[task]:,} pending)"
+
+    def options(self, counts=None):
+        """Dropdown values: the prompt followed by every task type"""
+        return [PROMPT] + [self.option(task_type.name, counts) for task_type in self.types]
+
+    def task_for_option(self, option):
+        """Get the task name behind a dropdown value, or None for the prompt"""
+        if option in self.by_name:
+            return option
+        name = option.rpartition(" (")[0]
+        return name if name in self.by_name else None
+
+    def backlog_minutes(self, counts):
+        """Estimated minutes of work pending, from the per-type counters"""
+        return sum(counts[task_type.name] * task_type.minutes for task_type in self.types)
+
+
+def update_task_options(catalog, dropdown, task_var, counts, shown_version):
+    """Annotate a task dropdown with pending counts, only when they have changed since shown_version.
+
+    The selected task stays selected. Returns the counts version now shown.
+    """
+    if counts.version == shown_version:
+        return shown_version
+    selected = catalog.task_for_option(task_var.get())
+    dropdown.config(values=catalog.options(counts))
+    if selected is not None:
+        task_var.set(catalog.option(selected, counts))
+    return counts.version
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog():
+    """Build the task catalog once and share it"""
+    return TaskCatalog(TaskType(code, name, DURATIONS[name]) for code, name in enumerate(TASK_NAMES))
+
+
+class TaskCounts:
+    """Pending tasks per type, maintained incrementally by a structure"""
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.version = 0  # Bumped on every change so views can skip redundant refreshes
+
+    def add(self, task):
+        self.counts[task] = self.counts.get(task, 0) + 1
+        self.total += 1
+        self.version += 1
+
+    def discard(self, task):
+        if not self.counts.get(task):
+            raise ValueError(f"No pending {task!r} task to discard")
+        self.counts[task] -= 1
+        self.total -= 1
+        self.version += 1
+
+    def update(self, other):
+        """Take in another structure's counts, e.g. when queues are merged"""
+        for task, count in other.items():
+            self.counts[task] = self.counts.get(task, 0) + count
+            self.total += count
+        self.version += 1
+
+    def subtract(self, other):
+        """Give back counts taken in by update, e.g. when a subtree is detached"""
+        for task, count in other.items():
+            self.counts[task] = self.counts.get(task, 0) - count
+            self.total -= count
+        self.version += 1
+
+    def clear(self):
+        self.counts = {}
+        self.total = 0
+        self.version += 1
+
+    def __getitem__(self, task):
+        return self.counts.get(task, 0)
+
+    def items(self):
+        return [(task, count) for task, count in self.counts.items() if count]
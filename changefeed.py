@@ -0,0 +1,284 @@
+"""Change feed: every structure mutation as an event that other systems can tail.
+
+A structure given a ChangeFeed publishes an "added" or "removed" event for
+each task it takes in or gives up. A task can be removed without being done
+(an overflow eviction, a deleted subtree, a merge or a move), so the apps
+also publish "completed", after the "removed", when the operator finishes a
+task. Events go into a bounded ring buffer with
+a global sequence number, so publishing is O(1) and never waits on a
+consumer. Subscribers read from their own cursor in batches, either by
+polling or through a callback run on the feed's dispatcher thread. A
+subscriber that falls more than the ring's capacity behind skips ahead and
+has the gap counted in ``missed``. A callback that raises is logged and
+then handed the same events one at a time, so one bad event costs only
+itself; events it took in before failing come round again, so a callback
+should take in a batch all or nothing or tolerate repeats.
+
+FeedServer republishes the feed on a local TCP socket as JSON lines, one
+batch per line; ``tail()`` is the matching client. Set MAINTENANCE_FEED_PORT
+to have the apps serve their feed.
+
+Run ``python changefeed.py`` to measure delivery rate in process and over the socket.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+
+ADDED = "added"
+REMOVED = "removed"
+COMPLETED = "completed"
+
+log = logging.getLogger(__name__)
+
+Event = namedtuple("Event", "seq kind task plate_id priority at")
+
+
+def feed_change(method):
+    """Run a structure method holding its feed's change lock, so a snapshot never sees a change without its event"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        if self.feed is None:
+            return method(self, *args, **kwargs)
+        with self.feed.changes:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class Subscription:
+    """A cursor into the feed"""
+    def __init__(self, feed, cursor, callback=None, batch_size=256):
+        self.feed = feed
+        self.cursor = cursor  # Sequence number of the next event to read
+        self.callback = callback
+        self.batch_size = batch_size
+        self.delivered = 0
+        self.missed = 0
+        self.failed = 0  # Events the callback raised on, even when handed alone
+
+    def poll(self, limit=None):
+        """Return the next batch of events (possibly empty) and advance the cursor"""
+        batch = self.feed.read(self, limit or self.batch_size)
+        self.delivered += len(batch)
+        return batch
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """Bounded in-process event log with batched delivery to subscribers"""
+    def __init__(self, capacity=65536, flush_interval=0.05):
+        self.capacity = capacity
+        self.events = [None] * capacity
+        self.seq = 0  # Sequence number the next event will get
+        self.lock = threading.Lock()
+        self.changes = threading.RLock()  # Held by @feed_change structure methods across a change and its events
+        self.subscribers = []
+        self.flush_interval = flush_interval
+        self.wakeup = threading.Event()
+        self.dispatcher = None
+
+    def publish(self, kind, task, plate_id, priority=None):
+        with self.lock:
+            seq = self.seq
+            self.events[seq % self.capacity] = Event(seq, kind, task, plate_id, priority, time.time())
+            self.seq = seq + 1
+        if self.dispatcher is not None and not seq % 1024:
+            self.wakeup.set()  # Deliver in bulk instead of waking per event
+
+    def subscribe(self, callback=None, batch_size=256, from_start=False):
+        """Follow the feed from now (or from the oldest retained event)
+
+        With a callback, batches are pushed from the dispatcher thread;
+        without one, the caller pulls them with Subscription.poll().
+        """
+        with self.lock:
+            cursor = max(0, self.seq - self.capacity) if from_start else self.seq
+            subscription = Subscription(self, cursor, callback, batch_size)
+            self.subscribers = self.subscribers + [subscription]
+        if callback is not None:
+            self._start_dispatcher()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscription]
+
+    def read(self, subscription, limit):
+        with self.lock:
+            oldest = max(0, self.seq - self.capacity)
+            if subscription.cursor < oldest:
+                subscription.missed += oldest - subscription.cursor  # Overwritten before it was read
+                subscription.cursor = oldest
+            end = min(self.seq, subscription.cursor + limit)
+            start, stop = subscription.cursor % self.capacity, end % self.capacity
+            if subscription.cursor == end:
+                batch = []
+            elif start < stop:
+                batch = self.events[start:stop]
+            else:
+                batch = self.events[start:] + self.events[:stop]
+            subscription.cursor = end
+        return batch
+
+    def _start_dispatcher(self):
+        if self.dispatcher is None:
+            self.dispatcher = threading.Thread(target=self._dispatch, name="changefeed", daemon=True)
+            self.dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Push every pending event to the callback subscribers"""
+        for subscription in self.subscribers:
+            if subscription.callback is None:
+                continue
+            while True:
+                batch = subscription.poll()
+                if not batch:
+                    break
+                try:
+                    subscription.callback(batch)
+                except Exception:  # A failing consumer must not stop delivery to the others
+                    log.exception("Change feed subscriber failed on a batch of %d events; retrying them one by one",
+                                  len(batch))
+                    self._deliver_singly(subscription, batch)
+
+    def _deliver_singly(self, subscription, batch):
+        for event in batch:
+            try:
+                subscription.callback([event])
+            except Exception:
+                subscription.failed += 1
+                log.exception("Change feed subscriber dropped event %d (%s %s %s)",
+                              event.seq, event.kind, event.task, event.plate_id)
+
+    def stats(self):
+        return {
+            "published": self.seq,
+            "retained": min(self.seq, self.capacity),
+            "subscribers": [{"cursor": s.cursor, "lag": self.seq - s.cursor, "delivered": s.delivered,
+                             "missed": s.missed, "failed": s.failed} for s in self.subscribers],
+        }
+
+
+class FeedServer:
+    """Serve a ChangeFeed on a local TCP socket, one JSON array of events per line"""
+    def __init__(self, feed, host="127.0.0.1", port=0, poll_interval=0.01):
+        self.feed = feed
+        self.poll_interval = poll_interval
+        self.listener = socket.create_server((host, port))
+        self.address = self.listener.getsockname()
+        self.running = True
+        threading.Thread(target=self._accept, name="changefeed-server", daemon=True).start()
+
+    def _accept(self):
+        while self.running:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return  # Listener closed
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        subscription = self.feed.subscribe(batch_size=4096)
+        try:
+            while self.running:
+                batch = subscription.poll()
+                if not batch:
+                    time.sleep(self.poll_interval)
+                    continue
+                connection.sendall((json.dumps(batch, separators=(",", ":")) + "\n").encode())
+        except OSError:
+            pass  # Client went away
+        finally:
+            subscription.close()
+            connection.close()
+
+    def close(self):
+        self.running = False
+        self.listener.close()
+
+
+def tail(host, port):
+    """Yield batches of Events from a FeedServer"""
+    with socket.create_connection((host, port)) as connection:
+        for line in connection.makefile("r", encoding="utf-8"):
+            yield [Event(*event) for event in json.loads(line)]
+
+
+def serve_from_env(feed):
+    """Start a FeedServer on MAINTENANCE_FEED_PORT when it is set"""
+    port = os.environ.get("MAINTENANCE_FEED_PORT")
+    return FeedServer(feed, port=int(port)) if port else None
+
+
+def benchmark(events=1_000_000):
+    """Events/sec from publish to a callback subscriber, then to a socket client"""
+    feed = ChangeFeed()
+    received = []
+    done = threading.Event()
+
+    def consume(batch):
+        received.append(len(batch))
+        if batch[-1].seq == events - 1:
+            done.set()
+
+    subscription = feed.subscribe(consume)
+    start = time.perf_counter()
+    for i in range(events):
+        feed.publish(ADDED, "Oil Change", "RAA123A", i % 5 + 1)
+    feed.flush()  # Deliver the tail here rather than waiting for the dispatcher's next round
+    done.wait(30)
+    elapsed = time.perf_counter() - start
+    print(f"in process: {sum(received):,} of {events:,} events in {elapsed:.2f}s "
+          f"({sum(received) / elapsed:,.0f}/sec, {subscription.missed:,} missed, "
+          f"mean batch {sum(received) / max(1, len(received)):,.0f})")
+    subscription.close()
+
+    # The socket path is slower per event, so give it a ring that holds the whole run
+    feed = ChangeFeed(capacity=events)
+    server = FeedServer(feed)
+    client_count = [0]
+    client_ready = threading.Event()
+    client_done = threading.Event()
+
+    def client():
+        stream = tail(*server.address)
+        client_ready.set()
+        for batch in stream:
+            client_count[0] += len(batch)
+            if batch[-1].seq == events - 1:
+                client_done.set()
+                return
+
+    threading.Thread(target=client, daemon=True).start()
+    client_ready.wait()
+    while not feed.subscribers:  # The server subscribes on its own thread once it accepts the client
+        time.sleep(0.001)
+    start = time.perf_counter()
+    for i in range(events):
+        feed.publish(REMOVED, "Oil Change", "RAA123A", i % 5 + 1)
+    client_done.wait(60)
+    elapsed = time.perf_counter() - start
+    missed = sum(s["missed"] for s in feed.stats()["subscribers"])
+    print(f"over socket: {client_count[0]:,} of {events:,} events in {elapsed:.2f}s "
+          f"({client_count[0] / elapsed:,.0f}/sec, {missed:,} missed)")
+    server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the change feed")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    benchmark(parser.parse_args().events)
@@ -0,0 +1,129 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Counting Bloom filter for fast, memory-bounded "probably seen" checks
+
+    Each slot is a one-byte counter rather than a bit, so a key can be
+    taken out again. A counter that reaches 255 stays there for good.
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        # Size the counter array and number of hashes for the expected capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.counters = bytearray(self.size)
+
+    def _positions(self, key):
+        """Derive hash_count bit positions from one digest (double hashing)"""
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        counters = self.counters
+        for pos in self._positions(key):
+            if counters[pos] < 255:
+                counters[pos] += 1
+
+    def discard(self, key):
+        """Take out a key that was added; removing one that was not corrupts the filter"""
+        counters = self.counters
+        for pos in self._positions(key):
+            if 0 < counters[pos] < 255:
+                counters[pos] -= 1
+
+    def clear(self):
+        self.counters = bytearray(self.size)
+
+    def __contains__(self, key):
+        counters = self.counters
+        return all(counters[pos] for pos in self._positions(key))
+
+
+class PendingTaskSet:
+    """Opt-in duplicate guard for pending (task, plate_id) pairs"""
+    def __init__(self, bloom_capacity=None, error_rate=0.01):
+        self.pending = set()
+        # Tasks bulk-imported with exact=False live only in the Bloom filter, so they cost no memory
+        self.bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self.approximate = 0  # Tasks held by the filter alone
+        self.accepted = 0
+        self.rejected = 0
+        self.bloom_rejected = 0
+
+    def add(self, task, plate_id):
+        """Record a pending task; return False if it is already pending"""
+        key = (task, plate_id)
+        if key in self.pending:
+            self.rejected += 1
+            return False
+        if self.approximate and key in self.bloom:
+            self.rejected += 1
+            self.bloom_rejected += 1
+            return False
+        self.pending.add(key)
+        self.accepted += 1
+        return True
+
+    def discard(self, task, plate_id):
+        """Forget a task once it has been removed from the queue"""
+        key = (task, plate_id)
+        if key in self.pending:
+            self.pending.remove(key)
+        elif self.approximate and key in self.bloom:
+            self.bloom.discard(key)  # Every pending task not in the set came in through the filter
+            self.approximate -= 1
+
+    def update(self, keys):
+        """Record many (task, plate_id) pairs that are already known to be pending, e.g. when queues are merged"""
+        self.pending.update(keys)
+
+    def clear(self):
+        self.pending.clear()
+        if self.bloom is not None:
+            self.bloom.clear()
+        self.approximate = 0
+
+    def __contains__(self, key):
+        return key in self.pending or bool(self.approximate and key in self.bloom)
+
+    def __len__(self):
+        return len(self.pending) + self.approximate
+
+    def bulk_import(self, tasks, exact=True):
+        """Filter an iterable of (task, plate_id) pairs, yielding only new ones.
+
+        With exact=False accepted tasks go into the Bloom filter only, so
+        memory stays bounded however many are imported, at the cost of
+        occasionally rejecting a task that is new. add(), discard() and
+        ``in`` see them all the same.
+        """
+        for task, plate_id in tasks:
+            key = (task, plate_id)
+            if exact or self.bloom is None:
+                if self.add(task, plate_id):
+                    yield key
+            elif key in self.pending:
+                self.rejected += 1
+            elif key in self.bloom:
+                self.rejected += 1
+                self.bloom_rejected += 1
+            else:
+                self.bloom.add(key)
+                self.approximate += 1
+                self.accepted += 1
+                yield key
+
+    def stats(self):
+        """Return duplicate-rejection metrics"""
+        total = self.accepted + self.rejected
+        return {
+            "pending": len(self),
+            "approximate": self.approximate,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "rejection_rate": self.rejected / total if total else 0.0,
+            "bloom_rejected": self.bloom_rejected,
+        }
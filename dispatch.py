@@ -0,0 +1,220 @@
+"""Work-stealing dispatch across per-bay deques.
+
+Every bay owns a deque of TaskRecords, the double-ended queue of 2.py: new
+work for a bay is pushed at its rear and the bay works through it from the
+front, in arrival order, so no task waits behind newer ones at its own bay.
+A bay that runs dry steals a batch from the front (the oldest work) of
+another bay, picking victims at random. Work stays at its home bay until an
+imbalance forces it to move.
+
+Run ``python dispatch.py`` for a simulation against a single shared FIFO
+(SinglyLinkedList from 3.py) and against fixed per-bay queues without stealing.
+It is run once with no transfer penalty, where only queueing differs, and
+once with the penalty for working on a car away from its home bay.
+"""
+import argparse
+import heapq
+import importlib
+import random
+from collections import deque
+
+from catalog import load_catalog
+from records import TASK_NAMES, TaskRecord, plate_from_code
+
+
+class BayDeque:
+    """One bay's work: new tasks join the rear; the owner and thieves take from the front"""
+    def __init__(self):
+        self.tasks = deque()
+
+    def push_rear(self, record):
+        self.tasks.append(record)
+
+    def pop_front(self):
+        return self.tasks.popleft() if self.tasks else None
+
+    def steal_front(self, count):
+        """Take up to count of the oldest tasks"""
+        tasks = self.tasks
+        return [tasks.popleft() for _ in range(min(count, len(tasks)))]
+
+    def __len__(self):
+        return len(self.tasks)
+
+
+class WorkStealingDispatcher:
+    """Per-bay deques with randomized, batched stealing"""
+    def __init__(self, bays, max_batch=4, attempts=None, seed=None):
+        self.deques = [BayDeque() for _ in range(bays)]
+        self.max_batch = max_batch
+        self.attempts = attempts or 2 * bays  # Victims tried before giving up
+        self.random = random.Random(seed)
+        self.steals = 0
+        self.stolen = 0
+
+    def submit(self, record, bay):
+        self.deques[bay].push_rear(record)
+
+    def next_task(self, bay):
+        """Next task for a bay: its own oldest, else stolen work, else None"""
+        record = self.deques[bay].pop_front()
+        if record is not None:
+            return record
+        if self._steal(bay):
+            return self.deques[bay].pop_front()
+        return None
+
+    def _steal(self, thief):
+        bays = len(self.deques)
+        if bays < 2:
+            return False
+        for _ in range(self.attempts):
+            victim = self.random.randrange(bays - 1)
+            victim += victim >= thief  # Any bay but the thief
+            available = len(self.deques[victim])
+            if available:
+                # Half the victim's backlog, so one steal evens the two bays out
+                batch = self.deques[victim].steal_front(min(self.max_batch, (available + 1) // 2))
+                own = self.deques[thief]
+                for record in batch:
+                    own.push_rear(record)  # The thief is empty, so the oldest stolen task runs next
+                self.steals += 1
+                self.stolen += len(batch)
+                return True
+        return False
+
+    def pending(self):
+        return sum(len(d) for d in self.deques)
+
+
+class SharedFifoDispatcher:
+    """Every bay takes the next task from one SinglyLinkedList"""
+    def __init__(self, bays):
+        self.queue = importlib.import_module("3").SinglyLinkedList()
+        self.records = {}  # Id of the queued copy -> submitted record; a plate can have several tasks
+
+    def submit(self, record, bay):
+        self.queue.add_task(record.task, record.plate_id)
+        self.records[self.queue.tail.record.id] = record
+
+    def next_task(self, bay):
+        queued = self.queue.remove_task()
+        return self.records.pop(queued.id) if queued else None
+
+
+class PartitionedDispatcher:
+    """Fixed per-bay FIFO queues and no stealing"""
+    def __init__(self, bays):
+        self.queues = [deque() for _ in range(bays)]
+
+    def submit(self, record, bay):
+        self.queues[bay].append(record)
+
+    def next_task(self, bay):
+        queue = self.queues[bay]
+        return queue.popleft() if queue else None
+
+
+def simulate(dispatcher, bays, tasks, load=0.9, skew=1.0, transfer=10.0, seed=42):
+    """Discrete-event run of the workshop; times are in minutes
+
+    Tasks arrive as a Poisson stream; each has a home bay drawn with weights
+    1 / (bay + 1) ** skew. Work done away from its home bay costs an extra
+    `transfer` minutes to move the car and the parts. The default of 10
+    minutes is a car driven across the workshop plus a trolley of parts,
+    about a quarter of the 42-minute mean job in the catalog.
+    """
+    rng = random.Random(seed)
+    minutes = {task_type.name: task_type.minutes for task_type in load_catalog().types}
+    mean_minutes = sum(minutes.values()) / len(minutes)
+    weights = [1 / (bay + 1) ** skew for bay in range(bays)]
+    rate = load * bays / mean_minutes  # Arrivals per minute
+
+    now = 0.0
+    events = []  # (time, kind, seq, payload)
+    meta = {}
+    for i in range(tasks):
+        now += rng.expovariate(rate)
+        task = TASK_NAMES[rng.randrange(len(TASK_NAMES))]
+        record = TaskRecord(task, plate_from_code(i))
+        home = rng.choices(range(bays), weights)[0]
+        meta[record.id] = (now, home, minutes[task] * rng.lognormvariate(-0.125, 0.5))  # Jitter with mean 1
+        heapq.heappush(events, (now, 0, i, record))
+
+    idle = set(range(bays))
+    busy = 0.0
+    overhead = 0.0
+    completion = []
+    seq = tasks
+    end = 0.0
+
+    def start_work(bay, now):
+        nonlocal busy, overhead, seq
+        record = dispatcher.next_task(bay)
+        if record is None:
+            idle.add(bay)
+            return
+        arrived, home, duration = meta[record.id]
+        extra = transfer if bay != home else 0.0
+        busy += duration
+        overhead += extra
+        seq += 1
+        heapq.heappush(events, (now + duration + extra, 1, seq, (bay, arrived)))
+
+    while events:
+        now, kind, _, payload = heapq.heappop(events)
+        if kind == 0:  # Arrival
+            dispatcher.submit(payload, meta[payload.id][1])
+            for bay in sorted(idle):  # Wake idle bays; they may steal the new task
+                idle.discard(bay)
+                start_work(bay, now)
+        else:  # A bay finished
+            bay, arrived = payload
+            completion.append(now - arrived)
+            end = now
+            start_work(bay, now)
+
+    completion.sort()
+
+    def pct(p):
+        return completion[min(len(completion) - 1, int(len(completion) * p / 100))]
+    return {
+        "utilization": busy / (bays * end),
+        "overhead": overhead / (bays * end),
+        "makespan_h": end / 60,
+        "p50_h": pct(50) / 60,
+        "p95_h": pct(95) / 60,
+        "p99_h": pct(99) / 60,
+        "max_h": completion[-1] / 60,
+    }
+
+
+def benchmark(bays=8, tasks=20000, load=0.9, skew=1.0, transfer=10.0, seed=42):
+    """Compare the dispatchers without a transfer penalty, then with it"""
+    for penalty in sorted({0.0, transfer}):
+        print(f"{bays} bays, {tasks:,} tasks, offered load {load:.0%}, home-bay skew {skew}, "
+              f"{penalty:.0f} min transfer away from home")
+        print(f"{'DISPATCH':<28}{'UTIL':>7}{'XFER':>7}{'MAKESPAN h':>12}{'P50 h':>8}{'P95 h':>8}{'P99 h':>8}{'MAX h':>8}")
+        candidates = [
+            ("shared FIFO (3.py)", SharedFifoDispatcher(bays)),
+            ("per-bay, no stealing", PartitionedDispatcher(bays)),
+            ("work stealing", WorkStealingDispatcher(bays, seed=seed)),
+        ]
+        for name, dispatcher in candidates:
+            r = simulate(dispatcher, bays, tasks, load, skew, penalty, seed)
+            print(f"{name:<28}{r['utilization']:>7.1%}{r['overhead']:>7.1%}{r['makespan_h']:>12.1f}"
+                  f"{r['p50_h']:>8.2f}{r['p95_h']:>8.2f}{r['p99_h']:>8.2f}{r['max_h']:>8.2f}")
+        stealer = candidates[-1][1]
+        print(f"work stealing: {stealer.steals:,} steals moved {stealer.stolen:,} tasks\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate work-stealing dispatch across bays")
+    parser.add_argument("--bays", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--load", type=float, default=0.9, help="offered load as a fraction of bay capacity")
+    parser.add_argument("--skew", type=float, default=1.0, help="home-bay skew exponent (0 = uniform)")
+    parser.add_argument("--transfer", type=float, default=10.0,
+                        help="minutes lost working away from the home bay (also run with 0 for comparison)")
+    args = parser.parse_args()
+    benchmark(args.bays, args.tasks, args.load, args.skew, args.transfer)
@@ -0,0 +1,300 @@
+"""Service-interval forecast: which tasks fall due next, per plate and task type.
+
+For every (plate, task type) serviced so far the forecast keeps the last
+completed time and the service interval. The entries sit in a min-heap on
+next-due time, with a position map so a new service moves its entry in
+O(log n). due_within() walks the heap from the root and stops at every
+entry that falls outside the window. It visits at most 2k + 1 entries to
+find the k that fall due, whatever the number of plates, then sorts them,
+so a query costs O(k log k).
+
+Completed services come from a ChangeFeed (its COMPLETED events) or from
+a TaskArchive. enqueue_due() puts the due tasks into an
+app's queue. With MAINTENANCE_ARCHIVE_DIR and MAINTENANCE_FORECAST_DAYS
+set, 3.py and 7.py queue what falls due within that many days on start.
+
+Run ``python forecast.py due --archive DIR`` to list what falls due in
+the next week from an archive. Run ``python forecast.py`` to benchmark
+across all 182k plates.
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+from capacity import BoundedQueue
+from changefeed import COMPLETED
+from records import PLATE_COUNT, TASK_NAMES, plate_code, plate_from_code, task_code
+
+DAY = 86400
+
+# Default service interval per task type, in days
+INTERVAL_DAYS = {
+    "Oil Change": 180,
+    "Tire Rotation": 180,
+    "Brake Inspection": 365,
+    "Battery Check": 365,
+    "Filter Replacement": 365,
+    "Coolant Flush": 730,
+    "Alignment Check": 365,
+    "Spark Plug Replacement": 730,
+    "Timing Belt Inspection": 1825,
+    "Transmission Fluid Change": 730,
+}
+
+Forecast = namedtuple("Forecast", "due task plate_id last_completed interval")
+
+DUE, KEY, LAST, INTERVAL = range(4)  # Fields of a heap entry
+
+
+def _key(task, plate_id):
+    return plate_code(plate_id) << 4 | task_code(task)
+
+
+class ServiceForecast:
+    """Min-heap of (plate, task type) entries on next-due time"""
+    def __init__(self, intervals=None):
+        self.intervals = {task: days * DAY for task, days in (intervals or INTERVAL_DAYS).items()}
+        self.heap = []  # [due, key, last completed, interval]
+        self.positions = {}  # Key -> index in heap
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _sift_up(self, i):
+        heap, positions = self.heap, self.positions
+        entry = heap[i]
+        while i:
+            parent = (i - 1) >> 1
+            if heap[parent][DUE] <= entry[DUE]:
+                break
+            heap[i] = heap[parent]
+            positions[heap[i][KEY]] = i
+            i = parent
+        heap[i] = entry
+        positions[entry[KEY]] = i
+        return i
+
+    def _sift_down(self, i):
+        heap, positions = self.heap, self.positions
+        entry = heap[i]
+        size = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][DUE] < heap[child][DUE]:
+                child += 1
+            if heap[child][DUE] >= entry[DUE]:
+                break
+            heap[i] = heap[child]
+            positions[heap[i][KEY]] = i
+            i = child
+        heap[i] = entry
+        positions[entry[KEY]] = i
+
+    def _place(self, i):
+        """Restore the heap after entry i changed its due time"""
+        if self._sift_up(i) == i:
+            self._sift_down(i)
+
+    def record_service(self, task, plate_id, completed_at=None, interval=None):
+        """Note a completed task; older news than what is known is ignored"""
+        completed_at = time.time() if completed_at is None else completed_at
+        key = _key(task, plate_id)
+        i = self.positions.get(key)
+        if i is None:
+            interval = self.intervals[task] if interval is None else interval
+            self.heap.append([completed_at + interval, key, completed_at, interval])
+            self._sift_up(len(self.heap) - 1)
+            return
+        entry = self.heap[i]
+        if completed_at < entry[LAST]:
+            return
+        entry[LAST] = completed_at
+        if interval is not None:
+            entry[INTERVAL] = interval
+        entry[DUE] = completed_at + entry[INTERVAL]
+        self._place(i)
+
+    def set_interval(self, task, plate_id, interval):
+        """Change the service interval (in seconds) of one plate's task"""
+        i = self.positions[_key(task, plate_id)]
+        entry = self.heap[i]
+        entry[INTERVAL] = interval
+        entry[DUE] = entry[LAST] + interval
+        self._place(i)
+
+    def forget(self, task, plate_id):
+        """Stop forecasting a task for a plate (say the car left the fleet)"""
+        i = self.positions.pop(_key(task, plate_id))
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.positions[last[KEY]] = i
+            self._place(i)
+
+    def bulk_load(self, services):
+        """Replace the contents with (task, plate_id, completed_at) services in O(n)"""
+        latest = {}
+        for task, plate_id, completed_at in services:
+            key = _key(task, plate_id)
+            if completed_at > latest.get(key, (float("-inf"),))[0]:
+                latest[key] = (completed_at, self.intervals[task])
+        self.heap = [[last + interval, key, last, interval] for key, (last, interval) in latest.items()]
+        self.positions = {}
+        for i in range(len(self.heap) // 2 - 1, -1, -1):
+            self._sift_down(i)
+        for i, entry in enumerate(self.heap):
+            self.positions[entry[KEY]] = i
+
+    @staticmethod
+    def _forecast(entry):
+        return Forecast(entry[DUE], TASK_NAMES[entry[KEY] & 15], plate_from_code(entry[KEY] >> 4),
+                        entry[LAST], entry[INTERVAL])
+
+    def next_due(self, task=None, plate_id=None):
+        """The Forecast of one plate's task, or the earliest one overall"""
+        if task is None:
+            return self._forecast(self.heap[0]) if self.heap else None
+        i = self.positions.get(_key(task, plate_id))
+        return None if i is None else self._forecast(self.heap[i])
+
+    def due_within(self, seconds, now=None):
+        """Forecasts due by now + seconds (overdue ones included), earliest first"""
+        limit = (time.time() if now is None else now) + seconds
+        heap = self.heap
+        size = len(heap)
+        found = []
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            entry = heap[i]
+            if entry[DUE] > limit:
+                continue  # Everything below is due later still
+            found.append(entry)
+            child = 2 * i + 1
+            if child < size:
+                stack.append(child)
+                if child + 1 < size:
+                    stack.append(child + 1)
+        found.sort()
+        return [self._forecast(entry) for entry in found]
+
+    def enqueue_due(self, queue, seconds, now=None):
+        """Add every task due within the window to an app's queue; return how many it took
+
+        queue is an app's BoundedQueue or any structure a BoundedQueue can
+        front. Overdue tasks get priority 1 and the rest priority 2 where
+        the structure takes a priority. A structure with a PendingTaskSet
+        turns away tasks that are already queued, and a full queue applies
+        its overflow policy.
+        """
+        now = time.time() if now is None else now
+        if not isinstance(queue, BoundedQueue):
+            queue = BoundedQueue(queue, sys.maxsize)
+        added = 0
+        for forecast in self.due_within(seconds, now):
+            added += bool(queue.offer(forecast.task, forecast.plate_id, 1 if forecast.due <= now else 2))
+        return added
+
+    def follow(self, feed):
+        """Count every task completed in the structures publishing to a ChangeFeed as serviced"""
+        def serviced(events):
+            for event in events:
+                if event.kind == COMPLETED:
+                    self.record_service(event.task, event.plate_id, event.at)
+        return feed.subscribe(serviced)
+
+    def load_archive(self, archive, start=None, end=None):
+        """Seed the forecast from a TaskArchive's history"""
+        self.bulk_load((t.task, t.plate_id, t.completed_at) for t in archive.query(None, start, end))
+
+
+def enqueue_due_from_env(queue, archive):
+    """Queue what the archive says falls due within MAINTENANCE_FORECAST_DAYS, when both are set"""
+    days = os.environ.get("MAINTENANCE_FORECAST_DAYS")
+    if not days or archive is None:
+        return None
+    now = time.time()
+    forecast = ServiceForecast()
+    # A service older than the longest interval is overdue whatever came after
+    # it, so the scan can stop there instead of reading the whole history
+    forecast.load_archive(archive, start=now - max(forecast.intervals.values()))
+    forecast.enqueue_due(queue, float(days) * DAY, now)
+    return forecast
+
+
+def benchmark(plates=PLATE_COUNT, types_per_plate=3, queries=100, seed=42):
+    """Forecast every plate's services and time the due-soon query against a full scan"""
+    rng = random.Random(seed)
+    now = time.time()
+    services = []
+    for code in range(plates):
+        plate = plate_from_code(code)
+        for task in rng.sample(TASK_NAMES, types_per_plate):
+            services.append((task, plate, now - rng.uniform(0, INTERVAL_DAYS[task] * DAY)))
+    forecast = ServiceForecast()
+    started = time.perf_counter()
+    forecast.bulk_load(services)
+    print(f"{len(forecast):,} plate/task entries over {plates:,} plates, loaded in {time.perf_counter() - started:.2f}s")
+
+    def scan(window):
+        limit = now + window
+        return [forecast._forecast(entry) for entry in sorted(e for e in forecast.heap if e[DUE] <= limit)]
+
+    print(f"{'WINDOW':<10}{'DUE':>8}{'HEAP ms':>10}{'SCAN ms':>10}")
+    for days in (1, 7, 30):
+        started = time.perf_counter()
+        for _ in range(queries):
+            due = forecast.due_within(days * DAY, now)
+        heap_ms = (time.perf_counter() - started) * 1000 / queries
+        started = time.perf_counter()
+        for _ in range(max(1, queries // 10)):
+            expected = scan(days * DAY)
+        scan_ms = (time.perf_counter() - started) * 1000 / max(1, queries // 10)
+        assert len(due) == len(expected)
+        print(f"{days:>3} days {len(due):>10,}{heap_ms:>10.2f}{scan_ms:>10.2f}")
+
+    sample = rng.sample(services, min(100_000, len(services)))
+    started = time.perf_counter()
+    for task, plate, _ in sample:
+        forecast.record_service(task, plate, now + rng.uniform(0, DAY))
+    print(f"record_service: {(time.perf_counter() - started) * 1e6 / len(sample):.2f} us each "
+          f"({len(sample):,} services)")
+
+    queue = importlib.import_module("3").SinglyLinkedList()
+    started = time.perf_counter()
+    added = forecast.enqueue_due(queue, 7 * DAY, now)
+    print(f"enqueue_due: {added:,} tasks into a SinglyLinkedList in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def print_due(directory, days):
+    from archive import TaskArchive
+    forecast = ServiceForecast()
+    forecast.load_archive(TaskArchive(directory))
+    now = time.time()
+    for item in forecast.due_within(days * DAY, now):
+        status = "overdue" if item.due <= now else time.strftime("%Y-%m-%d", time.localtime(item.due))
+        print(f"{item.plate_id}  {item.task:<26}{status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast next-due maintenance per plate")
+    commands = parser.add_subparsers(dest="command")
+    due_parser = commands.add_parser("due", help="list tasks falling due, from an archive")
+    due_parser.add_argument("--archive", required=True, help="TaskArchive directory (MAINTENANCE_ARCHIVE_DIR)")
+    due_parser.add_argument("--days", type=float, default=7)
+    bench_parser = commands.add_parser("benchmark", help="benchmark across all plates (the default)")
+    bench_parser.add_argument("--plates", type=int, default=PLATE_COUNT)
+    bench_parser.add_argument("--types-per-plate", type=int, default=3)
+    args = parser.parse_args()
+    if args.command == "due":
+        print_due(args.archive, args.days)
+    elif args.command == "benchmark":
+        benchmark(args.plates, args.types_per_plate)
+    else:
+        benchmark()
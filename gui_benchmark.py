@@ -0,0 +1,262 @@
+"""Headless responsiveness benchmark for the MaintenanceApp front ends.
+
+Each app (2.py ... 7.py) is booted in its own process on a virtual X server
+(Xvfb is started when DISPLAY is not set). The modal messagebox dialogs and
+the apps' Toplevel popups are stubbed out, confirmations answer yes, and
+the operator's hot path is scripted: every add or remove is queued with
+event_generate and timed until Tk has handled it and redrawn. The report
+gives latency percentiles and resident memory as the backlog grows.
+MAINTENANCE_CAPACITY is lifted so every app can hold the largest backlog, and
+an exception in an app's Tk callback fails the run instead of being printed
+and skipped.
+
+Usage:
+    python gui_benchmark.py                      # every app, backlogs 100 / 1,000 / 5,000
+    python gui_benchmark.py --apps 3 7 --sizes 100 10000
+    python gui_benchmark.py --save-baseline      # store results as the baseline
+    python gui_benchmark.py --compare            # flag p99 regressions vs the baseline
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from benchmark import compare  # noqa: E402
+from records import TASK_NAMES, plate_from_code  # noqa: E402
+
+APPS = ["2", "3", "4", "5", "6", "7"]
+BASELINE_FILE = os.path.join(HERE, "gui_benchmark_baseline.json")
+STEP_EVENT = "<<BenchmarkStep>>"
+
+
+def start_xvfb():
+    """Start Xvfb on a free display and point DISPLAY at it; return the process"""
+    if shutil.which("Xvfb") is None:
+        raise SystemExit("Xvfb is not installed and DISPLAY is not set")
+    for number in range(99, 199):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            break
+    process = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1600x1200x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit("Xvfb did not start")
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = f":{number}"
+    return process
+
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, in KB on Linux
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def stub_dialogs(app):
+    """Replace the modal dialogs and popups with recorders; confirmations say yes"""
+    from tkinter import messagebox
+
+    shown = []
+
+    def record(title, *args, **kwargs):
+        shown.append(title)
+        return True
+
+    for name in ("showinfo", "showwarning", "showerror", "askyesno", "askokcancel"):
+        setattr(messagebox, name, record)
+    if hasattr(app, "show_popup"):
+        app.show_popup = lambda title, *args: shown.append(title)
+    if hasattr(app, "show_custom_popup"):
+        app.show_custom_popup = lambda title, *args, **kwargs: shown.append(title)
+    if hasattr(app, "show_confirmation_popup"):
+        app.show_confirmation_popup = lambda title, message, on_confirm, on_cancel: on_confirm()
+    return shown
+
+
+def find_button(widget, text):
+    """Depth-first search of the widget tree for a button with the given label"""
+    if widget.winfo_class() == "Button" and widget.cget("text") == text:
+        return widget
+    for child in widget.winfo_children():
+        found = find_button(child, text)
+        if found is not None:
+            return found
+    return None
+
+
+class AppDriver:
+    """Scripts one MaintenanceApp through its own widgets"""
+    def __init__(self, name):
+        import importlib
+        import tkinter as tk
+
+        self.name = name
+        self.tk = tk
+        os.environ["MAINTENANCE_CAPACITY"] = str(sys.maxsize)  # Lift the 4.py order limit so the backlog can grow
+        self.root = tk.Tk()
+        self.errors = []  # Tk reports callback exceptions and carries on; step() raises them instead
+        self.root.report_callback_exception = lambda *exc_info: self.errors.append(exc_info)
+        self.root.state = lambda *args: "normal"  # "zoomed" only exists on Windows
+        self.app = importlib.import_module(name).MaintenanceApp(self.root)
+        self.shown = stub_dialogs(self.app)
+        labels = {"2": ("Add to Rear", "Remove from Front")}.get(name, ("Add Task", "Remove Task"))
+        self.add_button = find_button(self.root, labels[0])
+        self.remove_button = find_button(self.root, labels[1])
+        self.action = None
+        self.root.bind(STEP_EVENT, lambda event: self.action())
+        self.root.update()
+        self.next_plate = 0
+
+    def add(self):
+        app = self.app
+        i = self.next_plate
+        self.next_plate += 1
+        app.plate_id_entry.delete(0, self.tk.END)
+        app.plate_id_entry.insert(0, plate_from_code(i * 7919 % 182000))
+        app.task_var.set(TASK_NAMES[i % len(TASK_NAMES)])
+        if hasattr(app, "priority_var"):
+            app.priority_var.set(i % 5 + 1)
+        self.add_button.invoke()
+
+    def remove(self):
+        app = self.app
+        if self.name in ("4", "6"):  # Removes the selected row
+            app.tasks_listbox.selection_clear(0, self.tk.END)
+            # 6.py lists the root, the seeded category and its sub-task above the first job
+            app.tasks_listbox.selection_set(2 if self.name == "4" else 5)
+        self.remove_button.invoke()
+
+    def step(self, action):
+        """Queue one action as a Tk event and time it until it is handled and redrawn"""
+        self.action = action
+        start = time.perf_counter()
+        self.root.event_generate(STEP_EVENT, when="tail")
+        self.root.update()
+        elapsed = time.perf_counter() - start
+        if self.errors:
+            _, error, _ = self.errors[0]
+            raise RuntimeError(f"{self.name}.py raised while handling {action.__name__}") from error
+        return elapsed
+
+    def close(self):
+        self.root.destroy()
+
+
+def run_app(name, sizes, samples):
+    """Grow one app's backlog through sizes, timing adds on the way and add/remove pairs at each size"""
+    driver = AppDriver(name)
+    results = {}
+    add_times = []
+    base_rss = rss_bytes()
+    for n in sizes:
+        while driver.next_plate < n:
+            add_times.append(driver.step(driver.add))
+        remove_times, cycle_add_times = [], []
+        for _ in range(samples):
+            remove_times.append(driver.step(driver.remove))
+            cycle_add_times.append(driver.step(driver.add))
+        for op, times in (("add", add_times[-samples:] + cycle_add_times), ("remove", remove_times)):
+            results[f"{name}.py|{op}|{n}"] = {
+                "status": "ok",
+                "seconds": percentile(times, 99),  # Regressions are judged on p99
+                "p50_ms": percentile(times, 50) * 1000,
+                "p90_ms": percentile(times, 90) * 1000,
+                "p99_ms": percentile(times, 99) * 1000,
+                "max_ms": max(times) * 1000,
+                "rss_growth_kb": (rss_bytes() - base_rss) // 1024,
+            }
+        add_times = []
+    results[f"{name}.py|popups|{sizes[-1]}"] = {"status": "info", "seconds": 0.0, "shown": len(driver.shown),
+                                                 "titles": sorted(set(driver.shown))}
+    driver.close()
+    return results
+
+
+def format_report(results):
+    lines = [f"{'APP':<6}{'OP':<8}{'BACKLOG':>9}{'P50 ms':>10}{'P90 ms':>10}{'P99 ms':>10}{'MAX ms':>10}{'RSS +KB':>10}"]
+    lines.append("-" * 73)
+    for key, result in results.items():
+        app, op, n = key.split("|")
+        if result["status"] != "ok":
+            continue
+        lines.append(f"{app:<6}{op:<8}{int(n):>9,}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+                     f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}{result['rss_growth_kb']:>10,}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tk front ends headlessly")
+    parser.add_argument("--apps", nargs="+", choices=APPS, default=APPS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="backlog sizes to measure at")
+    parser.add_argument("--samples", type=int, default=100, help="add/remove pairs timed at each size")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file for --save-baseline/--compare")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="report p99 regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio counted as a regression")
+    parser.add_argument("--child", choices=APPS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:  # One app per process, so memory readings do not mix
+        json.dump(run_app(args.child, sorted(args.sizes), args.samples), sys.stdout)
+        return 0
+
+    xvfb = start_xvfb() if not os.environ.get("DISPLAY") else None
+    results = {}
+    try:
+        for name in args.apps:
+            command = [sys.executable, os.path.abspath(__file__), "--child", name, "--samples", str(args.samples),
+                       "--sizes", *map(str, args.sizes)]
+            child = subprocess.run(command, capture_output=True, text=True)
+            if child.returncode:
+                print(child.stderr, file=sys.stderr)
+                print(f"{name}.py failed; no results were recorded", file=sys.stderr)
+                return 1
+            results.update(json.loads(child.stdout))
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    print(format_report(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, min_seconds=0.001)
+        if regressions:
+            print("\nRegressions (p99):")
+            for key, old, new in regressions:
+                print(f"  {key}: {old * 1000:.2f}ms -> {new * 1000:.2f}ms ({new / old:.2f}x)")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
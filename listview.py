@@ -0,0 +1,21 @@
+def sync_listbox(listbox, shown, records, first_row=0):
+    """Make the listbox rows from first_row on show records, touching only changed rows.
+
+    shown is the list of records currently displayed and is updated in place.
+    Records are compared by id; the unchanged rows at the start and end stay
+    in the listbox, so removing the front task deletes one row and adding at
+    the rear inserts one, and labels are only formatted for inserted rows.
+    """
+    limit = min(len(shown), len(records))
+    head = 0
+    while head < limit and shown[head].id == records[head].id:
+        head += 1
+    tail = 0
+    while tail < limit - head and shown[-1 - tail].id == records[-1 - tail].id:
+        tail += 1
+    if head + tail < len(shown):
+        listbox.delete(first_row + head, first_row + len(shown) - tail - 1)
+    new_rows = records[head:len(records) - tail]
+    if new_rows:
+        listbox.insert(first_row + head, *[record.label() for record in new_rows])
+    shown[:] = records
@@ -0,0 +1,233 @@
+"""Merge and split pending queues by relinking their nodes.
+
+merge(*queues) combines linked-list queues of one kind (SinglyLinkedList
+from 3.py, DoublyLinkedList from 5.py or the priority DoublyLinkedList from
+7.py) into the first one. It runs a heap-based k-way merge over the queue
+heads, so n tasks from k queues take O(n log k) and no node is copied.
+Priority lists come out ordered by priority, then by enqueue sequence;
+FIFO lists by enqueue sequence alone. Each input must already be in that
+order, which is true of a FIFO list and of a priority list after
+insertion_sort. split(queue, predicate) does the reverse.
+
+If queues[0] has a PendingTaskSet, a task that is already pending in it or
+in an earlier input is dropped from the merge, as add_task would have
+turned it away; it is counted in the set's ``rejected`` and published as
+removed. Without one, duplicates are kept.
+
+Run ``python merging.py`` to time merging 64 queues of 100k tasks.
+"""
+import argparse
+import heapq
+import importlib
+import time
+
+from changefeed import ADDED, REMOVED
+from dedup import PendingTaskSet
+
+
+def _sort_key(queue):
+    if hasattr(queue, "insertion_sort"):  # Priority list in 7.py
+        return lambda node: (node.priority, node.record.id)
+    return lambda node: node.record.id  # Record ids grow in enqueue order
+
+
+def _nodes(queue):
+    node = queue.head
+    while node:
+        yield node
+        node = node.next
+
+
+def _drop_duplicates(queue, dedup):
+    """Unlink the nodes of queue whose task dedup already holds and record the rest in it"""
+    doubly = hasattr(queue.head, "prev")
+    pool = getattr(queue, "pool", None)
+    kept_tail = None
+    node = queue.head
+    while node:
+        following = node.next
+        key = (node.task, node.plate_id)
+        if key not in dedup:
+            dedup.pending.add(key)
+            kept_tail = node
+        else:
+            dedup.rejected += 1
+            if kept_tail is None:
+                queue.head = following
+            else:
+                kept_tail.next = following
+            if doubly and following is not None:
+                following.prev = kept_tail
+            queue.size -= 1
+            queue.counts.discard(node.task)
+            if queue.dedup is not None:
+                queue.dedup.discard(node.task, node.plate_id)
+            if queue.feed is not None:
+                queue.feed.publish(REMOVED, node.task, node.plate_id, getattr(node, "priority", None))
+            if pool is not None:
+                pool.release(node)
+        node = following
+    queue.tail = kept_tail
+
+
+def merge(*queues):
+    """Move every task into queues[0] in merged order; the other queues are left empty"""
+    target = queues[0]
+    if any(type(queue) is not type(target) for queue in queues):
+        raise TypeError("Can only merge queues of the same kind")
+    sources = [queue for queue in queues[1:] if queue is not target]
+    for queue in sources:
+        if target.dedup is not None:
+            _drop_duplicates(queue, target.dedup)
+        if queue.feed is not target.feed:
+            for node in _nodes(queue):  # The tasks leave one feed and join another
+                if queue.feed is not None:
+                    queue.feed.publish(REMOVED, node.task, node.plate_id, getattr(node, "priority", None))
+                if target.feed is not None:
+                    target.feed.publish(ADDED, node.task, node.plate_id, getattr(node, "priority", None))
+        if queue.dedup is not None:
+            queue.dedup.clear()
+        target.counts.update(queue.counts)
+        queue.counts.clear()
+
+    key = _sort_key(target)
+    heap = [(key(queue.head), i, queue.head) for i, queue in enumerate([target] + sources) if queue.head]
+    heapq.heapify(heap)
+    tails = [queue.tail for queue in [target] + sources]
+    doubly = bool(heap) and hasattr(heap[0][2], "prev")
+    head = tail = None
+    while heap:
+        _, i, node = heap[0]
+        if len(heap) == 1:
+            # Only one queue left: splice the rest of it on in one step
+            if tail is None:
+                head = node
+            else:
+                tail.next = node
+                if doubly:
+                    node.prev = tail
+            tail = tails[i]
+            break
+        following = node.next
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(following), i, following))
+        if tail is None:
+            head = node
+            if doubly:
+                node.prev = None
+        else:
+            tail.next = node
+            if doubly:
+                node.prev = tail
+        tail = node
+    if tail is not None:
+        tail.next = None
+
+    target.head, target.tail = head, tail
+    target.size = sum(queue.size for queue in [target] + sources)
+    for queue in sources:
+        queue.head = queue.tail = None
+        queue.size = 0
+    return target
+
+
+def split(queue, predicate):
+    """Move the tasks whose record matches predicate into a new queue of the same kind, keeping their order"""
+    options = {"pool": queue.pool} if hasattr(queue, "pool") else {}  # Removals from taken refill the same pool
+    taken = type(queue)(dedup=PendingTaskSet() if queue.dedup is not None else None, feed=queue.feed, **options)
+    doubly = hasattr(queue.head, "prev")
+    kept_tail = None
+    node = queue.head
+    queue.head = None
+    while node:
+        following = node.next
+        node.next = None
+        if predicate(node.record):
+            if taken.tail is None:
+                taken.head = node
+                if doubly:
+                    node.prev = None
+            else:
+                taken.tail.next = node
+                if doubly:
+                    node.prev = taken.tail
+            taken.tail = node
+            taken.size += 1
+            queue.size -= 1
+            queue.counts.discard(node.task)
+            taken.counts.add(node.task)
+            if queue.dedup is not None:
+                queue.dedup.discard(node.task, node.plate_id)
+                taken.dedup.add(node.task, node.plate_id)
+        else:
+            if kept_tail is None:
+                queue.head = node
+                if doubly:
+                    node.prev = None
+            else:
+                kept_tail.next = node
+                if doubly:
+                    node.prev = kept_tail
+            kept_tail = node
+        node = following
+    queue.tail = kept_tail
+    return taken
+
+
+def _build(cls, tasks, priority_order, offset):
+    """A queue already in its own order; priorities are added ascending so no sort is needed"""
+    queue = cls()
+    for i in range(tasks):
+        plate = f"RA{'ABCDEFG'[(offset + i) % 7]}{(offset + i) % 1000:03d}{chr(65 + (offset + i) // 1000 % 26)}"
+        if priority_order:
+            queue.add_task("Oil Change", plate, 1 + i * 5 // tasks)
+        else:
+            queue.add_task("Oil Change", plate)
+    return queue
+
+
+def benchmark(queues=64, tasks=100_000, readd_limit=20_000):
+    """Merge queues x tasks for each list kind, against re-adding (and re-sorting) every task"""
+    kinds = [("SinglyLinkedList (3.py)", importlib.import_module("3").SinglyLinkedList, False),
+             ("DoublyLinkedList (5.py)", importlib.import_module("5").DoublyLinkedList, False),
+             ("priority list (7.py)", importlib.import_module("7").DoublyLinkedList, True)]
+    total = queues * tasks
+    print(f"{queues} queues x {tasks:,} tasks")
+    for name, cls, priority_order in kinds:
+        parts = [_build(cls, tasks, priority_order, q * tasks) for q in range(queues)]
+        start = time.perf_counter()
+        merged = merge(*parts)
+        merge_s = time.perf_counter() - start
+        assert merged.size == total
+        start = time.perf_counter()
+        high = split(merged, lambda record: record.plate_id[2] in "ABC")
+        split_s = time.perf_counter() - start
+        print(f"  {name:<26}merge {merge_s:>7.2f}s ({total / merge_s:>11,.0f} tasks/s)   "
+              f"split {split_s:>6.2f}s ({high.size:,} / {merged.size:,})")
+        del parts, merged, high
+
+        if not priority_order or total <= readd_limit:
+            parts = [_build(cls, tasks, priority_order, q * tasks) for q in range(queues)]
+            start = time.perf_counter()
+            target = parts[0]
+            for queue in parts[1:]:
+                for node in _nodes(queue):
+                    if priority_order:
+                        target.add_task(node.task, node.plate_id, node.priority)
+                    else:
+                        target.add_task(node.task, node.plate_id)
+            if priority_order:
+                target.insertion_sort()
+            print(f"  {'':<26}re-add {time.perf_counter() - start:>6.2f}s")
+        else:
+            print(f"  {'':<26}re-add skipped above {readd_limit:,} tasks (insertion_sort is quadratic)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark merging and splitting task queues")
+    parser.add_argument("--queues", type=int, default=64)
+    parser.add_argument("--tasks", type=int, default=100_000, help="tasks per queue")
+    args = parser.parse_args()
+    benchmark(args.queues, args.tasks)
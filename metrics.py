@@ -0,0 +1,172 @@
+import functools
+import json
+import os
+import time
+
+
+class LatencyHistogram:
+    """HDR-style histogram: power-of-two buckets split into linear sub-buckets"""
+    def __init__(self, sub_buckets=16):
+        self.sub_buckets = sub_buckets
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _bucket(self, value):
+        """Map a value (in nanoseconds) to the lower bound of its bucket"""
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.sub_buckets.bit_length()
+        return (value >> shift) << shift
+
+    def record(self, value):
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        """Return the bucket value below which pct percent of samples fall"""
+        if not self.count:
+            return 0
+        target = self.count * pct / 100.0
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return bucket
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000 if self.count else 0.0,
+            "min_us": (self.min or 0) / 1000,
+            "p50_us": self.percentile(50) / 1000,
+            "p90_us": self.percentile(90) / 1000,
+            "p99_us": self.percentile(99) / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class Metrics:
+    """Registry of per-operation latency histograms and structure gauges"""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.gauges = {}
+        self.started = time.perf_counter()
+
+    def record(self, name, elapsed_ns):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(elapsed_ns)
+
+    def gauge(self, name, read):
+        """Register a callable (e.g. structure size or tree depth) read on stats()"""
+        self.gauges[name] = read
+
+    def reset(self):
+        self.histograms.clear()
+        self.started = time.perf_counter()
+
+    def total_ops(self):
+        return sum(h.count for h in self.histograms.values())
+
+    def stats(self):
+        """Return a snapshot of every operation and gauge"""
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as error:  # A gauge must never break reporting
+                gauges[name] = f"error: {error}"
+        return {
+            "enabled": self.enabled,
+            "uptime_s": time.perf_counter() - self.started,
+            "operations": {name: h.summary() for name, h in sorted(self.histograms.items())},
+            "gauges": gauges,
+        }
+
+    def dump_json(self):
+        return json.dumps(self.stats(), indent=2, default=str)
+
+    def dump_text(self):
+        snapshot = self.stats()
+        lines = [f"{'OPERATION':<40}{'COUNT':>10}{'MEAN us':>10}{'P50 us':>10}{'P99 us':>10}{'MAX us':>10}"]
+        for name, s in snapshot["operations"].items():
+            lines.append(f"{name:<40}{s['count']:>10}{s['mean_us']:>10.1f}{s['p50_us']:>10.1f}{s['p99_us']:>10.1f}{s['max_us']:>10.1f}")
+        for name, value in snapshot["gauges"].items():
+            lines.append(f"{name:<40}{value!s:>10}")
+        return "\n".join(lines)
+
+
+# Shared registry, switched on with MAINTENANCE_METRICS=1
+metrics = Metrics(enabled=os.environ.get("MAINTENANCE_METRICS") == "1")
+
+
+def instrument(name=None):
+    """Decorator timing every call into the shared registry
+
+    The registry is checked when the function is decorated: with metrics
+    disabled the function comes back unwrapped and costs nothing, so
+    MAINTENANCE_METRICS has to be set before the structures are imported.
+    """
+    def decorator(func):
+        if not metrics.enabled:
+            return func
+        op_name = name or func.__qualname__
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record(op_name, perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+
+def stats():
+    return metrics.stats()
+
+
+class DebugPanel:
+    """Tk window showing live ops/sec and the metrics text dump"""
+    def __init__(self, root, refresh_ms=1000):
+        import tkinter as tk
+
+        self.root = root
+        self.refresh_ms = refresh_ms
+        self.window = tk.Toplevel(root)
+        self.window.title("Debug Metrics")
+        self.window.configure(bg="#263238")
+        self.rate_label = tk.Label(self.window, text="", font=("Helvetica", 14, "bold"), bg="#263238", fg="#80CBC4")
+        self.rate_label.pack(pady=10)
+        self.text = tk.Text(self.window, font=("Courier", 10), width=100, height=20, bg="#37474F", fg="white")
+        self.text.pack(padx=10, pady=10)
+        self.last_ops = metrics.total_ops()
+        self.last_time = time.perf_counter()
+        self.refresh()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        now = time.perf_counter()
+        ops = metrics.total_ops()
+        rate = (ops - self.last_ops) / (now - self.last_time) if now > self.last_time else 0.0
+        self.last_ops, self.last_time = ops, now
+        state = "enabled" if metrics.enabled else "disabled (set MAINTENANCE_METRICS=1)"
+        self.rate_label.config(text=f"{rate:,.1f} ops/sec - metrics {state}")
+        self.text.delete("1.0", "end")
+        self.text.insert("end", metrics.dump_text())
+        self.window.after(self.refresh_ms, self.refresh)
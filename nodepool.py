@@ -0,0 +1,147 @@
+"""Free list of list nodes, so a queue with steady churn stops allocating them.
+
+Pass ``pool=NodePool(Node)`` to the SinglyLinkedList of 3.py or the
+DoublyLinkedList of 5.py. Removed nodes are then cleared and pushed onto
+the pool's free list, and added tasks take a node from it. A busy queue
+then allocates only the TaskRecord for each new task. Its nodes live
+long enough to reach the oldest GC generation, where the collector
+rarely looks at them. A released node keeps no links, so it never holds
+anything alive.
+
+As a pooled node is reused, the lists never hand out a removed node:
+remove_task and remove_node return its TaskRecord, pool or not, through
+recycle().
+
+CPython counts allocations net of frees when deciding to collect, so
+strictly alternating adds and removes never trigger the collector, pool
+or not. The pool pays off when the queue grows in bursts. Each task then
+allocates one tracked object instead of two, which halves the number of
+collections.
+
+Run ``python nodepool.py`` to compare throughput and GC pauses under
+steady and bursty churn with and without a pool.
+"""
+import argparse
+import gc
+import importlib
+import time
+
+
+class NodePool:
+    """Stack of blank nodes of one slotted class; grows by doubling and can be trimmed"""
+    def __init__(self, node_class, size=1024):
+        self.node_class = node_class
+        self.fields = node_class.__slots__
+        self.free = []
+        self.allocated = 0
+        self._grow(size)
+
+    def _grow(self, count):
+        blank = self.node_class.__new__
+        cls = self.node_class
+        free = self.free
+        for _ in range(count):
+            node = blank(cls)
+            for field in self.fields:
+                setattr(node, field, None)
+            free.append(node)
+        self.allocated += count
+
+    def acquire(self, record):
+        """A blank node holding record"""
+        if not self.free:
+            self._grow(max(64, self.allocated))
+        node = self.free.pop()
+        node.record = record
+        return node
+
+    def release(self, node):
+        """Clear a node that has left its list and keep it for reuse"""
+        for field in self.fields:
+            setattr(node, field, None)
+        self.free.append(node)
+
+    def trim(self, keep=0):
+        """Let go of all but keep free nodes"""
+        dropped = max(0, len(self.free) - keep)
+        del self.free[keep:]
+        self.allocated -= dropped
+        return dropped
+
+    def stats(self):
+        return {"allocated": self.allocated, "free": len(self.free), "in_use": self.allocated - len(self.free)}
+
+
+def recycle(node, pool=None):
+    """The record of a node that has left its list; the node goes back to pool when given"""
+    record = node.record
+    if pool is not None:
+        pool.release(node)
+    return record
+
+
+class GCPauses:
+    """Time every garbage collection while active"""
+    def __init__(self):
+        self.pauses = []
+        self.generations = [0, 0, 0]
+        self.started = None
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self.started = time.perf_counter()
+        elif self.started is not None:
+            self.pauses.append(time.perf_counter() - self.started)
+            self.generations[info["generation"]] += 1
+            self.started = None
+
+    def __enter__(self):
+        gc.callbacks.append(self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+
+
+def benchmark(backlog=100_000, ops=1_000_000, burst=20_000):
+    """Churn a queue holding a backlog, with and without a pool
+
+    "steady" alternates one add and one remove. "bursts" adds burst tasks
+    and then removes them, as when a morning's bookings come in at once.
+    """
+    plates = [f"RA{'ABCDEFG'[i % 7]}{i % 1000:03d}{chr(65 + i // 1000 % 26)}" for i in range(backlog + ops)]
+    print(f"{backlog:,} pending tasks, {ops:,} adds and as many removes; bursts of {burst:,}")
+    print(f"{'QUEUE':<32}{'PATTERN':<9}{'OPS/SEC':>11}{'GC RUNS':>9}{'GEN2':>6}{'GC TOTAL ms':>13}{'GC MAX ms':>11}")
+    for module_name, class_name in (("3", "SinglyLinkedList"), ("5", "DoublyLinkedList")):
+        module = importlib.import_module(module_name)
+        for pattern in ("steady", "bursts"):
+            for pooled in (False, True):
+                gc.collect()
+                pool = NodePool(module.Node, backlog + burst) if pooled else None
+                queue = getattr(module, class_name)(pool=pool)
+                for i in range(backlog):
+                    queue.add_task("Oil Change", plates[i])
+                add, remove = queue.add_task, queue.remove_task
+                step = 1 if pattern == "steady" else burst
+                with GCPauses() as pauses:
+                    start = time.perf_counter()
+                    for first in range(backlog, backlog + ops, step):
+                        for i in range(first, min(first + step, backlog + ops)):
+                            add("Oil Change", plates[i])
+                        for _ in range(first, min(first + step, backlog + ops)):
+                            remove()
+                    elapsed = time.perf_counter() - start
+                name = f"{class_name} ({module_name}.py){' + pool' if pooled else ''}"
+                print(f"{name:<32}{pattern:<9}{2 * ops / elapsed:>11,.0f}{len(pauses.pauses):>9}"
+                      f"{pauses.generations[2]:>6}{sum(pauses.pauses) * 1000:>13.1f}"
+                      f"{max(pauses.pauses, default=0) * 1000:>11.2f}")
+                del queue, pool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark node pooling under queue churn")
+    parser.add_argument("--backlog", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=1_000_000, help="adds (and as many removes)")
+    parser.add_argument("--burst", type=int, default=20_000)
+    args = parser.parse_args()
+    benchmark(args.backlog, args.ops, args.burst)
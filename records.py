@@ -0,0 +1,90 @@
+import itertools
+import re
+import time
+
+# Task names in dropdown order; a task's code is its index in this list
+TASK_NAMES = [
+    "Oil Change",
+    "Tire Rotation",
+    "Brake Inspection",
+    "Battery Check",
+    "Filter Replacement",
+    "Coolant Flush",
+    "Alignment Check",
+    "Spark Plug Replacement",
+    "Timing Belt Inspection",
+    "Transmission Fluid Change",
+]
+TASK_CODES = {name: code for code, name in enumerate(TASK_NAMES)}
+
+# Car plates run from RAA000A to RAG999Z
+PLATE_PATTERN = re.compile(r"^RA([A-G])(\d{3})([A-Z])$")
+PLATE_SERIES = "ABCDEFG"
+PLATE_COUNT = len(PLATE_SERIES) * 1000 * 26
+
+
+def task_code(task):
+    """Get the numeric code for a task name"""
+    return TASK_CODES[task]
+
+
+def task_name(code):
+    """Get the task name for a numeric code"""
+    return TASK_NAMES[code]
+
+
+def plate_code(plate_id):
+    """Pack a plate ID such as RAD789K into an int in range(PLATE_COUNT)"""
+    match = PLATE_PATTERN.match(plate_id)
+    if not match:
+        raise ValueError(f"Invalid plate ID: {plate_id!r}")
+    series, number, letter = match.groups()
+    return (PLATE_SERIES.index(series) * 1000 + int(number)) * 26 + ord(letter) - 65
+
+
+def plate_from_code(code):
+    """Unpack an int made by plate_code back into the plate ID"""
+    rest, letter = divmod(code, 26)
+    series, number = divmod(rest, 1000)
+    return f"RA{PLATE_SERIES[series]}{number:03d}{chr(65 + letter)}"
+
+
+def plate_series(plate_id):
+    """Get the series index (0 for RAA... to 6 for RAG...) of a plate ID"""
+    return PLATE_SERIES.index(plate_id[2])
+
+
+class TaskRecord:
+    """Immutable pending task with a unique id; its display label is built on first use"""
+    __slots__ = ("id", "task", "plate_id", "priority", "enqueued_at", "_label")
+    _ids = itertools.count(1)
+
+    def __init__(self, task, plate_id, priority=None, enqueued_at=None, record_id=None):
+        set_field = object.__setattr__
+        set_field(self, "id", next(TaskRecord._ids) if record_id is None else record_id)
+        set_field(self, "task", task)
+        set_field(self, "plate_id", plate_id)
+        set_field(self, "priority", priority)
+        set_field(self, "enqueued_at", time.time() if enqueued_at is None else enqueued_at)
+        set_field(self, "_label", None)
+
+    @classmethod
+    def reserve_id(cls):
+        """Take an id for a task stored without its TaskRecord, to rebuild it later with record_id"""
+        return next(cls._ids)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TaskRecord is immutable")
+
+    def label(self):
+        """Get the listbox text, formatting it only the first time"""
+        if self._label is None:
+            if self.priority is None:
+                text = f"{self.task} - {self.plate_id}"
+            else:
+                text = f"{self.task} - {self.plate_id} (Priority: {self.priority})"
+            object.__setattr__(self, "_label", text)
+        return self._label
+
+    def __repr__(self):
+        return f"TaskRecord(id={self.id}, task={self.task!r}, plate_id={self.plate_id!r}, priority={self.priority!r})"
@@ -0,0 +1,439 @@
+"""Log-shipping replication of a task queue to a hot standby.
+
+The primary ships its structure's ChangeFeed, every add and remove, over
+a local socket to a standby process that applies it to its own copy of
+the structure. Supported structures are the linked lists of 3.py, 5.py
+and 7.py and the AdaptiveQueue 7.py can run on instead.
+
+Messages are JSON lines:
+
+- {"snapshot": seq, "kind": kind, "tasks": [...]}: a full copy, sent when
+  a standby connects and whenever the primary's feed ring has overwritten
+  events the standby has not been sent. It is taken under the feed's
+  change lock, so it holds exactly the changes before event seq; kind
+  names the primary's structure, which the standby switches to if its
+  own differs;
+- {"events": [...]}: a batch of the events that follow;
+- {"ping": seq}: sent while the primary is idle, so the standby can tell
+  a quiet primary from a dead one.
+
+The standby answers every message with {"ack": n}, where n is the number
+of events applied. In async mode the primary never waits for acks. In
+sync mode Primary.add_task and remove_task return only once the standby
+has applied the change. With no standby connected, sync mode runs as
+async rather than stop the bay.
+
+If no primary is heard from for ``failover_timeout`` seconds, the standby
+promotes itself: it stops taking the log and hands its structure over.
+
+Set MAINTENANCE_STANDBY=host:port to have 3.py, 5.py and 7.py ship their
+queue to ``python replication.py standby --port PORT --kind N``. The apps
+change their structure directly, so they ship asynchronously. Run
+``python replication.py`` to measure replication lag at 50k ops/sec.
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+from changefeed import ADDED, COMPLETED, ChangeFeed
+from dedup import PendingTaskSet
+from records import plate_from_code
+
+ASYNC = "async"
+SYNC = "sync"
+
+
+def records_digest(structure):
+    """Hash of a structure's pending tasks in order, to compare primary and standby"""
+    digest = hashlib.sha1()
+    for record in structure.get_all_records():
+        digest.update(f"{record.task}|{record.plate_id}|{record.priority}\n".encode())
+    return digest.hexdigest()
+
+
+def structure_kind(structure):
+    """The new_structure() kind ("3", "5", "7" or "adaptive") of a replicable structure"""
+    if hasattr(structure, "switch"):
+        return "adaptive"
+    if hasattr(structure, "insertion_sort"):
+        return "7"
+    return "3" if type(structure).__name__ == "SinglyLinkedList" else "5"
+
+
+def _close(connection):
+    try:
+        connection.shutdown(socket.SHUT_RDWR)  # Reaches the peer even while a makefile() reader holds the socket
+    except OSError:
+        pass
+    connection.close()
+
+
+def _send(connection, message):
+    connection.sendall((json.dumps(message, separators=(",", ":")) + "\n").encode())
+
+
+class Primary:
+    """Ship a structure's change feed to a standby, reconnecting as needed"""
+    def __init__(self, structure, address, mode=ASYNC, batch_size=4096, heartbeat=0.5, retry=1.0):
+        if structure.feed is None:
+            raise ValueError("The structure needs a ChangeFeed to replicate")
+        if mode not in (ASYNC, SYNC):
+            raise ValueError(f"Unknown acknowledgement mode: {mode!r}")
+        self.structure = structure
+        self.feed = structure.feed
+        self.address = address
+        self.mode = mode
+        self.batch_size = batch_size
+        self.heartbeat = heartbeat
+        self.retry = retry
+        self.lock = threading.Lock()  # Pairs a change made through the primary with its sequence number
+        self.acks = threading.Condition()
+        self.acked = 0
+        self.connected = False
+        self.snapshots = 0
+        self.sent = deque()  # (events up to and including a batch, publish time of its first event)
+        self.lags = deque(maxlen=100_000)  # Seconds from publish to the standby's ack
+        self.wakeup = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self._ship, name="replication", daemon=True)
+        self.thread.start()
+
+    def add_task(self, *args):
+        with self.lock:
+            result = self.structure.add_task(*args)
+            seq = self.feed.seq
+        self._commit(seq)
+        return result
+
+    def remove_task(self):
+        with self.lock:
+            result = self.structure.remove_task()
+            seq = self.feed.seq
+        self._commit(seq)
+        return result
+
+    def _commit(self, seq):
+        self.wakeup.set()
+        if self.mode == SYNC:
+            self.wait_for(seq)
+
+    def wait_for(self, seq, timeout=None):
+        """Wait until the standby has applied the first seq events; False on timeout or with no standby"""
+        with self.acks:
+            self.acks.wait_for(lambda: self.acked >= seq or not self.connected or not self.running, timeout)
+            return self.acked >= seq
+
+    def _ship(self):
+        while self.running:
+            try:
+                connection = socket.create_connection(self.address, timeout=self.retry)
+            except OSError:
+                time.sleep(self.retry)  # Standby not up yet
+                continue
+            connection.settimeout(None)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                self._stream(connection)
+            except (OSError, ValueError):
+                pass  # Standby went away; reconnect and send a fresh snapshot
+            finally:
+                _close(connection)
+                with self.acks:
+                    self.connected = False
+                    self.sent.clear()
+                    self.acks.notify_all()
+
+    def _snapshot(self):
+        """Subscribe and copy the structure at one point in the feed"""
+        with self.feed.changes:  # The structure's changes hold this until their events are published
+            subscription = self.feed.subscribe(batch_size=self.batch_size)
+            tasks = [[r.task, r.plate_id, r.priority] for r in self.structure.get_all_records()]
+        return subscription, tasks
+
+    def _stream(self, connection):
+        subscription, tasks = self._snapshot()
+        try:
+            _send(connection, {"snapshot": subscription.cursor, "kind": structure_kind(self.structure),
+                               "tasks": tasks})
+            self.snapshots += 1
+            reader = threading.Thread(target=self._read_acks, args=(connection,), daemon=True)
+            reader.start()
+            with self.acks:
+                self.connected = True
+            idle_since = time.monotonic()
+            while self.running and reader.is_alive():
+                batch = subscription.poll()
+                if subscription.missed:
+                    return  # The ring overwrote events before they were sent
+                if batch:
+                    self.sent.append((batch[-1].seq + 1, batch[0].at))
+                    _send(connection, {"events": [list(event) for event in batch]})
+                    idle_since = time.monotonic()
+                    continue
+                if time.monotonic() - idle_since >= self.heartbeat:
+                    _send(connection, {"ping": subscription.cursor})
+                    idle_since = time.monotonic()
+                self.wakeup.wait(self.heartbeat)
+                self.wakeup.clear()
+        finally:
+            subscription.close()
+
+    def _read_acks(self, connection):
+        try:
+            for line in connection.makefile("r", encoding="utf-8"):
+                acked = json.loads(line)["ack"]
+                now = time.time()
+                with self.acks:
+                    self.acked = acked
+                    while self.sent and self.sent[0][0] <= acked:
+                        self.lags.append(now - self.sent.popleft()[1])
+                    self.acks.notify_all()
+        except (OSError, ValueError):
+            pass
+
+    def stats(self):
+        lags = sorted(self.lags)
+
+        def pct(p):
+            return lags[min(len(lags) - 1, int(len(lags) * p / 100))] * 1000 if lags else 0.0
+        return {
+            "mode": self.mode,
+            "connected": self.connected,
+            "published": self.feed.seq,
+            "acked": self.acked,
+            "behind": self.feed.seq - self.acked,
+            "snapshots": self.snapshots,
+            "lag_p50_ms": pct(50),
+            "lag_p99_ms": pct(99),
+            "lag_max_ms": lags[-1] * 1000 if lags else 0.0,
+        }
+
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        with self.acks:
+            self.acks.notify_all()
+        self.thread.join()
+
+
+class Standby:
+    """Keep a copy of a primary's structure by applying its shipped log"""
+    def __init__(self, structure, host="127.0.0.1", port=0, failover_timeout=None, on_promote=None):
+        self.structure = structure
+        self.failover_timeout = failover_timeout  # Seconds without a primary before promoting; None waits forever
+        self.on_promote = on_promote
+        self.applied = 0  # Events applied, which is also the next sequence number expected
+        self.promoted = False
+        self.lock = threading.Lock()
+        self.listener = socket.create_server((host, port))
+        self.listener.settimeout(failover_timeout)  # Before the thread starts, so an early promote() cannot race it
+        self.address = self.listener.getsockname()
+        self.thread = threading.Thread(target=self._accept, name="standby", daemon=True)
+        self.thread.start()
+
+    def _accept(self):
+        heard = False
+        while not self.promoted:
+            try:
+                connection, _ = self.listener.accept()
+            except socket.timeout:
+                if heard:
+                    self.promote()  # The primary is gone and has not come back
+                continue
+            except OSError:
+                return  # Listener closed
+            heard = True
+            connection.settimeout(self.failover_timeout)
+            try:
+                self._serve(connection)
+            except (OSError, ValueError):
+                pass  # Lost or confused primary; a reconnect starts with a snapshot
+            finally:
+                _close(connection)
+
+    def _serve(self, connection):
+        for line in connection.makefile("r", encoding="utf-8"):
+            message = json.loads(line)
+            with self.lock:
+                if self.promoted:
+                    return
+                if "snapshot" in message:
+                    self._load(message["snapshot"], message["tasks"], message.get("kind"))
+                elif "events" in message:
+                    for event in message["events"]:
+                        self._apply(*event)
+                applied = self.applied
+            _send(connection, {"ack": applied})
+
+    def _load(self, seq, tasks, kind=None):
+        if kind is not None and kind != structure_kind(self.structure):
+            self.structure = new_structure(kind)  # Promotion must hand over what the primary ran
+        structure = self.structure
+        while structure.remove_task():
+            pass
+        for task, plate_id, priority in tasks:
+            structure.add_task(*((task, plate_id) if priority is None else (task, plate_id, priority)))
+        self.applied = seq
+
+    def _apply(self, seq, kind, task, plate_id, priority, at):
+        if seq < self.applied:
+            return  # Already applied
+        if seq > self.applied:
+            raise ValueError(f"Gap in the log: expected event {self.applied}, got {seq}")
+        if kind == ADDED:
+            self.structure.add_task(*((task, plate_id) if priority is None else (task, plate_id, priority)))
+        elif kind != COMPLETED:  # Completion follows the removal, which has already been applied
+            self._remove(task, plate_id)
+        self.applied = seq + 1
+
+    def _remove(self, task, plate_id):
+        structure = self.structure
+        if not hasattr(structure, "head"):  # AdaptiveQueue: look the plate up
+            record = next((r for r in structure.find(plate_id) if r.task == task), None)
+            if record is None:
+                raise ValueError(f"Removed task not in the standby: {task} - {plate_id}")
+            structure.remove_record(record)
+            return
+        node = structure.head
+        if node is not None and node.task == task and node.plate_id == plate_id:
+            structure.remove_task()  # The usual case: the primary removed its head too
+            return
+        while node is not None and not (node.task == task and node.plate_id == plate_id):
+            node = node.next
+        if node is None:
+            raise ValueError(f"Removed task not in the standby: {task} - {plate_id}")
+        structure.remove_record(node.record)  # The singly linked list has no remove_node
+
+    def promote(self):
+        """Stop taking the log and return the structure, ready to serve as the primary"""
+        with self.lock:
+            if self.promoted:
+                return self.structure
+            self.promoted = True
+        self.listener.close()
+        if hasattr(self.structure, "insertion_sort"):
+            self.structure.insertion_sort()  # The priority list is sorted by the app, not by its log
+        if self.on_promote is not None:
+            self.on_promote(self.structure)
+        return self.structure
+
+    def stats(self):
+        return {"applied": self.applied, "size": self.structure.size, "promoted": self.promoted,
+                "digest": records_digest(self.structure)}
+
+
+def new_structure(kind):
+    """An empty structure of the kind the app in <kind>.py uses (an AdaptiveQueue for "adaptive")"""
+    if kind == "adaptive":
+        return importlib.import_module("adaptive").AdaptiveQueue(dedup=PendingTaskSet(), feed=ChangeFeed())
+    module = importlib.import_module(str(kind))
+    return module.SinglyLinkedList(dedup=PendingTaskSet(), feed=ChangeFeed()) if str(kind) == "3" else \
+        module.DoublyLinkedList(dedup=PendingTaskSet(), feed=ChangeFeed())
+
+
+def replicate_from_env(structure):
+    """Ship a structure to the standby at MAINTENANCE_STANDBY (host:port) when it is set"""
+    target = os.environ.get("MAINTENANCE_STANDBY")
+    if not target:
+        return None
+    host, port = target.rsplit(":", 1)
+    return Primary(structure, (host, int(port)))
+
+
+def run_standby(port, kind, failover_timeout):
+    """Standby process: prints its port, then answers "stats" and "promote" on stdin with JSON lines"""
+    def promoted(structure):
+        print(json.dumps({"promoted": True, **standby.stats()}), flush=True)
+
+    standby = Standby(new_structure(kind), port=port, failover_timeout=failover_timeout, on_promote=promoted)
+    print(json.dumps({"port": standby.address[1]}), flush=True)
+    for line in sys.stdin:
+        command = line.strip()
+        if command == "stats":
+            with standby.lock:
+                print(json.dumps(standby.stats()), flush=True)
+        elif command == "promote":
+            standby.promote()
+
+
+def benchmark(rate=50_000, seconds=5.0, kind="3", backlog=10_000):
+    """Drive a primary at a fixed rate against a standby process and report replication lag"""
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "standby", "--kind", kind],
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+    port = json.loads(child.stdout.readline())["port"]
+
+    def ask(command):
+        child.stdin.write(command + "\n")
+        child.stdin.flush()
+        return json.loads(child.stdout.readline())
+
+    print(f"{rate:,} ops/sec target for {seconds:.0f}s, 3.py SinglyLinkedList, standby in another process")
+    print(f"{'MODE':<7}{'OPS/SEC':>10}{'LAG P50 ms':>12}{'P99 ms':>9}{'MAX ms':>9}{'BEHIND':>8}  COPY")
+    structure = primary = None
+    for mode in (ASYNC, SYNC):
+        structure = new_structure(kind)
+        structure.feed = ChangeFeed(capacity=1 << 20)
+        primary = Primary(structure, ("127.0.0.1", port), mode)
+        while not primary.connected:
+            time.sleep(0.01)
+        added = removed = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            # Pace in 1 ms slices: catch up to where the target rate says we should be
+            due = int((time.perf_counter() - start) * rate)
+            while added + removed < due and time.perf_counter() < deadline:
+                if added - removed < backlog:
+                    primary.add_task("Oil Change", plate_from_code(added % 182_000))
+                    added += 1
+                else:
+                    primary.remove_task()
+                    removed += 1
+            time.sleep(0.001)
+        achieved = (added + removed) / (time.perf_counter() - start)
+        primary.wait_for(structure.feed.seq, timeout=10)
+        stats = primary.stats()
+        copy = ask("stats")
+        same = copy["digest"] == records_digest(structure) and copy["size"] == structure.size
+        print(f"{mode:<7}{achieved:>10,.0f}{stats['lag_p50_ms']:>12.2f}{stats['lag_p99_ms']:>9.2f}"
+              f"{stats['lag_max_ms']:>9.2f}{stats['behind']:>8}  {'identical' if same else 'DIFFERENT'}")
+        if mode != SYNC:
+            primary.close()
+
+    # Fail over: the primary stops, the standby is promoted with the same queue
+    primary.close()
+    started = time.perf_counter()
+    promoted = ask("promote")
+    same = promoted["digest"] == records_digest(structure)
+    print(f"failover: standby promoted in {(time.perf_counter() - started) * 1000:.1f} ms with "
+          f"{promoted['size']:,} tasks ({'identical to' if same else 'DIFFERENT from'} the primary)")
+    child.stdin.close()
+    child.wait(10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replicate a task queue to a hot standby")
+    commands = parser.add_subparsers(dest="command")
+    standby_parser = commands.add_parser("standby", help="run a standby process")
+    standby_parser.add_argument("--port", type=int, default=0)
+    standby_parser.add_argument("--kind", choices=["3", "5", "7", "adaptive"], default="3",
+                                help="app whose structure is copied; a snapshot of another kind switches it")
+    standby_parser.add_argument("--failover-timeout", type=float, help="promote after this many seconds without a primary")
+    bench_parser = commands.add_parser("benchmark", help="measure replication lag (the default)")
+    bench_parser.add_argument("--rate", type=int, default=50_000, help="target ops/sec")
+    bench_parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    if args.command == "standby":
+        run_standby(args.port, args.kind, args.failover_timeout)
+    elif args.command == "benchmark":
+        benchmark(args.rate, args.seconds)
+    else:
+        benchmark()
@@ -0,0 +1,97 @@
+from bisect import bisect_left, insort
+
+
+class TaskSearchIndex:
+    """Prefix search over pending TaskRecords by plate ID or task name.
+
+    Keys live in two sorted arrays, so a prefix is a contiguous slice found
+    with bisect. A query that extends the previous one (the user typed one
+    more character) bisects only inside the previous keystroke's slices, and
+    only the rows that will be shown are ever materialized.
+    """
+    def __init__(self):
+        self.by_plate = []  # Sorted (plate_id, record id, record)
+        self.by_task = []  # Sorted (task name lower-cased, record id, record)
+        self._last_query = None
+        self._last_slices = None
+
+    def add(self, record):
+        insort(self.by_plate, (record.plate_id, record.id, record))
+        insort(self.by_task, (record.task.lower(), record.id, record))
+        self._last_query = None  # Slice positions have shifted
+
+    def remove(self, record):
+        self._discard(self.by_plate, (record.plate_id, record.id))
+        self._discard(self.by_task, (record.task.lower(), record.id))
+        self._last_query = None
+
+    def bulk_load(self, records):
+        """Replace the index with an iterable of TaskRecords"""
+        records = list(records)
+        self.by_plate = sorted((record.plate_id, record.id, record) for record in records)
+        self.by_task = sorted((record.task.lower(), record.id, record) for record in records)
+        self._last_query = None
+
+    def _discard(self, keys, key):
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i][:2] == key:
+            del keys[i]
+
+    def __len__(self):
+        return len(self.by_plate)
+
+    def _prefix_slice(self, keys, prefix, lo=0, hi=None):
+        """Return the [lo, hi) slice of keys whose first field starts with prefix"""
+        if hi is None:
+            hi = len(keys)
+        start = bisect_left(keys, (prefix,), lo, hi)
+        end = bisect_left(keys, (prefix + "\uffff",), start, hi)
+        return start, end
+
+    def _slices(self, query):
+        """Find the plate and task slices for a query, narrowing the last ones if possible"""
+        last = self._last_query
+        if last and query.startswith(last):
+            (plate_lo, plate_hi), (task_lo, task_hi) = self._last_slices
+        else:
+            plate_lo, plate_hi, task_lo, task_hi = 0, len(self.by_plate), 0, len(self.by_task)
+        slices = (self._prefix_slice(self.by_plate, query.upper(), plate_lo, plate_hi),
+                  self._prefix_slice(self.by_task, query.lower(), task_lo, task_hi))
+        self._last_query, self._last_slices = query, slices
+        return slices
+
+    def _overlap(self, query, plate_lo, plate_hi, task_lo, task_hi):
+        """Count the records in both slices by testing the smaller slice against the other prefix"""
+        if plate_hi == plate_lo or task_hi == task_lo:
+            return 0
+        if plate_hi - plate_lo <= task_hi - task_lo:
+            prefix = query.lower()
+            return sum(record.task.lower().startswith(prefix) for _, _, record in self.by_plate[plate_lo:plate_hi])
+        prefix = query.upper()
+        return sum(record.plate_id.startswith(prefix) for _, _, record in self.by_task[task_lo:task_hi])
+
+    def search(self, query, limit=None):
+        """Return (match count, up to limit TaskRecords) for a prefix query.
+
+        Plate matches are listed first, then task name matches. A record
+        matching both ways is listed and counted once.
+        """
+        query = query.strip()
+        if not query:
+            self._last_query = None
+            rows = self.by_plate if limit is None else self.by_plate[:limit]
+            return len(self.by_plate), [record for _, _, record in rows]
+
+        (plate_lo, plate_hi), (task_lo, task_hi) = self._slices(query)
+        total = (plate_hi - plate_lo) + (task_hi - task_lo) - self._overlap(query, plate_lo, plate_hi, task_lo, task_hi)
+        if limit is not None:
+            plate_hi = min(plate_hi, plate_lo + limit)
+        results = [record for _, _, record in self.by_plate[plate_lo:plate_hi]]
+        shown = {record.id for record in results}
+        for i in range(task_lo, task_hi):
+            if limit is not None and len(results) >= limit:
+                break
+            record = self.by_task[i][2]
+            if record.id not in shown:
+                results.append(record)
+        return total, results
@@ -0,0 +1,215 @@
+"""Segmented FIFO task queue that pages its middle to disk.
+
+SegmentedQueue has the same add_task/remove_task interface as the
+SinglyLinkedList of 3.py, but stores tasks in fixed-size segments. Only the
+head segment (being dequeued) and the tail segment (being filled) live in
+memory; full segments in between are written to a spool directory in a
+compact binary format, 24 bytes per task. When the head segment runs low, the
+next spilled segment is read ahead on a background thread, so dequeues do not
+wait on the disk. RAM therefore stays at about two segments however long the
+backlog grows.
+
+Run ``python segmented.py`` to measure throughput and memory against 3.py.
+"""
+import argparse
+import os
+import shutil
+import struct
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import TaskCounts
+from changefeed import ADDED, REMOVED
+from metrics import instrument
+from records import TASK_CODES, TaskRecord, plate_code, plate_from_code, task_name
+
+# Task code, priority (-1 for none), plate code, enqueue timestamp, TaskRecord id
+RECORD = struct.Struct("<bbxxidq")
+NO_PRIORITY = -1
+
+
+class SegmentedQueue:
+    """FIFO queue keeping head and tail segments in memory and the rest on disk"""
+    def __init__(self, segment_size=65536, read_ahead=None, spool_dir=None, dedup=None, feed=None):
+        self.segment_size = segment_size
+        # Start loading the next spilled segment once this few tasks are left in the head
+        self.read_ahead = segment_size // 4 if read_ahead is None else read_ahead
+        self.spool_dir = tempfile.mkdtemp(prefix="maintenance-segments-", dir=spool_dir)
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.counts = TaskCounts()  # Pending tasks per type
+        self.head = deque()  # Rows of (task code, priority, plate code, enqueued_at, record id)
+        self.tail = []
+        self.spilled = deque()  # Segment file paths, oldest first
+        self.loader = ThreadPoolExecutor(max_workers=1)
+        self.prefetch = None  # (path, future) of the segment being read ahead
+        self.next_segment = 0
+        self.size = 0
+        self.segments_written = 0
+        self.segments_read = 0
+
+    @instrument()
+    def add_task(self, task, plate_id, priority=None):
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False  # The same task is already pending for this plate
+        self.tail.append((TASK_CODES[task], NO_PRIORITY if priority is None else priority,
+                          plate_code(plate_id), time.time(), TaskRecord.reserve_id()))
+        self.size += 1
+        self.counts.add(task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, task, plate_id, priority)
+        if len(self.tail) >= self.segment_size:
+            self._seal_tail()
+        return True
+
+    def _seal_tail(self):
+        """The tail segment is full: hand it to the head if that is the next one, else spill it"""
+        if not self.head and not self.spilled:
+            self.head.extend(self.tail)
+        else:
+            path = os.path.join(self.spool_dir, f"{self.next_segment:08d}.seg")
+            self.next_segment += 1
+            with open(path, "wb") as f:
+                f.write(b"".join([RECORD.pack(*row) for row in self.tail]))
+            self.spilled.append(path)
+            self.segments_written += 1
+        self.tail = []
+
+    @instrument()
+    def remove_task(self):
+        """Remove task from the front and return its TaskRecord"""
+        if not self.head:
+            self._refill_head()
+            if not self.head:  # Queue is empty
+                return None
+        row = self.head.popleft()
+        self.size -= 1
+        if len(self.head) <= self.read_ahead:
+            self._start_prefetch()  # Does nothing once a read-ahead is running or nothing is spilled
+        record = _record(row)
+        self.counts.discard(record.task)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, record.task, record.plate_id, record.priority)
+        if self.dedup is not None:
+            self.dedup.discard(record.task, record.plate_id)
+        return record
+
+    def _refill_head(self):
+        if self.spilled:
+            self._start_prefetch()
+            path, future = self.prefetch
+            self.prefetch = None
+            self.spilled.popleft()
+            self.head.extend(future.result())
+            self.segments_read += 1
+            os.remove(path)
+        elif self.tail:
+            self.head.extend(self.tail)
+            self.tail = []
+
+    def _start_prefetch(self):
+        if self.prefetch is None and self.spilled:
+            path = self.spilled[0]
+            self.prefetch = (path, self.loader.submit(_read_segment, path))
+
+    def iter_records(self):
+        """Yield every pending task as a TaskRecord, front to back, reading spilled segments from disk"""
+        segments = [list(self.head)]
+        segments.extend(self.spilled)
+        segments.append(self.tail)
+        for segment in segments:
+            rows = _read_segment(segment) if isinstance(segment, str) else segment
+            for row in rows:
+                yield _record(row)
+
+    def get_all_records(self):
+        """Get all tasks as TaskRecords, front to back"""
+        return list(self.iter_records())
+
+    @instrument()
+    def get_all_tasks(self):
+        """Get all tasks as a list of strings"""
+        return [record.label() for record in self.iter_records()]
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "in_memory": len(self.head) + len(self.tail),
+            "spilled_segments": len(self.spilled),
+            "segments_written": self.segments_written,
+            "segments_read": self.segments_read,
+        }
+
+    def close(self):
+        """Stop the read-ahead thread and delete the spool directory"""
+        self.loader.shutdown(wait=True)
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _record(row):
+    """Rebuild the TaskRecord of a stored row, with the id it was given when added"""
+    code, priority, plate, enqueued_at, record_id = row
+    return TaskRecord(task_name(code), plate_from_code(plate),
+                      None if priority == NO_PRIORITY else priority, enqueued_at, record_id)
+
+
+def _read_segment(path):
+    with open(path, "rb") as f:
+        return list(RECORD.iter_unpack(f.read()))
+
+
+def _plates(count):
+    return [plate_from_code(i * 7919 % 182000) for i in range(count)]
+
+
+def benchmark(total=2_000_000, segment_size=65536, memory_tasks=300_000):
+    """Throughput of a fill-then-drain cycle, then peak memory against SinglyLinkedList"""
+    import importlib
+
+    plates = _plates(10000)
+    with SegmentedQueue(segment_size) as queue:
+        start = time.perf_counter()
+        for i in range(total):
+            queue.add_task("Oil Change", plates[i % len(plates)])
+        filled = time.perf_counter()
+        spilled = len(queue.spilled)
+        while queue.remove_task() is not None:
+            pass
+        drained = time.perf_counter()
+    print(f"SegmentedQueue, {total:,} tasks, segments of {segment_size:,} ({spilled} spilled at peak)")
+    print(f"  enqueue {total / (filled - start) * 60:>14,.0f} tasks/min")
+    print(f"  dequeue {total / (drained - filled) * 60:>14,.0f} tasks/min")
+
+    print("Peak traced memory holding a backlog of n tasks")
+    singly = importlib.import_module("3").SinglyLinkedList
+    for n in (memory_tasks // 4, memory_tasks // 2, memory_tasks):
+        row = []
+        for factory in (singly, lambda: SegmentedQueue(segment_size)):
+            tracemalloc.start()
+            queue = factory()
+            for i in range(n):
+                queue.add_task("Oil Change", plates[i % len(plates)])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if hasattr(queue, "close"):
+                queue.close()
+            row.append(peak // 1024)
+        print(f"  n={n:>9,}  SinglyLinkedList {row[0]:>9,} KB   SegmentedQueue {row[1]:>7,} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the segmented spill-to-disk queue")
+    parser.add_argument("--tasks", type=int, default=2_000_000)
+    parser.add_argument("--segment-size", type=int, default=65536)
+    parser.add_argument("--memory-tasks", type=int, default=300_000, help="largest backlog for the memory comparison")
+    args = parser.parse_args()
+    benchmark(args.tasks, args.segment_size, args.memory_tasks)
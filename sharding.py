@@ -0,0 +1,246 @@
+"""Sharded task queue spread over worker processes, one per group of workshops.
+
+Tasks are partitioned by plate series (the RA[A-G] letter checked by
+validate_plate_id). Each worker process owns a SinglyLinkedList from 3.py;
+the router talks to it through a pair of shared-memory ring buffers and
+batches requests so one ring update carries many tasks.
+
+Sharding does not scale adds anywhere near linearly. One Python router
+encodes and packs every task, and that is the bottleneck: on a multi-core
+machine adds went from 1.0x with one worker to 1.43x with three. On a
+single core more workers only compete with the router (0.63x with four).
+With seven plate series, worker counts that do not divide seven also get
+uneven shards. What sharding buys is queue state and pops that stay apart
+per group of workshops, not add throughput.
+
+Run ``python sharding.py`` for a throughput benchmark over 1..N workers.
+"""
+import argparse
+import importlib
+import multiprocessing as mp
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+from records import PLATE_SERIES, plate_code, plate_from_code, plate_series, task_code, task_name
+
+# Ring record: op, task code, priority, plate code
+RECORD = struct.Struct("<BBhi")
+# Head (consumer position) and tail (producer position). Native, aligned
+# 8-byte fields are stored with a single write, so the other side never
+# sees a half-updated position.
+POSITION = struct.Struct("@Q")
+HEAD, TAIL, DATA = 0, 8, 16
+
+OP_ADD = 1
+OP_POP = 2
+OP_SIZE = 3
+OP_STOP = 4
+OP_POPPED = 5
+OP_EMPTY = 6
+
+
+class SharedRing:
+    """Single-producer/single-consumer ring buffer of fixed-size records in shared memory"""
+    def __init__(self, capacity=65536, name=None):
+        self.capacity = capacity
+        size = DATA + capacity * RECORD.size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            POSITION.pack_into(self.shm.buf, HEAD, 0)
+            POSITION.pack_into(self.shm.buf, TAIL, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.buf = self.shm.buf
+        # Each side only ever writes its own position, so it can keep it locally
+        self.head = POSITION.unpack_from(self.buf, HEAD)[0]
+        self.tail = POSITION.unpack_from(self.buf, TAIL)[0]
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put_batch(self, records):
+        """Write records, waiting for the consumer whenever the ring is full"""
+        i = 0
+        tail = self.tail
+        while i < len(records):
+            free = self.capacity - (tail - POSITION.unpack_from(self.buf, HEAD)[0])
+            if free <= 0:
+                time.sleep(0)
+                continue
+            for record in records[i:i + free]:
+                RECORD.pack_into(self.buf, DATA + (tail % self.capacity) * RECORD.size, *record)
+                tail += 1
+                i += 1
+            # Publish the tail only after the records are written
+            POSITION.pack_into(self.buf, TAIL, tail)
+        self.tail = tail
+
+    def get_batch(self, limit=4096):
+        """Read up to limit records without waiting"""
+        head = self.head
+        count = min(POSITION.unpack_from(self.buf, TAIL)[0] - head, limit)
+        if count <= 0:
+            return []
+        records = [RECORD.unpack_from(self.buf, DATA + ((head + i) % self.capacity) * RECORD.size)
+                   for i in range(count)]
+        self.head = head + count
+        POSITION.pack_into(self.buf, HEAD, self.head)
+        return records
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def worker_main(request_name, response_name, capacity):
+    """Worker loop: apply requests to this shard's queue and answer POP/SIZE"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    queue = importlib.import_module("3").SinglyLinkedList()
+    requests = SharedRing(capacity, request_name)
+    responses = SharedRing(capacity, response_name)
+    idle = 0
+    try:
+        while True:
+            batch = requests.get_batch()
+            if not batch:
+                idle += 1
+                time.sleep(0 if idle < 1000 else 0.0005)
+                continue
+            idle = 0
+            replies = []
+            for op, code, priority, plate in batch:
+                if op == OP_ADD:
+                    queue.add_task(task_name(code), plate_from_code(plate))
+                elif op == OP_POP:
+                    record = queue.remove_task()
+                    if record:
+                        replies.append((OP_POPPED, task_code(record.task), 0, plate_code(record.plate_id)))
+                    else:
+                        replies.append((OP_EMPTY, 0, 0, 0))
+                elif op == OP_SIZE:
+                    replies.append((OP_SIZE, 0, 0, queue.size))
+                elif op == OP_STOP:
+                    return
+            if replies:
+                responses.put_batch(replies)
+    finally:
+        requests.close()
+        responses.close()
+
+
+class ShardedQueue:
+    """Router partitioning tasks by plate series across worker processes"""
+    def __init__(self, workers=None, capacity=65536, batch_size=512):
+        self.workers = workers or min(os.cpu_count() or 1, len(PLATE_SERIES))
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.pending = [[] for _ in range(self.workers)]
+        self.requests = []
+        self.responses = []
+        self.processes = []
+
+    def start(self):
+        context = mp.get_context("spawn")
+        for _ in range(self.workers):
+            requests, responses = SharedRing(self.capacity), SharedRing(self.capacity)
+            process = context.Process(target=worker_main, args=(requests.name, responses.name, self.capacity), daemon=True)
+            process.start()
+            self.requests.append(requests)
+            self.responses.append(responses)
+            self.processes.append(process)
+        return self
+
+    def shard_for(self, plate_id):
+        """Map a plate ID to its worker by plate series"""
+        return plate_series(plate_id) % self.workers
+
+    def add_task(self, task, plate_id):
+        """Queue an add for the plate's shard; sent once the batch fills up"""
+        shard = self.shard_for(plate_id)
+        batch = self.pending[shard]
+        batch.append((OP_ADD, task_code(task), 0, plate_code(plate_id)))
+        if len(batch) >= self.batch_size:
+            self._flush_shard(shard)
+
+    def _flush_shard(self, shard):
+        if self.pending[shard]:
+            self.requests[shard].put_batch(self.pending[shard])
+            self.pending[shard] = []
+
+    def flush(self):
+        """Send every partially filled batch"""
+        for shard in range(self.workers):
+            self._flush_shard(shard)
+
+    def _call(self, shard, op, timeout=10.0):
+        """Send one request after any batched adds and wait for its reply"""
+        self.pending[shard].append((op, 0, 0, 0))
+        self._flush_shard(shard)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            replies = self.responses[shard].get_batch(1)
+            if replies:
+                return replies[0]
+            time.sleep(0)
+        raise TimeoutError(f"Shard {shard} did not answer")
+
+    def remove_task(self, shard):
+        """Pop the oldest task of one shard; return (task, plate_id) or None"""
+        op, code, _, plate = self._call(shard, OP_POP)
+        if op == OP_EMPTY:
+            return None
+        return task_name(code), plate_from_code(plate)
+
+    def sizes(self):
+        """Get the number of pending tasks in each shard"""
+        return [self._call(shard, OP_SIZE)[3] for shard in range(self.workers)]
+
+    def stop(self):
+        self.flush()
+        for ring in self.requests:
+            ring.put_batch([(OP_STOP, 0, 0, 0)])
+        for process in self.processes:
+            process.join(timeout=5)
+        for ring in self.requests + self.responses:
+            ring.close(unlink=True)
+        self.requests, self.responses, self.processes = [], [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def benchmark(total=1_000_000, max_workers=None):
+    """Measure add throughput (tasks/sec) for 1..max_workers shards"""
+    max_workers = max_workers or min(os.cpu_count() or 1, len(PLATE_SERIES))
+    plates = [plate_from_code(i * 7919 % 182000) for i in range(10000)]
+    results = []
+    for workers in range(1, max_workers + 1):
+        with ShardedQueue(workers) as queue:
+            start = time.perf_counter()
+            for i in range(total):
+                queue.add_task("Oil Change", plates[i % len(plates)])
+            queue.flush()
+            sizes = queue.sizes()  # Waits until every worker has applied its adds
+            elapsed = time.perf_counter() - start
+        assert sum(sizes) == total
+        results.append((workers, total / elapsed))
+        print(f"{workers} worker(s): {total / elapsed:>12,.0f} tasks/sec  "
+              f"(speed-up {results[-1][1] / results[0][1]:.2f}x, shard sizes {sizes})")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sharded task queue")
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None, help="largest worker count to try")
+    args = parser.parse_args()
+    benchmark(args.tasks, args.workers)
@@ -0,0 +1,221 @@
+"""Fixed-record task table in shared memory, readable by other processes without copying.
+
+The table mirrors the Node layout of 5.py/7.py: every slot holds the task
+code, packed plate, priority and next/prev links as int32 indices. One
+writer (the GUI) mutates it; any number of reader processes attach by name
+and scan it in place. Readers use a seqlock: the writer makes the sequence
+number odd while it mutates and even again when done, and a reader retries
+any scan during which the sequence number changed.
+
+Only the writer owns the segment. Readers attach without registering it
+with their resource tracker, so a reader exiting does not unlink the
+table from under the writer and the other readers.
+"""
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from records import plate_code, plate_from_code, task_code, task_name
+
+# seq (u64), then head, tail, free list head, count, capacity (int32)
+HEADER = struct.Struct("@Qiiiii")
+SEQ = struct.Struct("@Q")
+# task code, plate code, priority, next, prev (int32); task code -1 marks a free slot
+FIELDS = 5
+TASK, PLATE, PRIORITY, NEXT, PREV = range(FIELDS)
+SLOT = struct.Struct("@" + "i" * FIELDS)
+NIL = -1
+
+
+def _attach(name):
+    """Open an existing segment without handing it to this process's resource tracker"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":  # Before 3.13 every POSIX attach registers the segment for unlinking at exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedTaskTable:
+    """Doubly linked task queue stored as fixed records in shared memory"""
+    def __init__(self, capacity=None, name=None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + capacity * SLOT.size)
+            self.owner = True
+        else:
+            self.shm = _attach(name)
+            self.owner = False
+            capacity = HEADER.unpack_from(self.shm.buf, 0)[5]
+        self.capacity = capacity
+        self.buf = self.shm.buf
+        # int32 view over the slots: slot i field f lives at index i * FIELDS + f
+        self.slots = self.buf[HEADER.size:HEADER.size + capacity * SLOT.size].cast("i")
+        if self.owner:
+            self._init_free_list()
+
+    @classmethod
+    def attach(cls, name):
+        """Open an existing table from another process for reading"""
+        return cls(name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _init_free_list(self):
+        slots = self.slots
+        for i in range(self.capacity):
+            base = i * FIELDS
+            slots[base + TASK] = NIL
+            slots[base + NEXT] = i + 1 if i + 1 < self.capacity else NIL
+        self.seq = 0
+        self.head = self.tail = NIL
+        self.free = 0 if self.capacity else NIL
+        self.count = 0
+        self._write_header()
+
+    def _write_header(self):
+        HEADER.pack_into(self.buf, 0, self.seq, self.head, self.tail, self.free, self.count, self.capacity)
+
+    def _begin_write(self):
+        self.seq += 1  # Odd: a write is in progress
+        SEQ.pack_into(self.buf, 0, self.seq)
+
+    def _end_write(self):
+        self.seq += 1
+        self._write_header()
+
+    # Writer side
+
+    def add_task(self, task, plate_id, priority=0):
+        """Append a task at the tail; return its slot index, or None when full"""
+        code, plate = task_code(task), plate_code(plate_id)  # A bad task or plate raises before any write
+        if self.free == NIL:
+            return None
+        self._begin_write()
+        try:
+            slots = self.slots
+            index = self.free
+            base = index * FIELDS
+            slots[base + PRIORITY] = priority  # The one store that can still fail, while the slot is free
+            self.free = slots[base + NEXT]
+            slots[base + TASK] = code
+            slots[base + PLATE] = plate
+            slots[base + NEXT] = NIL
+            slots[base + PREV] = self.tail
+            if self.tail == NIL:
+                self.head = index
+            else:
+                slots[self.tail * FIELDS + NEXT] = index
+            self.tail = index
+            self.count += 1
+        finally:
+            self._end_write()  # Never leave the sequence odd, or every reader spins until it gives up
+        return index
+
+    def remove(self, index):
+        """Unlink the task in slot index and return (task, plate_id, priority)"""
+        slots = self.slots
+        base = index * FIELDS
+        if slots[base + TASK] == NIL:
+            return None
+        self._begin_write()
+        record = (task_name(slots[base + TASK]), plate_from_code(slots[base + PLATE]), slots[base + PRIORITY])
+        prev, nxt = slots[base + PREV], slots[base + NEXT]
+        if prev == NIL:
+            self.head = nxt
+        else:
+            slots[prev * FIELDS + NEXT] = nxt
+        if nxt == NIL:
+            self.tail = prev
+        else:
+            slots[nxt * FIELDS + PREV] = prev
+        slots[base + TASK] = NIL
+        slots[base + NEXT] = self.free
+        self.free = index
+        self.count -= 1
+        self._end_write()
+        return record
+
+    def remove_task(self):
+        """Remove the task at the front"""
+        if self.head == NIL:
+            return None
+        return self.remove(self.head)
+
+    # Reader side
+
+    def _read_header(self):
+        return HEADER.unpack_from(self.buf, 0)
+
+    def read(self, scan, retries=1000):
+        """Run scan(head, count) under the seqlock, retrying if the writer interfered"""
+        for attempt in range(retries):
+            seq, head, _, _, count, _ = self._read_header()
+            if seq % 2:
+                time.sleep(0)
+                continue
+            try:
+                result = scan(head, count)
+            except (IndexError, ValueError):
+                result = None  # Followed a link that was being rewritten
+            if SEQ.unpack_from(self.buf, 0)[0] == seq and result is not None:
+                return result
+            time.sleep(0)
+        raise RuntimeError("Could not get a consistent read of the shared task table")
+
+    def _walk(self, head, count):
+        slots, rows, index = self.slots, [], head
+        while index != NIL:
+            if len(rows) > count:
+                return None  # The list changed under us
+            base = index * FIELDS
+            rows.append((slots[base + TASK], slots[base + PLATE], slots[base + PRIORITY]))
+            index = slots[base + NEXT]
+        return rows
+
+    def snapshot(self):
+        """Get a consistent list of (task code, plate code, priority) in queue order"""
+        return self.read(self._walk)
+
+    def get_all_tasks(self):
+        """Get all tasks as display strings, like DoublyLinkedList.get_all_tasks"""
+        return [f"{task_name(task)} - {plate_from_code(plate)} (Priority: {priority})"
+                for task, plate, priority in self.snapshot()]
+
+    def count_by_task(self, retries=8):
+        """Count pending tasks per task name by scanning the slots in place
+
+        Any write during the scan spoils it, so a busy writer could keep a
+        reader rescanning forever; give up with RuntimeError after retries.
+        """
+        records = self.buf[HEADER.size:HEADER.size + self.capacity * SLOT.size]
+
+        def scan(head, count):
+            counts = {}
+            for code, _, _, _, _ in SLOT.iter_unpack(records):
+                if code != NIL:
+                    counts[code] = counts.get(code, 0) + 1
+            return counts
+        try:
+            counts = self.read(scan, retries)
+        finally:
+            records.release()
+        return {task_name(code): n for code, n in counts.items()}
+
+    def __len__(self):
+        return self._read_header()[4]
+
+    def close(self):
+        self.slots.release()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:  # Already gone, e.g. removed by hand
+                if os.name == "posix":  # unlink() only unregisters the segment when it succeeds
+                    resource_tracker.unregister(self.shm._name, "shared_memory")
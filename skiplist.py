@@ -0,0 +1,285 @@
+"""Skip-list ordered task index with snapshot readers.
+
+SkipListIndex keeps TaskRecords ordered by (task, plate_id, seq), where seq
+is the record id, so equal task names stay in arrival order. Insert, delete
+and range scans are O(log n) expected and never rebalance. It offers the
+BinaryTree interface from 4.py (insert, remove, remove_record, range,
+get_all_records), but as nothing is ever rotated, readers can scan it while
+a writer changes it.
+
+One writer thread mutates the index while any number of readers scan it
+without taking a lock:
+
+- a new node is fully built before it is linked in, bottom level first;
+- every change gets a version number, and a reader only yields nodes
+  inserted at or before the version it started from and not yet deleted
+  at that version;
+- a deleted node stays linked until no running reader could still need
+  it, and unlinking leaves its own pointers intact, so a reader standing
+  on it carries on. Deleted nodes wait in deletion order, so each write
+  only unlinks from the front of that queue.
+
+Run ``python skiplist.py`` to benchmark it against the BinaryTree with
+mixed reader and writer threads.
+"""
+import argparse
+import importlib
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+from catalog import TaskCounts
+from changefeed import ADDED, REMOVED
+from metrics import instrument
+from records import TASK_NAMES, TaskRecord
+
+MAX_LEVEL = 32
+NEVER = float("inf")
+HIGHEST = "\U0010ffff"  # Sorts after every task name
+
+
+class SkipNode:
+    __slots__ = ("key", "record", "forward", "inserted", "deleted")
+
+    def __init__(self, key, record, level, inserted):
+        self.key = key
+        self.record = record
+        self.forward = [None] * level
+        self.inserted = inserted  # Version at which the node became visible
+        self.deleted = NEVER  # Version at which it was deleted
+
+
+class SkipListIndex:
+    """Ordered index over (task, plate_id, seq) for one writer and lock-free readers"""
+    def __init__(self, dedup=None, feed=None, seed=None):
+        self.head = SkipNode(None, None, MAX_LEVEL, 0)
+        self.level = 1
+        self.size = 0
+        self.version = 0
+        self.readers = {}  # Reader token -> snapshot version it is reading at
+        self.reader_ids = itertools.count()
+        self.retired = deque()  # Deleted nodes still linked for older readers, oldest deletion first
+        self.random = random.Random(seed)
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.counts = TaskCounts()  # Pending tasks per type
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and self.random.random() < 0.5:
+            level += 1
+        return level
+
+    def _predecessors(self, key):
+        """The last node before key on every level"""
+        update = [self.head] * MAX_LEVEL
+        node = self.head
+        for level in range(self.level - 1, -1, -1):
+            following = node.forward[level]
+            while following is not None and following.key < key:
+                node = following
+                following = node.forward[level]
+            update[level] = node
+        return update
+
+    # Writer side
+
+    @instrument()
+    def insert(self, task, plate_id):
+        """Insert a task; return True, or False if dedup rejects it"""
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False  # The same task is already pending for this plate
+        self.add_record(TaskRecord(task, plate_id))
+        return True
+
+    def add_record(self, record):
+        key = (record.task, record.plate_id, record.id)
+        update = self._predecessors(key)
+        level = self._random_level()
+        if level > self.level:
+            self.level = level  # Higher levels already point from the head, which readers start at
+        node = SkipNode(key, record, level, self.version + 1)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+        # Publish bottom-up: once level 0 links the node, every reader walking level 0 can reach it
+        for i in range(level):
+            update[i].forward[i] = node
+        self.version += 1
+        self.size += 1
+        self.counts.add(record.task)
+        if self.feed is not None:
+            self.feed.publish(ADDED, record.task, record.plate_id, record.priority)
+        self._reclaim()
+        return node
+
+    @instrument()
+    def remove(self, task, plate_id=None):
+        """Remove the first task with this name (and plate ID, when given)"""
+        prefix = (task,) if plate_id is None else (task, plate_id)
+        node = self._predecessors(prefix)[0].forward[0]
+        while node is not None and node.key[0] == task:
+            if node.deleted == NEVER and (plate_id is None or node.key[1] == plate_id):
+                return self._delete(node)
+            node = node.forward[0]
+        return False
+
+    @instrument()
+    def remove_record(self, record):
+        """Remove exactly the given TaskRecord"""
+        node = self._predecessors((record.task, record.plate_id, record.id))[0].forward[0]
+        if node is None or node.record is not record or node.deleted != NEVER:
+            return False
+        return self._delete(node)
+
+    def _delete(self, node):
+        self.version += 1
+        node.deleted = self.version  # Invisible to readers that start from now on
+        self.retired.append(node)
+        self.size -= 1
+        self.counts.discard(node.record.task)
+        if self.dedup is not None:
+            self.dedup.discard(node.record.task, node.record.plate_id)
+        if self.feed is not None:
+            self.feed.publish(REMOVED, node.record.task, node.record.plate_id, node.record.priority)
+        self._reclaim()
+        return True
+
+    def _reclaim(self):
+        """Unlink deleted nodes that no running reader can see any more"""
+        if not self.retired:
+            return
+        oldest = min(list(self.readers.values()), default=NEVER)
+        retired = self.retired
+        while retired and retired[0].deleted <= oldest:
+            self._unlink(retired.popleft())
+
+    def _unlink(self, node):
+        update = self._predecessors(node.key)
+        for i in range(len(node.forward) - 1, -1, -1):  # Top-down; the node keeps its own links
+            if update[i].forward[i] is node:
+                update[i].forward[i] = node.forward[i]
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+
+    # Reader side
+
+    def range(self, lo, hi):
+        """Yield the TaskRecords with task names in [lo, hi] in order, as of when the scan started"""
+        token = next(self.reader_ids)
+        # Hold back all reclaiming before reading the version, so nothing this
+        # snapshot can see is unlinked between the two steps
+        self.readers[token] = 0
+        snapshot = self.version
+        self.readers[token] = snapshot
+        try:
+            node = self._predecessors((lo,))[0].forward[0]
+            while node is not None and node.key[0] <= hi:
+                if node.inserted <= snapshot < node.deleted:
+                    yield node.record
+                node = node.forward[0]
+        finally:
+            del self.readers[token]
+
+    def count_range(self, lo, hi):
+        """Count the tasks whose names fall in [lo, hi] (a scan, O(log n + k))"""
+        return sum(1 for _ in self.range(lo, hi))
+
+    def __iter__(self):
+        return self.range("", HIGHEST)
+
+    def get_all_records(self):
+        """Get all TaskRecords in (task, plate_id, seq) order"""
+        return list(self)
+
+    @instrument()
+    def get_all_tasks(self):
+        """Get all tasks as a list of strings"""
+        return [record.label() for record in self]
+
+    def depth(self):
+        return self.level
+
+
+def benchmark(size=20_000, seconds=3.0, readers=3):
+    """Single-thread operation costs, then one writer and several range readers at once"""
+    binary_tree = importlib.import_module("4").BinaryTree
+    names = TASK_NAMES
+    plates = [f"RA{'ABCDEFG'[i % 7]}{i % 1000:03d}{chr(65 + i // 1000 % 26)}" for i in range(size)]
+
+    class LockedTree:
+        """BinaryTree behind one lock, as its readers cannot run during a write"""
+        def __init__(self):
+            self.tree = binary_tree(sys.maxsize)
+            self.lock = threading.Lock()
+
+        def insert(self, task, plate_id):
+            with self.lock:
+                return self.tree.insert(task, plate_id)
+
+        def remove(self, task, plate_id=None):
+            with self.lock:
+                return self.tree.remove(task, plate_id)
+
+        def range(self, lo, hi):
+            with self.lock:
+                return list(self.tree.range(lo, hi))
+
+    class SkipReader:
+        def __init__(self):
+            self.index = SkipListIndex(seed=1)
+            self.insert, self.remove = self.index.insert, self.index.remove
+
+        def range(self, lo, hi):
+            return list(self.index.range(lo, hi))
+
+    print(f"{size:,} tasks, {readers} reader thread(s) + 1 writer for {seconds:.0f}s")
+    for name, factory in (("BinaryTree (4.py) + lock", LockedTree), ("SkipListIndex", SkipReader)):
+        index = factory()
+        start = time.perf_counter()
+        for i in range(size):
+            index.insert(names[i % len(names)], plates[i])
+        fill = time.perf_counter() - start
+        start = time.perf_counter()
+        for task in names:
+            index.range(task, task)
+        scan = (time.perf_counter() - start) / len(names)
+
+        stop = threading.Event()
+        counts = {"writes": 0, "scans": 0}
+
+        def writer():
+            rng = random.Random(7)
+            while not stop.is_set():
+                i = rng.randrange(size)
+                if index.remove(names[i % len(names)], plates[i]):
+                    index.insert(names[i % len(names)], plates[i])
+                counts["writes"] += 2
+
+        def reader(seed):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                task = rng.choice(names)
+                index.range(task, task)
+                counts["scans"] += 1
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(s,)) for s in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        print(f"  {name:<26}fill {fill * 1e6 / size:>7.1f} us/insert   one-task scan {scan * 1000:>7.2f} ms   "
+              f"mixed: {counts['writes'] / seconds:>9,.0f} writes/s  {counts['scans'] / seconds:>7,.0f} scans/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the skip-list index against the BinaryTree")
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.size, args.seconds, args.readers)
@@ -0,0 +1,290 @@
+"""SQLite storage backend for the tracker.
+
+SQLiteTaskStore has the add_task/remove_task/get_all_tasks interface of the
+DoublyLinkedList in 5.py/7.py, but keeps the pending tasks in a local SQLite
+database so they survive a restart:
+
+- the database runs in WAL mode, so readers never block the writer;
+- every statement is a fixed SQL string, which sqlite3 prepares once per
+  connection and then reuses from its statement cache;
+- add_task buffers rows and writes each batch in one transaction;
+- the indexes on (priority, seq) and (plate_id) carry the selected columns,
+  so listing and plate lookups are answered from the index alone; in
+  priority order a task without a priority counts as priority 1, as in
+  capacity.py;
+- connections come from a small pool shared by the GUI and background threads.
+
+Run ``python sqlite_store.py`` to compare it with the in-memory lists and a
+JSON-lines journal.
+"""
+import argparse
+import importlib
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import sqlite3
+
+from catalog import TaskCounts
+from changefeed import ADDED, REMOVED
+from metrics import instrument
+from records import TaskRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task TEXT NOT NULL,
+    plate_id TEXT NOT NULL,
+    priority INTEGER,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_rank ON tasks (COALESCE(priority, 1), seq, task, plate_id, priority, enqueued_at);
+CREATE INDEX IF NOT EXISTS tasks_by_plate ON tasks (plate_id, task, priority);
+"""
+
+INSERT = "INSERT INTO tasks (task, plate_id, priority, enqueued_at) VALUES (?, ?, ?, ?)"
+COUNT = "SELECT COUNT(*) FROM tasks"
+COUNT_BY_TASK = "SELECT task, COUNT(*) FROM tasks GROUP BY task"
+SELECT_KEYS = "SELECT task, plate_id FROM tasks"
+# Deleting through a subquery keeps pop-front a single atomic statement
+POP = {
+    "fifo": "DELETE FROM tasks WHERE seq = (SELECT MIN(seq) FROM tasks) "
+            "RETURNING task, plate_id, priority, enqueued_at",
+    "priority": "DELETE FROM tasks WHERE seq = (SELECT seq FROM tasks ORDER BY COALESCE(priority, 1), seq LIMIT 1) "
+                "RETURNING task, plate_id, priority, enqueued_at",
+}
+# Batched drain; RETURNING does not keep the delete order, so rows carry their sort keys
+POP_MANY = {
+    "fifo": "DELETE FROM tasks WHERE seq IN (SELECT seq FROM tasks ORDER BY seq LIMIT ?) "
+            "RETURNING seq, seq, task, plate_id, priority, enqueued_at",
+    "priority": "DELETE FROM tasks WHERE seq IN (SELECT seq FROM tasks ORDER BY COALESCE(priority, 1), seq LIMIT ?) "
+                "RETURNING COALESCE(priority, 1), seq, task, plate_id, priority, enqueued_at",
+}
+SELECT_ALL = {
+    "fifo": "SELECT task, plate_id, priority, enqueued_at FROM tasks ORDER BY seq",
+    "priority": "SELECT task, plate_id, priority, enqueued_at FROM tasks ORDER BY COALESCE(priority, 1), seq",
+}
+SELECT_PLATE = "SELECT task, priority FROM tasks WHERE plate_id = ?"
+
+
+class ConnectionPool:
+    """Fixed set of WAL-mode connections handed out one thread at a time"""
+    def __init__(self, path, size=4):
+        self.path = path
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(self._connect())
+
+    def _connect(self):
+        # Autocommit mode: batches open their own transactions
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                     cached_statements=64)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsync at checkpoints
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    @contextmanager
+    def connection(self):
+        connection = self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put(connection)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+
+
+class SQLiteTaskStore:
+    """Persistent task queue with the DoublyLinkedList interface"""
+    def __init__(self, path="maintenance.db", order="fifo", batch_size=256, pool_size=4, dedup=None, feed=None):
+        if order not in POP:
+            raise ValueError(f"Unknown order: {order!r}")
+        self.order = order
+        self.batch_size = batch_size
+        self.dedup = dedup  # Optional PendingTaskSet rejecting duplicate tasks
+        self.feed = feed  # Optional ChangeFeed receiving an event per add and remove
+        self.counts = TaskCounts()  # Pending tasks per type, including those kept from earlier runs
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+            self.counts.update(dict(connection.execute(COUNT_BY_TASK).fetchall()))
+            if dedup is not None:
+                dedup.update(connection.execute(SELECT_KEYS))  # Tasks kept from earlier runs are still pending
+        self.buffer = []  # Added rows not yet written
+        self.lock = threading.Lock()
+
+    @instrument()
+    def add_task(self, task, plate_id, priority=None):
+        if self.dedup is not None and not self.dedup.add(task, plate_id):
+            return False  # The same task is already pending for this plate
+        with self.lock:
+            self.buffer.append((task, plate_id, priority, time.time()))
+            self.counts.add(task)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+        if self.feed is not None:
+            self.feed.publish(ADDED, task, plate_id, priority)
+        return True
+
+    def flush(self):
+        """Write any buffered tasks in one transaction"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        with self.pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(INSERT, self.buffer)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        self.buffer = []
+
+    @instrument()
+    def remove_task(self):
+        """Remove task from the front and return its TaskRecord"""
+        self.flush()
+        with self.pool.connection() as connection:
+            row = connection.execute(POP[self.order]).fetchone()
+        if row is None:  # Store is empty
+            return None
+        record = TaskRecord(*row)
+        self._removed([record])
+        return record
+
+    @instrument()
+    def remove_tasks(self, limit):
+        """Remove up to limit tasks from the front in one transaction, in queue order"""
+        self.flush()
+        with self.pool.connection() as connection:
+            rows = connection.execute(POP_MANY[self.order], (limit,)).fetchall()
+        rows.sort(key=lambda row: (row[0], row[1]))
+        records = [TaskRecord(*row[2:]) for row in rows]
+        self._removed(records)
+        return records
+
+    def _removed(self, records):
+        with self.lock:
+            for record in records:
+                self.counts.discard(record.task)
+        for record in records:
+            if self.feed is not None:
+                self.feed.publish(REMOVED, record.task, record.plate_id, record.priority)
+            if self.dedup is not None:
+                self.dedup.discard(record.task, record.plate_id)
+
+    @instrument()
+    def get_all_tasks(self):
+        """Get all tasks as a list of strings"""
+        return [record.label() for record in self.get_all_records()]
+
+    def get_all_records(self):
+        """Get all tasks as TaskRecords, front to back"""
+        self.flush()
+        with self.pool.connection() as connection:
+            return [TaskRecord(*row) for row in connection.execute(SELECT_ALL[self.order])]
+
+    def tasks_for_plate(self, plate_id):
+        """Get the (task, priority) pairs pending for one plate"""
+        self.flush()
+        with self.pool.connection() as connection:
+            return connection.execute(SELECT_PLATE, (plate_id,)).fetchall()
+
+    @property
+    def size(self):
+        with self.lock:  # A flush between the two reads would count its rows twice
+            with self.pool.connection() as connection:
+                return connection.execute(COUNT).fetchone()[0] + len(self.buffer)
+
+    def close(self):
+        self.flush()
+        self.pool.close()
+
+
+class JournalQueue:
+    """In-memory deque made durable by appending every change to a JSON-lines journal"""
+    def __init__(self, path):
+        self.journal = open(path, "a", encoding="utf-8")
+        self.tasks = deque()
+
+    def add_task(self, task, plate_id, priority=None):
+        self.journal.write(json.dumps(["add", task, plate_id, priority]) + "\n")
+        self.tasks.append(TaskRecord(task, plate_id, priority))
+        return True
+
+    def remove_task(self):
+        if not self.tasks:
+            return None
+        self.journal.write('["pop"]\n')
+        return self.tasks.popleft()
+
+    def get_all_tasks(self):
+        self.journal.flush()
+        return [record.label() for record in self.tasks]
+
+    def close(self):
+        self.journal.close()
+
+
+def benchmark(sizes=(10_000, 100_000)):
+    """Time fill, list and drain for the in-memory lists, the journal and SQLite"""
+    doubly = importlib.import_module("5").DoublyLinkedList
+    priority_list = importlib.import_module("7").DoublyLinkedList
+    workdir = tempfile.mkdtemp(prefix="maintenance-sqlite-")
+    plates = [f"RA{'ABCDEFG'[i % 7]}{i % 1000:03d}{chr(65 + i // 1000 % 26)}" for i in range(10000)]
+    candidates = [
+        ("DoublyLinkedList (5.py)", lambda n: doubly()),
+        ("priority list (7.py)", lambda n: priority_list()),
+        ("JSON-lines journal", lambda n: JournalQueue(os.path.join(workdir, f"journal-{n}.jsonl"))),
+        ("SQLite, batches of 256", lambda n: SQLiteTaskStore(os.path.join(workdir, f"batched-{n}.db"))),
+        ("SQLite, batched drain", lambda n: SQLiteTaskStore(os.path.join(workdir, f"drain-{n}.db"))),
+        ("SQLite, no batching", lambda n: SQLiteTaskStore(os.path.join(workdir, f"single-{n}.db"), batch_size=1)),
+    ]
+    print(f"{'structure':<26}{'n':>9}{'fill ms':>11}{'list ms':>10}{'drain ms':>11}")
+    for n in sizes:
+        for name, factory in candidates:
+            store = factory(n)
+            start = time.perf_counter()
+            for i in range(n):
+                if isinstance(store, doubly):  # 5.py has no priorities
+                    store.add_task("Oil Change", plates[i % len(plates)])
+                else:
+                    store.add_task("Oil Change", plates[i % len(plates)], i % 5 + 1)
+            if hasattr(store, "insertion_sort") and n <= 10_000:
+                store.insertion_sort()  # Quadratic, so only sorted at the small size
+            if hasattr(store, "flush"):
+                store.flush()
+            filled = time.perf_counter()
+            store.get_all_tasks()
+            listed = time.perf_counter()
+            if name == "SQLite, batched drain":
+                while store.remove_tasks(256):
+                    pass
+            else:
+                while store.remove_task() is not None:
+                    pass
+            drained = time.perf_counter()
+            if hasattr(store, "close"):
+                store.close()
+            print(f"{name:<26}{n:>9,}{(filled - start) * 1000:>11.1f}{(listed - filled) * 1000:>10.1f}"
+                  f"{(drained - listed) * 1000:>11.1f}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite backend against the in-memory lists")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    benchmark(parser.parse_args().sizes)
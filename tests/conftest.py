@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts live flat at the top of the repository (2.py ... 7.py and their modules)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,79 @@
+from adaptive import AdaptiveQueue, adaptive_from_env
+from capacity import DROP_LOWEST_PRIORITY, BoundedQueue
+from dedup import PendingTaskSet
+
+
+def _plates(records):
+    return [record.plate_id for record in records]
+
+
+def test_order_is_priority_then_arrival_with_front_adds_first():
+    queue = AdaptiveQueue()
+    queue.add_task("Oil Change", "RAA001A", 2)
+    queue.add_task("Oil Change", "RAA002A")
+    queue.add_task("Oil Change", "RAA003A", 1, front=True)
+    queue.add_task("Oil Change", "RAA004A", 3)
+    assert _plates(queue.get_all_records()) == ["RAA003A", "RAA002A", "RAA001A", "RAA004A"]
+    assert _plates(iter(queue.remove_task, None)) == ["RAA003A", "RAA002A", "RAA001A", "RAA004A"]
+
+
+def test_lookups_switch_to_buckets_and_fifo_work_switches_back():
+    queue = AdaptiveQueue(check_every=64, migrate_step=8)
+    for i in range(2000):
+        queue.add_task("Oil Change", f"RA{'ABCDEFG'[i % 7]}{i % 1000:03d}{chr(65 + i // 1000)}")
+    for i in range(256):
+        queue.find(f"RAA{i:03d}A")
+    assert queue.switches and queue.switches[0][1:] == ("fifo", "buckets")
+    for i in range(4096):
+        queue.add_task("Battery Check", f"RAB{i % 1000:03d}{chr(65 + i // 1000)}")
+        queue.remove_task()
+    assert queue.backend_name == "fifo" and queue.switches[-1][1:] == ("buckets", "fifo")
+    assert queue.size == 2000 and queue.counts.total == 2000
+
+
+def test_records_stay_in_order_while_migrating():
+    queue = AdaptiveQueue(adaptive=False, migrate_step=1)
+    for i in range(10):
+        queue.add_task("Oil Change", f"RAA00{i}A", 1 + i % 2)
+    queue.switch("buckets")
+    assert queue.draining is not None
+    assert _plates(queue.get_all_records()) == [f"RAA00{i}A" for i in (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)]
+    assert [r.plate_id for r in iter(queue.remove_task, None)] == [f"RAA00{i}A" for i in (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)]
+
+
+def test_remove_takes_the_older_task_from_the_draining_backend():
+    queue = AdaptiveQueue(adaptive=False, migrate_step=1)
+    older = [queue.add_task("Oil Change", "RAA001A") for _ in range(3)]
+    assert older == [True] * 3
+    queue.switch("buckets")
+    queue.add_task("Oil Change", "RAA001A")
+    first = queue.get_all_records()[0]
+    assert queue.remove("Oil Change", "RAA001A") is first
+
+
+def test_remove_record_removes_exactly_that_record():
+    queue = AdaptiveQueue(dedup=PendingTaskSet())
+    queue.add_task("Oil Change", "RAA001A")
+    queue.add_task("Brake Inspection", "RAA001A")
+    record = queue.find("RAA001A")[1]
+    assert queue.remove_record(record)
+    assert not queue.remove_record(record)
+    assert [r.task for r in queue.get_all_records()] == ["Oil Change"]
+    assert ("Brake Inspection", "RAA001A") not in queue.dedup
+
+
+def test_bounded_adaptive_queue_drops_the_least_urgent_task():
+    queue = BoundedQueue(AdaptiveQueue(), 2, DROP_LOWEST_PRIORITY)
+    assert queue.offer("Oil Change", "RAA001A", 1)
+    assert queue.offer("Oil Change", "RAA002A", 4)
+    assert queue.offer("Oil Change", "RAA003A", 2)
+    assert not queue.offer("Oil Change", "RAA004A", 5)
+    assert [(r.plate_id, r.priority) for r in queue.structure.get_all_records()] == [("RAA001A", 1), ("RAA003A", 2)]
+    assert queue.dropped == 2
+
+
+def test_adaptive_from_env(monkeypatch):
+    monkeypatch.delenv("MAINTENANCE_ADAPTIVE", raising=False)
+    assert adaptive_from_env() is None
+    monkeypatch.setenv("MAINTENANCE_ADAPTIVE", "1")
+    assert isinstance(adaptive_from_env(backend="buckets"), AdaptiveQueue)
@@ -0,0 +1,91 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from adaptive import AdaptiveQueue
+from analytics import MAX_PRIORITY, TaskColumns, iter_structure
+from records import TASK_NAMES, TaskRecord
+from segmented import SegmentedQueue
+from sqlite_store import SQLiteTaskStore
+
+ROWS = [
+    ("Oil Change", "RAA001A", 2, 0.0),
+    ("Oil Change", "RAA001A", 0, 1800.0),
+    ("Battery Check", "RAA001A", 1, 3600.0),
+    ("Battery Check", "RAA002A", 1, float("nan")),
+]
+
+
+def test_counts_by_task_and_priority():
+    columns = TaskColumns.from_rows(ROWS)
+    assert len(columns) == 4
+    matrix = columns.counts_by_task_priority()
+    assert matrix.shape == (len(TASK_NAMES), MAX_PRIORITY + 1)
+    oil, battery = TASK_NAMES.index("Oil Change"), TASK_NAMES.index("Battery Check")
+    assert matrix[oil].tolist() == [1, 0, 1, 0, 0, 0]
+    assert matrix[battery].tolist() == [0, 2, 0, 0, 0, 0]
+    assert columns.counts_by_task()["Battery Check"] == 2
+
+
+def test_plate_queries():
+    columns = TaskColumns.from_rows(ROWS)
+    assert columns.plates_with_more_than(2) == ["RAA001A"]
+    assert columns.plates_with_more_than(0) == ["RAA001A", "RAA002A"]
+    assert columns.top_plates(5) == [("RAA001A", 3), ("RAA002A", 1)]
+
+
+def test_age_histogram_skips_unknown_timestamps():
+    counts, edges = TaskColumns.from_rows(ROWS).age_histogram(bins=2, now=3600.0)
+    assert counts.sum() == 3
+    assert edges[0] == 0.0 and edges[-1] == 1.0
+
+
+def _fill(structure):
+    structure.add_task("Oil Change", "RAA001A", 2)
+    structure.add_task("Battery Check", "RAA002A")
+    return structure
+
+
+def _expected(rows):
+    return sorted((task, plate, priority) for task, plate, priority, _ in rows)
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: AdaptiveQueue(),
+    lambda tmp_path: SegmentedQueue(segment_size=1, spool_dir=str(tmp_path)),
+    lambda tmp_path: SQLiteTaskStore(str(tmp_path / "tasks.db")),
+], ids=["adaptive", "segmented", "sqlite"])
+def test_queue_and_store_modules_export_through_get_all_records(make, tmp_path):
+    structure = _fill(make(tmp_path))
+    rows = list(iter_structure(structure))
+    assert _expected(rows) == [("Battery Check", "RAA002A", 0), ("Oil Change", "RAA001A", 2)]
+    assert all(not np.isnan(enqueued_at) for *_, enqueued_at in rows)
+    assert len(TaskColumns.from_structure(structure)) == 2
+    if hasattr(structure, "close"):
+        structure.close()
+
+
+def test_app_structures_export():
+    records = [TaskRecord("Oil Change", "RAA001A", 3)]
+    assert list(iter_structure(records))[0][:3] == ("Oil Change", "RAA001A", 3)
+
+    singly = importlib.import_module("3").SinglyLinkedList()
+    singly.add_task("Oil Change", "RAA001A")
+    tree = importlib.import_module("4").BinaryTree(10)
+    tree.insert("Oil Change", "RAA002A")
+    tree.insert("Battery Check", "RAA001A")
+    priority_list = importlib.import_module("7").DoublyLinkedList()
+    priority_list.add_task("Oil Change", "RAA003A", 4)
+    assert _expected(iter_structure(singly)) == [("Oil Change", "RAA001A", 0)]
+    assert _expected(iter_structure(tree)) == [("Battery Check", "RAA001A", 0), ("Oil Change", "RAA002A", 0)]
+    assert _expected(iter_structure(priority_list)) == [("Oil Change", "RAA003A", 4)]
+
+
+def test_task_tree_exports_only_jobs():
+    tree_module = importlib.import_module("6")
+    tree = tree_module.TaskTree()
+    tree.set_root(tree_module.TreeNode("Maintenance"))
+    tree.add_task("Maintenance", "Oil Change")
+    tree.add_task("Oil Change", "Oil Change", "RAA001A")
+    assert [row[:3] for row in iter_structure(tree)] == [("Oil Change", "RAA001A", 0)]
@@ -0,0 +1,101 @@
+import calendar
+import random
+
+from archive import TaskArchive, decode_block, encode_block, month_key, month_range, quarter
+from records import TASK_NAMES, plate_from_code
+
+
+def _history(count, seed=11):
+    rng = random.Random(seed)
+    start = calendar.timegm((2026, 1, 1, 0, 0, 0))
+    return [(rng.choice(TASK_NAMES), plate_from_code(rng.randrange(300)), start + rng.randrange(180 * 86400),
+             rng.choice([None, 1, 5])) for _ in range(count)]
+
+
+def _key(item):
+    """(plate, time, task, priority) of a history tuple or an ArchivedTask"""
+    if hasattr(item, "completed_at"):
+        item = (item.task, item.plate_id, item.completed_at, item.priority)
+    return item[1], item[2], item[0], -1 if item[3] is None else item[3]
+
+
+def test_block_round_trip():
+    rows = sorted((random.randrange(182_000), random.randrange(2**40), random.randrange(10), random.choice([-1, 3]))
+                  for _ in range(500))
+    plates, times, tasks, priorities = decode_block(encode_block(rows))
+    assert list(zip(plates, times, tasks, priorities)) == rows
+
+
+def test_partition_bounds():
+    assert month_range("2026-12") == (calendar.timegm((2026, 12, 1, 0, 0, 0)), calendar.timegm((2027, 1, 1, 0, 0, 0)))
+    assert quarter(2026, 2) == (calendar.timegm((2026, 4, 1, 0, 0, 0)), calendar.timegm((2026, 7, 1, 0, 0, 0)))
+    assert month_key(calendar.timegm((2026, 7, 31, 23, 59, 59))) == "2026-07"
+
+
+def test_history_round_trips_through_runs_compaction_and_reopening(tmp_path):
+    history = _history(3000)
+    archive = TaskArchive(str(tmp_path), block_rows=64)
+    for i, item in enumerate(history):
+        archive.append(*item)
+        if i in (999, 1999):
+            archive.flush()  # Several runs per partition
+    everything = sorted(_key(t) for t in archive.query())  # Two runs per partition and a buffer
+    assert everything == sorted(_key(item) for item in history)
+    archive.close()
+    assert archive.stats()["runs"] == 3 * 6
+    archive.compact()
+    assert archive.stats()["runs"] == 6
+
+    reopened = TaskArchive(str(tmp_path), block_rows=64)
+    assert sorted(_key(t) for t in reopened.query()) == everything
+    plate = history[0][1]
+    expected = sorted((item for item in history if item[1] == plate), key=lambda item: item[2])
+    assert [(t.task, t.plate_id, t.completed_at, t.priority) for t in reopened.history(plate)] == expected
+    start, end = quarter(2026, 2)
+    in_range = sorted(_key(item) for item in history if start <= item[2] < end)
+    assert sorted(_key(t) for t in reopened.query(None, start, end)) == in_range
+    reopened.close()
+
+
+def test_plate_query_reads_only_the_blocks_that_can_hold_it(tmp_path):
+    archive = TaskArchive(str(tmp_path), block_rows=16)
+    for item in _history(2000):
+        archive.append(*item)
+    archive.flush()
+    blocks = archive.stats()["rows"] // 16
+    list(archive.query(plate_from_code(5)))
+    assert 0 < archive.blocks_read < blocks // 4
+    archive.close()
+
+
+def test_compaction_waits_for_a_running_query(tmp_path):
+    archive = TaskArchive(str(tmp_path), block_rows=16)
+    history = [item for item in _history(600) if month_key(item[2]) == "2026-01"]
+    for i, item in enumerate(history):
+        archive.append(*item)
+        if i == len(history) // 2:
+            archive.flush()
+    archive.flush()
+    query = archive.query()
+    first = next(query)  # Pins both runs
+    archive.compact()
+    assert len(list(tmp_path.iterdir())) == 3  # The old runs outlive the compaction while pinned
+    rows = [first] + list(query)
+    assert sorted(_key(t) for t in rows) == sorted(_key(item) for item in history)
+    assert len(list(tmp_path.iterdir())) == 1
+    assert sorted(_key(t) for t in archive.query()) == sorted(_key(item) for item in history)
+    archive.close()
+
+
+def test_only_completed_tasks_are_archived(tmp_path):
+    from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed
+    feed = ChangeFeed()
+    archive = TaskArchive(str(tmp_path))
+    archive.follow(feed)
+    feed.publish(ADDED, "Oil Change", "RAA001A")
+    feed.publish(ADDED, "Oil Change", "RAA002A")
+    feed.publish(REMOVED, "Oil Change", "RAA001A")  # Evicted, never done
+    feed.publish(REMOVED, "Oil Change", "RAA002A")
+    feed.publish(COMPLETED, "Oil Change", "RAA002A", 3)
+    archive.close()
+    assert [(t.plate_id, t.priority) for t in archive.query()] == [("RAA002A", 3)]
@@ -0,0 +1,12 @@
+import benchmark
+
+
+def test_suite_runs_only_the_chosen_structures():
+    results = benchmark.run_suite(max_exp=2, workloads=["fifo_churn", "search_heavy"], structures=["3", "6"])
+    assert {key.split("|")[0] for key in results} == {"SinglyLinkedList (3.py)", "TaskTree (6.py)"}
+    assert all(result["status"] == "ok" for result in results.values())
+
+
+def test_main_accepts_structure_option(capsys):
+    assert benchmark.main(["--max-exp", "1", "--structure", "4", "--workload", "bulk_load"]) == 0
+    assert "BinaryTree (4.py)" in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import importlib
+import random
+
+import pytest
+
+from records import TASK_NAMES, plate_from_code
+
+BinaryTree = importlib.import_module("4").BinaryTree
+
+
+def _check(tree):
+    """AVL balance, subtree counts and key order hold everywhere"""
+    def walk(node):
+        if node is None:
+            return 0, 0
+        left_height, left_count = walk(node.left)
+        right_height, right_count = walk(node.right)
+        assert abs(left_height - right_height) <= 1
+        assert node.count == 1 + left_count + right_count
+        assert node.height == 1 + max(left_height, right_height)
+        return node.height, node.count
+    assert walk(tree.root)[1] == tree.size
+    keys = [(r.task, r.plate_id, r.id) for r in tree.get_all_records()]
+    assert keys == sorted(keys)
+
+
+@pytest.fixture
+def filled():
+    rng = random.Random(4)
+    tree = BinaryTree(10_000)
+    tasks = []
+    for i in range(600):
+        task = rng.choice(TASK_NAMES[:4])
+        tree.insert(task, plate_from_code(i))
+        tasks.append(task)
+    return tree, sorted(tasks)
+
+
+def test_one_task_name_stays_shallow():
+    tree = BinaryTree(10_000)
+    for i in range(5000):
+        tree.insert("Oil Change", plate_from_code(i))
+    assert tree.depth() <= 1.45 * 13 + 2  # AVL bound for 5000 nodes
+    for i in range(0, 5000, 2):
+        assert tree.remove("Oil Change", plate_from_code(i))
+    _check(tree)
+    assert tree.size == 2500 and tree.counts["Oil Change"] == 2500
+
+
+def test_rank_select_and_counts(filled):
+    tree, tasks = filled
+    _check(tree)
+    for task in TASK_NAMES:
+        assert tree.rank(task) == sum(t < task for t in tasks)
+    records = tree.get_all_records()
+    for k in (0, 1, 299, 599):
+        assert tree.select(k).record is records[k]
+    assert tree.select(600) is None
+    lo, hi = sorted(TASK_NAMES[:2])
+    assert tree.count_range(lo, hi) == sum(lo <= t <= hi for t in tasks)
+    assert tree.count_range(hi, lo) == 0
+
+
+def test_range_and_iter_from(filled):
+    tree, tasks = filled
+    lo, hi = sorted(TASK_NAMES[1:3])
+    in_range = list(tree.range(lo, hi))
+    assert [r.task for r in in_range] == [t for t in tasks if lo <= t <= hi]
+    assert list(tree.iter_from(590)) == tree.get_all_records()[590:]
+    assert list(tree.iter_from(600)) == []
+
+
+def test_remove_matches_plate_or_record(filled):
+    tree, _ = filled
+    rng = random.Random(9)
+    records = tree.get_all_records()
+    for record in rng.sample(records, 300):
+        assert tree.remove_record(record)
+        assert not tree.remove_record(record)
+        _check(tree)
+    remaining = tree.get_all_records()
+    first = remaining[0]
+    assert tree.find(first.task, first.plate_id) is first
+    assert tree.remove(first.task, first.plate_id)
+    assert tree.find(first.task, first.plate_id) is None
+    assert not tree.remove("Oil Change", "RZZ999Z")
+    assert tree.remove(remaining[1].task)  # Any task of that name
+    assert tree.size == 298
@@ -0,0 +1,129 @@
+import importlib
+
+import pytest
+
+from capacity import (DROP_LOWEST_PRIORITY, DROP_OLDEST, POLICIES, REJECT, SPILL, BoundedQueue,
+                      bounded_from_env, burst_benchmark)
+from dedup import PendingTaskSet
+
+singly = importlib.import_module("3")
+tree = importlib.import_module("4")
+priority = importlib.import_module("7")
+
+
+def test_reject_and_duplicate_are_told_apart():
+    queue = BoundedQueue(singly.SinglyLinkedList(dedup=PendingTaskSet()), 2, REJECT)
+    assert queue.offer("Oil Change", "RAA123A") is True
+    assert queue.offer("Oil Change", "RAA123A") is None
+    assert queue.offer("Battery Check", "RAA123A") is True
+    assert queue.offer("Coolant Flush", "RAB456B") is False
+    assert queue.stats()["rejected"] == 1
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_capacity_zero_never_holds_a_task(policy):
+    queue = BoundedQueue(priority.DoublyLinkedList(), 0, policy)
+    try:
+        queue.offer("Oil Change", "RAA123A", 3)
+        assert len(queue) == 0
+        assert queue.get() is None
+    finally:
+        queue.close()
+
+
+def test_drop_lowest_priority_keeps_the_most_urgent():
+    queue = BoundedQueue(priority.DoublyLinkedList(), 2, DROP_LOWEST_PRIORITY)
+    queue.offer("Oil Change", "RAA001A", 3)
+    queue.offer("Oil Change", "RAA002A", 2)
+    assert queue.offer("Oil Change", "RAA003A", 5) is False  # Least urgent of all, so it is the one dropped
+    assert queue.offer("Oil Change", "RAA004A", 1) is True
+    assert [(r.plate_id, r.priority) for r in queue.structure.get_all_records()] == [("RAA004A", 1), ("RAA002A", 2)]
+
+
+def test_drop_oldest_does_not_evict_for_a_duplicate():
+    queue = BoundedQueue(singly.SinglyLinkedList(dedup=PendingTaskSet()), 2, DROP_OLDEST)
+    queue.offer("Oil Change", "RAA001A")
+    queue.offer("Oil Change", "RAA002A")
+    assert queue.offer("Oil Change", "RAA002A") is None
+    assert queue.offer("Oil Change", "RAA003A") is True
+    assert [r.plate_id for r in queue.structure.get_all_records()] == ["RAA002A", "RAA003A"]
+
+
+def test_spilled_tasks_come_back_when_a_row_is_removed():
+    binary_tree = tree.BinaryTree(10)
+    queue = BoundedQueue(binary_tree, 2, SPILL)
+    try:
+        for plate in ("RAA001A", "RAA002A", "RAA003A"):
+            assert queue.offer("Oil Change", plate)
+        assert len(queue) == 2 and len(queue.spill) == 1
+        queue.remove_record(binary_tree.select(0).record)
+        assert sorted(r.plate_id for r in binary_tree.get_all_records()) == ["RAA002A", "RAA003A"]
+        assert len(queue.spill) == 0
+    finally:
+        queue.close()
+
+
+@pytest.mark.parametrize("make", [
+    lambda: singly.SinglyLinkedList(),
+    lambda: importlib.import_module("5").DoublyLinkedList(),
+    lambda: priority.DoublyLinkedList(),
+], ids=["3.py", "5.py", "7.py"])
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_remove_record_on_the_linked_lists(make, index):
+    queue = BoundedQueue(make(), 3, SPILL)
+    try:
+        for i in range(4):
+            queue.offer("Oil Change", f"RAA00{i}A", 1)
+        records = queue.structure.get_all_records()
+        queue.remove_record(records[index])
+        expected = [r.plate_id for r in records if r is not records[index]] + ["RAA003A"]
+        assert [r.plate_id for r in queue.structure.get_all_records()] == expected
+        assert queue.structure.remove_record(records[index]) is False
+        assert queue.structure.size == 3
+        queue.offer("Oil Change", "RAA004A", 1)  # Lands behind the refilled task, so the tail was kept right
+        assert [r.plate_id for r in iter(queue.get, None)] == expected + ["RAA004A"]
+    finally:
+        queue.close()
+
+
+def test_spilled_tasks_stay_deduplicated():
+    queue = BoundedQueue(singly.SinglyLinkedList(dedup=PendingTaskSet()), 1, SPILL)
+    try:
+        assert queue.offer("Oil Change", "RAA001A") is True
+        assert queue.offer("Oil Change", "RAA002A") is True
+        assert queue.offer("Oil Change", "RAA002A") is None  # Already waiting in the spill file
+        assert len(queue.spill) == 1
+        assert queue.get().plate_id == "RAA001A"
+        assert [r.plate_id for r in queue.structure.get_all_records()] == ["RAA002A"]
+        assert queue.offer("Oil Change", "RAA002A") is None
+    finally:
+        queue.close()
+
+
+def test_refill_rejections_are_counted():
+    binary_tree = tree.BinaryTree(10)
+    queue = BoundedQueue(binary_tree, 1, SPILL)
+    try:
+        queue.offer("Oil Change", "RAA001A")
+        queue.offer("Oil Change", "RAA002A")
+        binary_tree.max_size = 0  # The tree now refuses the spilled task
+        queue.get()
+        assert len(queue) == 0 and len(queue.spill) == 0
+        assert queue.stats()["rejected"] == 1
+    finally:
+        queue.close()
+
+
+def test_bounded_from_env(monkeypatch):
+    monkeypatch.delenv("MAINTENANCE_CAPACITY", raising=False)
+    monkeypatch.delenv("MAINTENANCE_OVERFLOW", raising=False)
+    assert bounded_from_env(tree.BinaryTree(10), 5).capacity == 5
+    monkeypatch.setenv("MAINTENANCE_CAPACITY", "3")
+    monkeypatch.setenv("MAINTENANCE_OVERFLOW", DROP_OLDEST)
+    queue = bounded_from_env(singly.SinglyLinkedList(), 5)
+    assert (queue.capacity, queue.policy) == (3, DROP_OLDEST)
+
+
+def test_burst_benchmark_holds_capacity(capsys):
+    results = burst_benchmark(singly.SinglyLinkedList, capacity=50, burst=500, service_time=0)
+    assert all(result["peak_size"] <= 50 for result in results.values())
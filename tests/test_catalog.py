@@ -0,0 +1,72 @@
+import pytest
+
+from catalog import PROMPT, TaskCounts, load_catalog, update_task_options
+
+
+def test_counts_add_discard_and_subtract():
+    counts = TaskCounts()
+    counts.add("Oil Change")
+    counts.add("Oil Change")
+    counts.update({"Battery Check": 3})
+    counts.subtract({"Battery Check": 1, "Oil Change": 1})
+    counts.discard("Oil Change")
+    assert counts["Oil Change"] == 0
+    assert counts["Battery Check"] == 2
+    assert counts.total == 2
+    assert counts.items() == [("Battery Check", 2)]
+
+
+def test_discarding_a_task_that_is_not_pending_is_a_clear_error():
+    counts = TaskCounts()
+    with pytest.raises(ValueError, match="Alignment Check"):
+        counts.discard("Alignment Check")
+    counts.add("Alignment Check")
+    counts.discard("Alignment Check")
+    with pytest.raises(ValueError):
+        counts.discard("Alignment Check")
+    assert counts.total == 0
+
+
+def test_backlog_minutes_from_counts():
+    counts = TaskCounts()
+    counts.update({"Oil Change": 2, "Battery Check": 1})
+    assert load_catalog().backlog_minutes(counts) == 2 * 30 + 15
+
+
+class FakeDropdown:
+    def __init__(self):
+        self.configured = 0
+        self.values = None
+
+    def config(self, values):
+        self.configured += 1
+        self.values = values
+
+
+class FakeVar:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def test_task_options_refresh_only_on_change_and_keep_the_selection():
+    catalog, counts = load_catalog(), TaskCounts()
+    dropdown, selected = FakeDropdown(), FakeVar("Oil Change")
+    counts.add("Oil Change")
+    shown = update_task_options(catalog, dropdown, selected, counts, None)
+    assert shown == counts.version
+    assert dropdown.values[0] == PROMPT and "Oil Change (1 pending)" in dropdown.values
+    assert selected.get() == "Oil Change (1 pending)"
+    assert update_task_options(catalog, dropdown, selected, counts, shown) == shown
+    assert dropdown.configured == 1
+    counts.add("Oil Change")
+    update_task_options(catalog, dropdown, selected, counts, shown)
+    assert selected.get() == "Oil Change (2 pending)"
+    prompt = FakeVar(PROMPT)
+    update_task_options(catalog, dropdown, prompt, counts, None)
+    assert prompt.get() == PROMPT
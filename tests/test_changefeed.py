@@ -0,0 +1,70 @@
+import logging
+
+from archive import TaskArchive
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed
+from segmented import SegmentedQueue
+
+
+def test_polling_subscriber_sees_events_in_order():
+    feed = ChangeFeed()
+    subscription = feed.subscribe()
+    for i in range(5):
+        feed.publish(ADDED, "Oil Change", f"RAA00{i}A", i)
+    assert [event.seq for event in subscription.poll(3)] == [0, 1, 2]
+    assert [event.priority for event in subscription.poll()] == [3, 4]
+    assert subscription.poll() == []
+
+
+def test_slow_subscriber_skips_ahead_and_counts_the_gap():
+    feed = ChangeFeed(capacity=4)
+    subscription = feed.subscribe()
+    for i in range(10):
+        feed.publish(ADDED, "Oil Change", "RAA001A")
+    assert [event.seq for event in subscription.poll()] == [6, 7, 8, 9]
+    assert subscription.missed == 6
+
+
+def test_failing_callback_still_gets_the_rest_of_its_batch(caplog):
+    feed = ChangeFeed()
+    seen = []
+
+    def callback(events):
+        for event in events:
+            if event.plate_id == "BAD":
+                raise ValueError("bad plate")
+        seen.extend(event.seq for event in events)
+
+    subscription = feed.subscribe(callback)
+    for plate in ("RAA001A", "BAD", "RAA002A", "RAA003A"):
+        feed.publish(REMOVED, "Oil Change", plate)
+    with caplog.at_level(logging.ERROR, logger="changefeed"):
+        feed.flush()
+    assert seen == [0, 2, 3]
+    assert subscription.failed == 1
+    assert "dropped event 1" in caplog.text
+
+
+def test_archive_keeps_good_events_of_a_batch_with_a_bad_one(tmp_path):
+    feed = ChangeFeed()
+    archive = TaskArchive(str(tmp_path))
+    archive.follow(feed)
+    feed.publish(COMPLETED, "Oil Change", "RAA001A")
+    feed.publish(COMPLETED, "Oil Change", "not a plate")
+    feed.publish(COMPLETED, "Brake Inspection", "RAA002A")
+    feed.flush()
+    archive.flush()
+    assert sorted(row.plate_id for row in archive.query()) == ["RAA001A", "RAA002A"]
+    assert archive.subscription.failed == 1
+    archive.close()
+
+
+def test_segmented_queue_publishes_and_counts():
+    feed = ChangeFeed()
+    subscription = feed.subscribe()
+    with SegmentedQueue(segment_size=2, feed=feed) as queue:
+        for i in range(3):
+            queue.add_task("Oil Change", f"RAA00{i}A", i + 1)
+        queue.remove_task()
+        assert queue.counts["Oil Change"] == 2
+    assert [(event.kind, event.plate_id, event.priority) for event in subscription.poll()] == [
+        (ADDED, "RAA000A", 1), (ADDED, "RAA001A", 2), (ADDED, "RAA002A", 3), (REMOVED, "RAA000A", 1)]
@@ -0,0 +1,52 @@
+import importlib
+
+from dedup import PendingTaskSet
+
+BinaryTree = importlib.import_module("4").BinaryTree
+
+
+def test_insert_tells_full_from_duplicate():
+    tree = BinaryTree(2, dedup=PendingTaskSet())
+    assert tree.insert("Oil Change", "RAA123A") is True
+    assert tree.insert("Oil Change", "RAA123A") is None
+    assert tree.insert("Tire Rotation", "RAA123A") is True
+    assert tree.insert("Battery Check", "RAB456B") is False
+    assert tree.size == 2
+
+
+def test_removed_task_can_be_added_again():
+    tree = BinaryTree(5, dedup=PendingTaskSet())
+    tree.insert("Oil Change", "RAA123A")
+    assert tree.remove("Oil Change", "RAA123A")
+    assert tree.insert("Oil Change", "RAA123A") is True
+
+
+def test_bulk_import_records_pending_tasks():
+    for exact in (True, False):
+        pending = PendingTaskSet(bloom_capacity=1000)
+        keys = [("Oil Change", "RAA123A"), ("Oil Change", "RAA123A"), ("Brake Inspection", "RAB456B")]
+        assert list(pending.bulk_import(keys, exact=exact)) == [keys[0], keys[2]]
+        assert len(pending) == 2
+        assert not pending.add("Oil Change", "RAA123A")
+        pending.discard("Oil Change", "RAA123A")
+        assert ("Oil Change", "RAA123A") not in pending
+
+
+def test_approximate_import_keeps_tasks_out_of_the_exact_set():
+    pending = PendingTaskSet(bloom_capacity=10_000)
+    keys = [("Oil Change", f"RAA{i:03d}A") for i in range(1000)]
+    assert len(list(pending.bulk_import(keys, exact=False))) >= 990
+    assert not pending.pending
+    assert len(pending) == pending.approximate
+    assert pending.stats()["approximate"] == pending.approximate
+
+
+def test_discarded_task_can_be_imported_again():
+    pending = PendingTaskSet(bloom_capacity=1000)
+    key = ("Oil Change", "RAA123A")
+    assert list(pending.bulk_import([key], exact=False)) == [key]
+    assert list(pending.bulk_import([key], exact=False)) == []
+    pending.discard(*key)
+    assert key not in pending and len(pending) == 0
+    assert list(pending.bulk_import([key], exact=False)) == [key]
+    assert pending.bloom_rejected == 1
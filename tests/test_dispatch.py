@@ -0,0 +1,44 @@
+from dispatch import PartitionedDispatcher, SharedFifoDispatcher, WorkStealingDispatcher, benchmark, simulate
+from records import TaskRecord
+
+
+def test_shared_fifo_keeps_every_task_of_a_plate():
+    dispatcher = SharedFifoDispatcher(2)
+    records = [TaskRecord("Oil Change", "RAA001A"), TaskRecord("Brake Inspection", "RAA001A"),
+               TaskRecord("Oil Change", "RAB002A")]
+    for record in records:
+        dispatcher.submit(record, 0)
+    assert [dispatcher.next_task(1) for _ in range(4)] == records + [None]
+
+
+def test_work_stealing_takes_the_oldest_half_of_a_victim():
+    dispatcher = WorkStealingDispatcher(2, max_batch=4, seed=1)
+    records = [TaskRecord("Oil Change", f"RAA00{i}A") for i in range(4)]
+    for record in records:
+        dispatcher.submit(record, 0)
+    assert dispatcher.next_task(1) is records[0]
+    assert dispatcher.stolen == 2 and dispatcher.pending() == 3
+    assert dispatcher.next_task(1) is records[1]
+    assert dispatcher.next_task(0) is records[2]
+
+
+def test_a_bay_works_through_its_own_tasks_in_arrival_order():
+    dispatcher = WorkStealingDispatcher(2, seed=1)
+    records = [TaskRecord("Oil Change", f"RAA00{i}A") for i in range(3)]
+    for record in records:
+        dispatcher.submit(record, 0)
+    assert [dispatcher.next_task(0) for _ in range(4)] == records + [None]
+    assert dispatcher.steals == 0
+
+
+def test_every_dispatcher_finishes_every_task():
+    for dispatcher in (SharedFifoDispatcher(3), PartitionedDispatcher(3), WorkStealingDispatcher(3, seed=7)):
+        result = simulate(dispatcher, 3, 500, seed=7)
+        assert 0 < result["utilization"] <= 1
+        assert result["p50_h"] <= result["p99_h"] <= result["max_h"]
+
+
+def test_benchmark_reports_the_case_without_a_transfer_penalty(capsys):
+    benchmark(bays=2, tasks=200, transfer=10.0)
+    out = capsys.readouterr().out
+    assert "0 min transfer" in out and "10 min transfer" in out
@@ -0,0 +1,111 @@
+import importlib
+import random
+import time
+
+import pytest
+
+from archive import TaskArchive
+from capacity import BoundedQueue
+from changefeed import COMPLETED, REMOVED, ChangeFeed
+from dedup import PendingTaskSet
+from forecast import DAY, DUE, KEY, ServiceForecast, benchmark, enqueue_due_from_env
+from records import plate_from_code
+
+
+def _check_heap(forecast):
+    heap = forecast.heap
+    for i in range(1, len(heap)):
+        assert heap[(i - 1) >> 1][DUE] <= heap[i][DUE]
+    assert {entry[KEY]: i for i, entry in enumerate(heap)} == forecast.positions
+
+
+def test_heap_and_positions_survive_random_updates():
+    rng = random.Random(3)
+    forecast = ServiceForecast()
+    plates = [plate_from_code(code) for code in range(50)]
+    for _ in range(500):
+        plate = rng.choice(plates)
+        action = rng.random()
+        if action < 0.6:
+            forecast.record_service("Oil Change", plate, rng.uniform(0, 400 * DAY))
+        elif action < 0.8 and forecast.next_due("Oil Change", plate):
+            forecast.set_interval("Oil Change", plate, rng.uniform(1, 300) * DAY)
+        elif forecast.next_due("Oil Change", plate):
+            forecast.forget("Oil Change", plate)
+        _check_heap(forecast)
+
+
+def test_older_service_news_is_ignored():
+    forecast = ServiceForecast()
+    forecast.record_service("Oil Change", "RAA001A", 100 * DAY)
+    forecast.record_service("Oil Change", "RAA001A", 50 * DAY)
+    assert forecast.next_due("Oil Change", "RAA001A").due == 280 * DAY
+
+
+def test_due_within_matches_a_full_scan():
+    rng = random.Random(5)
+    forecast = ServiceForecast()
+    services = [("Oil Change", plate_from_code(code), rng.uniform(0, 180 * DAY)) for code in range(2000)]
+    forecast.bulk_load(services)
+    _check_heap(forecast)
+    now = 180 * DAY
+    due = forecast.due_within(7 * DAY, now)
+    expected = sorted((completed + 180 * DAY, plate) for _, plate, completed in services
+                      if completed + 180 * DAY <= now + 7 * DAY)
+    assert [(item.due, item.plate_id) for item in due] == expected
+
+
+def test_follow_counts_completed_tasks_as_serviced():
+    feed = ChangeFeed()
+    forecast = ServiceForecast()
+    forecast.follow(feed)
+    feed.publish(REMOVED, "Battery Check", "RAA002A")  # Cancelled, not serviced
+    feed.publish(COMPLETED, "Battery Check", "RAA001A")
+    feed.flush()
+    assert len(forecast) == 1
+    item = forecast.next_due("Battery Check", "RAA001A")
+    assert item.due == pytest.approx(item.last_completed + 365 * DAY)
+
+
+def test_enqueue_due_ranks_overdue_tasks_first_in_a_priority_list():
+    forecast = ServiceForecast()
+    forecast.record_service("Oil Change", "RAA001A", 0)
+    forecast.record_service("Oil Change", "RAA002A", -10 * DAY)
+    forecast.record_service("Oil Change", "RAA003A", 10 * DAY)
+    tasks = importlib.import_module("7").DoublyLinkedList(dedup=PendingTaskSet())
+    tasks.add_task("Oil Change", "RAA002A", 3)
+    assert forecast.enqueue_due(tasks, 5 * DAY, now=178 * DAY) == 1
+    assert [(r.plate_id, r.priority) for r in tasks.get_all_records()] == [("RAA001A", 2), ("RAA002A", 3)]
+
+
+def test_enqueue_due_into_a_binary_tree_and_a_full_bounded_queue():
+    forecast = ServiceForecast()
+    for code in range(3):
+        forecast.record_service("Oil Change", plate_from_code(code), 0)
+    tree = importlib.import_module("4").BinaryTree(10)
+    assert forecast.enqueue_due(tree, 0, now=200 * DAY) == 3
+    assert tree.size == 3
+    queue = BoundedQueue(importlib.import_module("3").SinglyLinkedList(), 2)
+    assert forecast.enqueue_due(queue, 0, now=200 * DAY) == 2
+    assert queue.rejected == 1
+
+
+def test_enqueue_due_from_env_reads_the_archive(tmp_path, monkeypatch):
+    archive = TaskArchive(str(tmp_path))
+    now = time.time()
+    archive.append("Oil Change", "RAA001A", completed_at=now - 175 * DAY)
+    archive.append("Oil Change", "RAA002A", completed_at=now - 1900 * DAY)  # Before the longest interval
+    archive.flush()
+    queue = BoundedQueue(importlib.import_module("3").SinglyLinkedList(), 10)
+    monkeypatch.delenv("MAINTENANCE_FORECAST_DAYS", raising=False)
+    assert enqueue_due_from_env(queue, archive) is None
+    monkeypatch.setenv("MAINTENANCE_FORECAST_DAYS", "7")
+    assert enqueue_due_from_env(queue, None) is None
+    assert len(enqueue_due_from_env(queue, archive)) == 1
+    assert [r.plate_id for r in queue.structure.get_all_records()] == ["RAA001A"]
+    archive.close()
+
+
+def test_benchmark_runs_with_few_plates(capsys):
+    benchmark(plates=50, types_per_plate=2, queries=2)
+    assert "(100 services)" in capsys.readouterr().out
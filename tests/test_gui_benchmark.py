@@ -0,0 +1,26 @@
+import json
+import subprocess
+
+import gui_benchmark
+
+
+def _fake_run(returncode, stdout="", stderr=""):
+    def run(command, **kwargs):
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+    return run
+
+
+def test_a_failing_app_fails_the_run(monkeypatch, capsys):
+    monkeypatch.setenv("DISPLAY", ":0")
+    monkeypatch.setattr(gui_benchmark.subprocess, "run", _fake_run(1, stderr="RuntimeError: 4.py raised"))
+    assert gui_benchmark.main(["--apps", "4"]) == 1
+    assert "4.py failed" in capsys.readouterr().err
+
+
+def test_results_are_reported(monkeypatch, capsys):
+    result = {"status": "ok", "seconds": 0.002, "p50_ms": 1.0, "p90_ms": 1.5, "p99_ms": 2.0, "max_ms": 3.0,
+              "rss_growth_kb": 10}
+    monkeypatch.setenv("DISPLAY", ":0")
+    monkeypatch.setattr(gui_benchmark.subprocess, "run", _fake_run(0, json.dumps({"3.py|add|100": result})))
+    assert gui_benchmark.main(["--apps", "3"]) == 0
+    assert "3.py" in capsys.readouterr().out
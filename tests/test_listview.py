@@ -0,0 +1,63 @@
+from listview import sync_listbox
+from records import TaskRecord
+
+
+class FakeListbox:
+    """The slice of the Tk Listbox API sync_listbox uses, recording each call"""
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    def delete(self, first, last):
+        self.calls.append(("delete", first, last))
+        del self.rows[first:last + 1]
+
+    def insert(self, index, *labels):
+        self.calls.append(("insert", index, len(labels)))
+        self.rows[index:index] = labels
+
+
+def _records(count):
+    return [TaskRecord("Oil Change", f"RAA00{i}A") for i in range(count)]
+
+
+def test_first_sync_inserts_every_row_after_the_header():
+    listbox, shown, records = FakeListbox(["header"]), [], _records(3)
+    sync_listbox(listbox, shown, records, first_row=1)
+    assert listbox.rows == ["header"] + [record.label() for record in records]
+    assert listbox.calls == [("insert", 1, 3)]
+    assert shown == records
+
+
+def test_front_removal_and_rear_add_touch_one_row_each():
+    records = _records(4)
+    listbox, shown = FakeListbox(), []
+    sync_listbox(listbox, shown, records)
+    listbox.calls.clear()
+    sync_listbox(listbox, shown, records[1:])
+    assert listbox.calls == [("delete", 0, 0)]
+    added = TaskRecord("Battery Check", "RAA009A")
+    sync_listbox(listbox, shown, records[1:] + [added])
+    assert listbox.calls[1:] == [("insert", 3, 1)]
+    assert listbox.rows == [record.label() for record in records[1:] + [added]]
+
+
+def test_middle_change_replaces_only_the_changed_rows():
+    records = _records(5)
+    listbox, shown = FakeListbox(), []
+    sync_listbox(listbox, shown, records)
+    listbox.calls.clear()
+    replacement = TaskRecord("Battery Check", "RAA002A")
+    updated = records[:2] + [replacement] + records[3:]
+    sync_listbox(listbox, shown, updated)
+    assert listbox.calls == [("delete", 2, 2), ("insert", 2, 1)]
+    assert listbox.rows == [record.label() for record in updated]
+
+
+def test_unchanged_records_make_no_calls():
+    records = _records(3)
+    listbox, shown = FakeListbox(), []
+    sync_listbox(listbox, shown, records)
+    listbox.calls.clear()
+    sync_listbox(listbox, shown, list(records))
+    assert listbox.calls == []
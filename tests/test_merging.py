@@ -0,0 +1,98 @@
+import importlib
+
+import pytest
+
+from changefeed import REMOVED, ChangeFeed
+from dedup import PendingTaskSet
+from merging import merge, split
+from nodepool import NodePool
+
+singly = importlib.import_module("3")
+doubly = importlib.import_module("5")
+priority = importlib.import_module("7")
+
+
+def _plates(queue):
+    return [record.plate_id for record in queue.get_all_records()]
+
+
+@pytest.mark.parametrize("cls", [singly.SinglyLinkedList, doubly.DoublyLinkedList])
+def test_merge_interleaves_fifo_queues_by_enqueue_order(cls):
+    first, second = cls(), cls()
+    for i in range(6):
+        (first if i % 2 else second).add_task("Oil Change", f"RAA00{i}A")
+    merged = merge(first, second)
+    assert _plates(merged) == [f"RAA00{i}A" for i in range(6)]
+    assert merged.size == 6 and merged.counts["Oil Change"] == 6
+    assert second.head is None and second.size == 0 and second.counts.total == 0
+
+
+def test_merge_orders_priority_lists_by_priority_then_age():
+    first, second = priority.DoublyLinkedList(), priority.DoublyLinkedList()
+    first.add_task("Oil Change", "RAA001A", 1)
+    second.add_task("Oil Change", "RAA002A", 1)
+    first.add_task("Oil Change", "RAA003A", 3)
+    second.add_task("Oil Change", "RAA004A", 2)
+    merged = merge(first, second)
+    assert _plates(merged) == ["RAA001A", "RAA002A", "RAA004A", "RAA003A"]
+    node = merged.tail
+    while node.prev:
+        node = node.prev
+    assert node is merged.head
+
+
+def test_merge_rejects_mixed_kinds():
+    with pytest.raises(TypeError):
+        merge(singly.SinglyLinkedList(), doubly.DoublyLinkedList())
+
+
+@pytest.mark.parametrize("cls", [singly.SinglyLinkedList, doubly.DoublyLinkedList])
+def test_merge_drops_tasks_already_pending_in_the_target(cls):
+    feed = ChangeFeed()
+    target = cls(dedup=PendingTaskSet())
+    source = cls(dedup=PendingTaskSet(), feed=feed)
+    subscription = feed.subscribe()
+    target.add_task("Oil Change", "RAA001A")
+    source.add_task("Oil Change", "RAA001A")
+    source.add_task("Oil Change", "RAA002A")
+    source.add_task("Oil Change", "RAA001A")  # Rejected by the source's own set
+    plain = cls()
+    plain.add_task("Oil Change", "RAA002A")
+    plain.add_task("Battery Check", "RAA002A")
+    subscription.poll()
+    merged = merge(target, source, plain)
+    assert sorted(_plates(merged)) == ["RAA001A", "RAA002A", "RAA002A"]
+    assert merged.size == 3
+    assert merged.counts["Oil Change"] == 2 and merged.counts["Battery Check"] == 1
+    assert len(merged.dedup) == 3 and merged.dedup.rejected == 2
+    assert [(e.kind, e.plate_id) for e in subscription.poll() if e.kind == REMOVED] == [
+        (REMOVED, "RAA001A"), (REMOVED, "RAA002A")]
+    assert merged.remove_task() is not None
+
+
+def test_split_moves_matching_tasks_and_keeps_order():
+    queue = doubly.DoublyLinkedList(dedup=PendingTaskSet())
+    for i in range(6):
+        queue.add_task("Oil Change", f"RA{'AB'[i % 2]}00{i}A")
+    taken = split(queue, lambda record: record.plate_id[2] == "B")
+    assert _plates(taken) == ["RAB001A", "RAB003A", "RAB005A"]
+    assert _plates(queue) == ["RAA000A", "RAA002A", "RAA004A"]
+    assert queue.size == taken.size == 3
+    assert ("Oil Change", "RAB001A") in taken.dedup and ("Oil Change", "RAB001A") not in queue.dedup
+    assert queue.tail.next is None and taken.head.prev is None
+
+
+@pytest.mark.parametrize("module, cls", [(singly, "SinglyLinkedList"), (doubly, "DoublyLinkedList")])
+def test_split_shares_the_node_pool(module, cls):
+    pool = NodePool(module.Node, 1)
+    queue = getattr(module, cls)(pool=pool)
+    for i in range(4):
+        queue.add_task("Oil Change", f"RAA00{i}A")
+    taken = split(queue, lambda record: record.plate_id in ("RAA001A", "RAA003A"))
+    assert taken.pool is pool
+    free = pool.stats()["free"]
+    taken.remove_task()
+    assert pool.stats()["free"] == free + 1
+    taken.add_task("Battery Check", "RAA009A")  # Reuses the released node
+    assert pool.stats()["free"] == free
+    assert _plates(taken) == ["RAA003A", "RAA009A"]
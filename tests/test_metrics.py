@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+import metrics as metrics_module
+from metrics import LatencyHistogram, Metrics, instrument
+
+
+def test_histogram_percentiles_stay_within_a_bucket():
+    histogram = LatencyHistogram()
+    for value in range(1, 10_001):
+        histogram.record(value)
+    assert histogram.count == 10_000 and histogram.min == 1 and histogram.max == 10_000
+    for pct in (50, 90, 99):
+        exact = 10_000 * pct / 100
+        assert exact * (1 - 1 / 16) <= histogram.percentile(pct) <= exact
+    assert histogram.percentile(100) <= histogram.max
+    assert LatencyHistogram().percentile(50) == 0
+
+
+def test_small_values_get_exact_buckets():
+    histogram = LatencyHistogram()
+    for value in (3, 3, 7):
+        histogram.record(value)
+    assert histogram.percentile(50) == 3 and histogram.percentile(100) == 7
+    assert histogram.summary()["mean_us"] == pytest.approx(13 / 3 / 1000)
+
+
+def test_instrument_returns_the_function_itself_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics_module, "metrics", Metrics(enabled=False))
+
+    def work():
+        return 42
+    assert instrument()(work) is work
+
+
+def test_instrument_times_calls_and_errors_when_enabled(monkeypatch):
+    registry = Metrics(enabled=True)
+    monkeypatch.setattr(metrics_module, "metrics", registry)
+
+    @instrument("queue.add")
+    def add(x):
+        if x < 0:
+            raise ValueError(x)
+        return x + 1
+
+    assert add(1) == 2
+    with pytest.raises(ValueError):
+        add(-1)
+    assert add.__name__ == "add"
+    assert registry.histograms["queue.add"].count == 2
+    assert registry.total_ops() == 2
+
+
+def test_stats_and_dumps_include_operations_and_gauges():
+    registry = Metrics(enabled=True)
+    registry.record("tree.insert", 1500)
+    registry.gauge("tree.size", lambda: 3)
+    registry.gauge("broken", lambda: 1 / 0)
+    snapshot = registry.stats()
+    assert snapshot["operations"]["tree.insert"]["count"] == 1
+    assert snapshot["gauges"]["tree.size"] == 3
+    assert snapshot["gauges"]["broken"].startswith("error:")
+    assert json.loads(registry.dump_json())["gauges"]["tree.size"] == 3
+    text = registry.dump_text()
+    assert "tree.insert" in text and "tree.size" in text
+    registry.reset()
+    assert registry.total_ops() == 0
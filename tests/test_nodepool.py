@@ -0,0 +1,56 @@
+import importlib
+
+import pytest
+
+from nodepool import NodePool, recycle
+from records import TaskRecord
+
+singly = importlib.import_module("3")
+doubly = importlib.import_module("5")
+
+
+@pytest.mark.parametrize("module, cls", [(singly, "SinglyLinkedList"), (doubly, "DoublyLinkedList")])
+@pytest.mark.parametrize("pooled", [False, True])
+def test_remove_task_returns_the_record_with_or_without_a_pool(module, cls, pooled):
+    pool = NodePool(module.Node, 2) if pooled else None
+    queue = getattr(module, cls)(pool=pool)
+    queue.add_task("Oil Change", "RAA001A")
+    queue.add_task("Brake Inspection", "RAA002A")
+    record = queue.remove_task()
+    assert isinstance(record, TaskRecord)
+    assert (record.task, record.plate_id) == ("Oil Change", "RAA001A")
+    queue.add_task("Battery Check", "RAA003A")  # Reuses the released node when pooled
+    assert (record.task, record.plate_id) == ("Oil Change", "RAA001A")
+    assert [r.plate_id for r in iter(queue.remove_task, None)] == ["RAA002A", "RAA003A"]
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_remove_node_returns_the_record_with_or_without_a_pool(pooled):
+    pool = NodePool(doubly.Node, 1) if pooled else None
+    queue = doubly.DoublyLinkedList(pool=pool)
+    for i in range(3):
+        queue.add_task("Oil Change", f"RAA00{i}A")
+    record = queue.remove_node(queue.head.next)
+    assert isinstance(record, TaskRecord) and record.plate_id == "RAA001A"
+    assert [r.plate_id for r in queue.get_all_records()] == ["RAA000A", "RAA002A"]
+
+
+def test_priority_list_removals_return_records():
+    queue = importlib.import_module("7").DoublyLinkedList()
+    for i in range(3):
+        queue.add_task("Oil Change", f"RAA00{i}A", i + 1)
+    record = queue.remove_node(queue.head.next)
+    assert isinstance(record, TaskRecord) and record.plate_id == "RAA001A"
+    record = queue.remove_task()
+    assert isinstance(record, TaskRecord) and record.plate_id == "RAA000A"
+
+
+def test_pool_grows_recycles_and_trims():
+    pool = NodePool(singly.Node, 2)
+    nodes = [pool.acquire(TaskRecord("Oil Change", f"RAA00{i}A")) for i in range(3)]
+    assert pool.stats() == {"allocated": 66, "free": 63, "in_use": 3}
+    record = recycle(nodes[0], pool)
+    assert record.plate_id == "RAA000A"
+    assert nodes[0].record is None and nodes[0].next is None
+    assert pool.trim(keep=10) == 54 and pool.stats()["free"] == 10
+    assert recycle(nodes[1]) is nodes[1].record  # Without a pool the node is left alone
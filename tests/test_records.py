@@ -0,0 +1,38 @@
+import pytest
+
+from records import PLATE_COUNT, TaskRecord, plate_code, plate_from_code, plate_series
+
+
+def test_plate_codes_round_trip_across_the_range():
+    assert plate_code("RAA000A") == 0
+    assert plate_code("RAG999Z") == PLATE_COUNT - 1
+    for plate in ("RAA000A", "RAB123C", "RAD789K", "RAG999Z"):
+        assert plate_from_code(plate_code(plate)) == plate
+    assert plate_series("RAD789K") == 3
+
+
+@pytest.mark.parametrize("plate", ["RAH000A", "RAA00A", "raa000a", "RAA000AA"])
+def test_invalid_plates_are_rejected(plate):
+    with pytest.raises(ValueError):
+        plate_code(plate)
+
+
+def test_records_get_unique_ids_and_are_immutable():
+    first, second = TaskRecord("Oil Change", "RAA001A"), TaskRecord("Oil Change", "RAA001A")
+    assert first.id != second.id
+    with pytest.raises(AttributeError):
+        first.priority = 3
+
+
+def test_label_depends_on_the_priority():
+    assert TaskRecord("Oil Change", "RAA001A").label() == "Oil Change - RAA001A"
+    record = TaskRecord("Oil Change", "RAA001A", 2, enqueued_at=10.0)
+    assert record.label() == "Oil Change - RAA001A (Priority: 2)"
+    assert record.label() is record.label()  # Formatted once
+    assert record.enqueued_at == 10.0
+
+
+def test_a_reserved_id_is_kept_when_the_record_is_rebuilt():
+    record_id = TaskRecord.reserve_id()
+    assert TaskRecord("Oil Change", "RAA001A", record_id=record_id).id == record_id
+    assert TaskRecord("Oil Change", "RAA001A").id > record_id
@@ -0,0 +1,164 @@
+import importlib
+import socket
+import threading
+import time
+
+from changefeed import ADDED, COMPLETED, REMOVED, ChangeFeed
+from replication import SYNC, Primary, Standby, new_structure, records_digest, structure_kind
+
+singly = importlib.import_module("3")
+
+
+def test_standby_skips_completed_events_but_counts_them():
+    standby = Standby(singly.SinglyLinkedList())
+    try:
+        for seq, (kind, plate) in enumerate([(ADDED, "RAA000A"), (ADDED, "RAA001A"), (REMOVED, "RAA000A"),
+                                             (COMPLETED, "RAA000A")]):
+            standby._apply(seq, kind, "Oil Change", plate, None, 0.0)
+        assert standby.applied == 4
+        assert [r.plate_id for r in standby.structure.get_all_records()] == ["RAA001A"]
+    finally:
+        standby.promote()
+
+
+class DroppingProxy:
+    """TCP relay between a primary and a standby whose live connections can be cut"""
+    def __init__(self, target):
+        self.target = target
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.address = self.listener.getsockname()
+        self.sockets = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            self.sockets += [client, upstream]
+            for source, sink in ((client, upstream), (upstream, client)):
+                threading.Thread(target=self._pump, args=(source, sink), daemon=True).start()
+
+    @staticmethod
+    def _pump(source, sink):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                sink.sendall(data)
+        except OSError:
+            pass
+        for connection in (source, sink):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def drop(self):
+        sockets, self.sockets = self.sockets, []
+        for connection in sockets:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+    def close(self):
+        self.listener.close()
+        self.drop()
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _caught_up(primary, standby):
+    primary.wait_for(primary.feed.seq, timeout=5)
+    with standby.lock:
+        return records_digest(standby.structure) == records_digest(primary.structure)
+
+
+def _fill(structure, plates):
+    for plate in plates:
+        structure.add_task("Oil Change", plate)
+
+
+def test_snapshot_then_log_catch_up():
+    structure = new_structure("3")
+    _fill(structure, ["RAA000A", "RAA001A"])  # Only reaches the standby through the snapshot
+    standby = Standby(new_structure("3"))
+    primary = Primary(structure, standby.address, SYNC, heartbeat=0.05, retry=0.05)
+    try:
+        _wait(lambda: primary.connected)
+        primary.add_task("Oil Change", "RAA002A")  # Sync: applied before it returns
+        assert standby.applied == structure.feed.seq
+        primary.remove_task()
+        structure.add_task("Battery Check", "RAA003A")  # Changed directly, shipped asynchronously
+        structure.remove_record(structure.get_all_records()[1])  # Not the head
+        assert _caught_up(primary, standby)
+        assert [r.plate_id for r in standby.structure.get_all_records()] == ["RAA001A", "RAA003A"]
+        assert primary.snapshots == 1
+    finally:
+        primary.close()
+        standby.promote()
+
+
+def test_reconnect_after_a_dropped_connection_resends_a_snapshot():
+    structure = new_structure("5")
+    standby = Standby(new_structure("5"))
+    proxy = DroppingProxy(standby.address)
+    primary = Primary(structure, proxy.address, heartbeat=0.05, retry=0.05)
+    try:
+        _fill(structure, ["RAA000A", "RAA001A"])
+        _wait(lambda: _caught_up(primary, standby))
+        proxy.drop()
+        _wait(lambda: not primary.connected or primary.snapshots == 2)
+        _fill(structure, ["RAA002A", "RAA003A"])  # Made while the link may be down
+        structure.remove_task()
+        _wait(lambda: primary.snapshots == 2 and primary.connected)
+        _wait(lambda: _caught_up(primary, standby))
+        assert [r.plate_id for r in standby.structure.get_all_records()] == ["RAA001A", "RAA002A", "RAA003A"]
+    finally:
+        primary.close()
+        proxy.close()
+        standby.promote()
+
+
+def test_promotion_hands_over_the_replicated_queue():
+    structure = new_structure("7")
+    promoted = []
+    standby = Standby(new_structure("7"), failover_timeout=0.3, on_promote=promoted.append)
+    primary = Primary(structure, standby.address, heartbeat=0.05, retry=0.05)
+    for i, priority in enumerate([3, 1, 2]):
+        structure.add_task("Oil Change", f"RAA00{i}A", priority)
+    _wait(lambda: _caught_up(primary, standby))
+    primary.close()  # The primary goes away; the standby promotes itself after the timeout
+    _wait(lambda: promoted)
+    assert promoted[0] is standby.structure
+    assert [r.priority for r in promoted[0].get_all_records()] == [1, 2, 3]  # Sorted on promotion
+    assert standby.promote() is promoted[0]
+
+
+def test_the_standby_takes_on_an_adaptive_primary():
+    from adaptive import AdaptiveQueue
+    structure = AdaptiveQueue(feed=ChangeFeed())
+    structure.add_task("Oil Change", "RAA000A", 2)
+    structure.add_task("Oil Change", "RAA001A", 1)
+    standby = Standby(new_structure("7"))
+    primary = Primary(structure, standby.address, heartbeat=0.05, retry=0.05)
+    try:
+        _wait(lambda: _caught_up(primary, standby))
+        assert structure_kind(standby.structure) == "adaptive"
+        structure.add_task("Battery Check", "RAA002A", 1)
+        structure.remove_record(structure.find("RAA000A")[0])
+        assert _caught_up(primary, standby)
+        assert [r.plate_id for r in standby.structure.get_all_records()] == ["RAA001A", "RAA002A"]
+    finally:
+        primary.close()
+        standby.promote()
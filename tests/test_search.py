@@ -0,0 +1,49 @@
+from records import TaskRecord
+from search import TaskSearchIndex
+
+
+def make_index(pairs):
+    index = TaskSearchIndex()
+    records = [TaskRecord(task, plate_id) for task, plate_id in pairs]
+    index.bulk_load(records)
+    return index, records
+
+
+def test_prefix_search_by_plate_and_task():
+    index, records = make_index([("Oil Change", "RAA123A"), ("Brake Inspection", "RAA124B"),
+                                 ("Oil Change", "RAB001C")])
+    total, rows = index.search("raa")
+    assert total == 2
+    assert rows == records[:2]
+    total, rows = index.search("oil")
+    assert total == 2
+    assert [record.plate_id for record in rows] == ["RAA123A", "RAB001C"]
+
+
+def test_narrowing_query_reuses_slices_and_sees_updates():
+    index, records = make_index([("Oil Change", "RAA123A"), ("Oil Change", "RAB001C")])
+    assert index.search("R")[0] == 2
+    assert index.search("RAB")[1] == [records[1]]
+    index.remove(records[1])
+    extra = TaskRecord("Tire Rotation", "RAB002D")
+    index.add(extra)
+    assert index.search("RAB") == (1, [extra])
+    assert len(index) == 2
+
+
+def test_record_matching_both_ways_counts_once():
+    index = TaskSearchIndex()
+    record = TaskRecord("Rad Check", "RAA123A")  # Both the plate and the task start with "ra"
+    other = TaskRecord("Rad Check", "RAB001C")
+    for item in (record, other):
+        index.add(item)
+    total, rows = index.search("ra")
+    assert total == 2
+    assert rows == [record, other]
+
+
+def test_limit_caps_rows_not_count():
+    index, _ = make_index([("Oil Change", f"RAA{i:03d}A") for i in range(50)])
+    total, rows = index.search("RAA", limit=10)
+    assert total == 50
+    assert len(rows) == 10
@@ -0,0 +1,54 @@
+from dedup import PendingTaskSet
+from records import plate_from_code
+from segmented import SegmentedQueue
+
+
+def test_fifo_order_across_spilled_segments():
+    plates = [plate_from_code(i) for i in range(50)]
+    with SegmentedQueue(segment_size=8, read_ahead=2) as queue:
+        for i, plate in enumerate(plates):
+            queue.add_task("Oil Change", plate, priority=i % 3 or None)
+        assert queue.stats()["spilled_segments"] > 0
+        assert [record.plate_id for record in queue.get_all_records()] == plates
+        removed = []
+        while True:
+            record = queue.remove_task()
+            if record is None:
+                break
+            removed.append(record)
+        assert [record.plate_id for record in removed] == plates
+        assert [record.priority for record in removed[:3]] == [None, 1, 2]
+        assert queue.size == 0
+        assert queue.stats()["segments_read"] == queue.stats()["segments_written"]
+
+
+def test_read_ahead_starts_below_the_threshold_too():
+    with SegmentedQueue(segment_size=4, read_ahead=2) as queue:
+        for i in range(3):
+            queue.add_task("Oil Change", plate_from_code(i))
+        queue.remove_task()  # The head takes the partial tail and drops to exactly read_ahead
+        for i in range(3, 11):
+            queue.add_task("Oil Change", plate_from_code(i))  # Two full segments spill behind it
+        assert queue.prefetch is None
+        queue.remove_task()  # One left in the head, below read_ahead
+        assert queue.prefetch is not None
+        assert [queue.remove_task().plate_id for _ in range(9)] == [plate_from_code(i) for i in range(2, 11)]
+
+
+def test_dedup_is_released_on_remove():
+    with SegmentedQueue(segment_size=4, dedup=PendingTaskSet()) as queue:
+        assert queue.add_task("Oil Change", "RAA123A")
+        assert not queue.add_task("Oil Change", "RAA123A")
+        queue.remove_task()
+        assert queue.add_task("Oil Change", "RAA123A")
+
+
+def test_records_keep_their_id_across_reads_and_removal():
+    with SegmentedQueue(segment_size=2, read_ahead=0) as queue:
+        for i in range(5):
+            queue.add_task("Oil Change", plate_from_code(i))
+        assert queue.stats()["spilled_segments"] > 0
+        ids = [record.id for record in queue.get_all_records()]
+        assert len(set(ids)) == 5
+        assert [record.id for record in queue.get_all_records()] == ids
+        assert [queue.remove_task().id for _ in range(5)] == ids
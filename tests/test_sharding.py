@@ -0,0 +1,55 @@
+import threading
+
+from records import PLATE_SERIES, plate_series
+from sharding import OP_ADD, SharedRing, ShardedQueue
+
+
+def test_ring_keeps_order_across_wraparound():
+    ring = SharedRing(capacity=8)
+    reader = SharedRing(capacity=8, name=ring.name)
+    try:
+        seen = []
+        for start in range(0, 40, 5):
+            ring.put_batch([(OP_ADD, 1, 0, start + i) for i in range(5)])
+            seen += [record[3] for record in reader.get_batch()]
+        assert seen == list(range(40))
+        assert reader.get_batch() == []
+    finally:
+        reader.close()
+        ring.close(unlink=True)
+
+
+def test_full_ring_waits_for_the_consumer():
+    ring = SharedRing(capacity=4)
+    reader = SharedRing(capacity=4, name=ring.name)
+    try:
+        writer = threading.Thread(target=ring.put_batch, args=([(OP_ADD, 2, -1, i) for i in range(50)],))
+        writer.start()
+        seen = []
+        while len(seen) < 50:
+            seen += [(record[2], record[3]) for record in reader.get_batch(3)]
+        writer.join(timeout=5)
+        assert seen == [(-1, i) for i in range(50)]
+    finally:
+        reader.close()
+        ring.close(unlink=True)
+
+
+def test_plates_route_by_series():
+    queue = ShardedQueue(workers=3)
+    for series in PLATE_SERIES:
+        plate = f"RA{series}123A"
+        assert queue.shard_for(plate) == plate_series(plate) % 3
+
+
+def test_sharded_queue_keeps_fifo_order_per_shard():
+    plates = [f"RA{series}{i:03d}A" for i in range(20) for series in "ABC"]
+    with ShardedQueue(workers=2, batch_size=7) as queue:
+        for plate in plates:
+            queue.add_task("Oil Change", plate)
+        assert sum(queue.sizes()) == len(plates)
+        for shard in range(2):
+            expected = [p for p in plates if queue.shard_for(p) == shard]
+            popped = [queue.remove_task(shard) for _ in range(len(expected) + 1)]
+            assert popped == [("Oil Change", p) for p in expected] + [None]
+        assert queue.sizes() == [0, 0]
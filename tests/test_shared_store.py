@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from shared_store import SharedTaskTable
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_reader(code, name):
+    """Run code in a fresh interpreter, with its own resource tracker, against the table called name"""
+    script = f"import sys; sys.path.insert(0, {HERE!r}); from shared_store import SharedTaskTable; name = {name!r}; {code}"
+    return subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60)
+
+
+def test_queue_order_and_free_slots():
+    table = SharedTaskTable(3)
+    try:
+        first = table.add_task("Oil Change", "RAA123A", 2)
+        table.add_task("Brake Inspection", "RAB456B", 1)
+        table.add_task("Battery Check", "RAC789C", 3)
+        assert table.add_task("Coolant Flush", "RAD000D") is None  # Full
+        assert table.remove(first) == ("Oil Change", "RAA123A", 2)
+        table.add_task("Coolant Flush", "RAD000D")
+        assert table.get_all_tasks() == ["Brake Inspection - RAB456B (Priority: 1)",
+                                         "Battery Check - RAC789C (Priority: 3)",
+                                         "Coolant Flush - RAD000D (Priority: 0)"]
+        assert table.count_by_task() == {"Brake Inspection": 1, "Battery Check": 1, "Coolant Flush": 1}
+    finally:
+        table.close()
+
+
+def test_reader_exit_leaves_the_table_alone():
+    table = SharedTaskTable(16)
+    table.add_task("Oil Change", "RAA123A")
+    try:
+        for _ in range(2):  # The second reader attaches after the first one has exited
+            result = run_reader("reader = SharedTaskTable.attach(name); print(len(reader)); reader.close()", table.name)
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.strip() == "1"
+            assert "leaked" not in result.stderr
+    finally:
+        table.close()
+
+
+def test_close_tolerates_a_segment_already_unlinked():
+    table = SharedTaskTable(4)
+    result = run_reader("from multiprocessing import shared_memory; shared_memory.SharedMemory(name=name).unlink()",
+                        table.name)
+    assert result.returncode == 0, result.stderr
+    table.close()
+
+
+def test_read_gives_up_when_every_scan_is_spoiled():
+    table = SharedTaskTable(4)
+    scans = []
+
+    def scan(head, count):
+        scans.append(head)
+        table.add_task("Oil Change", "RAA123A")  # A write lands during every scan
+        table.remove_task()
+        return []
+    try:
+        with pytest.raises(RuntimeError):
+            table.read(scan, retries=5)
+        assert len(scans) == 5
+    finally:
+        table.close()
+
+
+@pytest.mark.parametrize("task, plate_id, priority, error", [
+    ("Car Wash", "RAA123A", 0, KeyError),
+    ("Oil Change", "not a plate", 0, ValueError),
+    ("Oil Change", "RAA123A", 2**40, (OverflowError, ValueError, TypeError)),
+])
+def test_rejected_add_leaves_the_table_readable(task, plate_id, priority, error):
+    table = SharedTaskTable(2)
+    try:
+        table.add_task("Oil Change", "RAA001A")
+        with pytest.raises(error):
+            table.add_task(task, plate_id, priority)
+        assert table.seq % 2 == 0
+        assert table.get_all_tasks() == ["Oil Change - RAA001A (Priority: 0)"]
+        assert table.add_task("Battery Check", "RAA002A") is not None  # The slot did not leak
+        assert table.add_task("Battery Check", "RAA003A") is None
+    finally:
+        table.close()
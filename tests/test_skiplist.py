@@ -0,0 +1,125 @@
+import threading
+
+from changefeed import ADDED, REMOVED, ChangeFeed
+from dedup import PendingTaskSet
+from records import TaskRecord
+from skiplist import SkipListIndex
+
+
+def _keys(records):
+    return [(record.task, record.plate_id) for record in records]
+
+
+def make_index(**kwargs):
+    index = SkipListIndex(seed=3, **kwargs)
+    for plate in ("RAA003A", "RAA001A", "RAA002A"):
+        index.insert("Oil Change", plate)
+    index.insert("Battery Check", "RAA009A")
+    index.insert("Tire Rotation", "RAA001A")
+    return index
+
+
+def test_records_are_ordered_and_ranges_are_inclusive():
+    index = make_index()
+    assert _keys(index.get_all_records()) == [
+        ("Battery Check", "RAA009A"), ("Oil Change", "RAA001A"), ("Oil Change", "RAA002A"),
+        ("Oil Change", "RAA003A"), ("Tire Rotation", "RAA001A")]
+    assert _keys(index.range("Oil Change", "Oil Change"))[0] == ("Oil Change", "RAA001A")
+    assert index.count_range("Battery Check", "Oil Change") == 4
+    assert index.size == 5 and index.counts["Oil Change"] == 3
+
+
+def test_equal_task_and_plate_stay_in_arrival_order():
+    first, second = TaskRecord("Oil Change", "RAA001A"), TaskRecord("Oil Change", "RAA001A")
+    index = SkipListIndex(seed=1)
+    index.add_record(second)
+    index.add_record(first)
+    assert list(index) == [first, second]
+
+
+def test_remove_and_remove_record():
+    feed = ChangeFeed()
+    events = feed.subscribe()
+    index = make_index(dedup=PendingTaskSet(), feed=feed)
+    assert not index.insert("Oil Change", "RAA001A")  # Already pending
+    assert index.remove("Oil Change")  # The first Oil Change in plate order
+    assert not index.remove("Coolant Flush")
+    record = next(index.range("Tire Rotation", "Tire Rotation"))
+    assert index.remove_record(record)
+    assert not index.remove_record(record)
+    assert _keys(index) == [("Battery Check", "RAA009A"), ("Oil Change", "RAA002A"), ("Oil Change", "RAA003A")]
+    assert index.insert("Oil Change", "RAA001A")
+    assert [(e.kind, e.plate_id) for e in events.poll()][-3:] == [
+        (REMOVED, "RAA001A"), (REMOVED, "RAA001A"), (ADDED, "RAA001A")]
+
+
+def test_a_reader_keeps_its_snapshot_while_the_writer_changes_the_index():
+    index = make_index()
+    reader = iter(index)
+    assert next(reader).task == "Battery Check"
+    index.remove("Oil Change", "RAA002A")
+    index.insert("Oil Change", "RAA004A")
+    index.remove("Tire Rotation")
+    assert len(index.retired) == 2  # Still linked for the open reader
+    assert _keys(reader) == [("Oil Change", "RAA001A"), ("Oil Change", "RAA002A"),
+                             ("Oil Change", "RAA003A"), ("Tire Rotation", "RAA001A")]
+    assert _keys(index)[-1] == ("Oil Change", "RAA004A")  # A new reader sees the changes
+    index.insert("Battery Check", "RAA010A")  # The next write unlinks what no reader needs
+    assert len(index.retired) == 0
+
+
+def test_reclaim_stops_at_the_first_node_a_reader_still_needs():
+    index = make_index()
+    index.remove("Oil Change", "RAA001A")
+    reader = iter(index)
+    next(reader)
+    index.remove("Oil Change", "RAA002A")
+    index.remove("Oil Change", "RAA003A")
+    assert [node.key[1] for node in index.retired] == ["RAA002A", "RAA003A"]
+    assert _keys(reader) == [("Oil Change", "RAA002A"), ("Oil Change", "RAA003A"), ("Tire Rotation", "RAA001A")]
+    index.insert("Coolant Flush", "RAA001A")
+    assert not index.retired
+
+
+def test_concurrent_snapshot_readers_see_consistent_scans():
+    index = SkipListIndex(seed=5)
+    steady = [f"RAB{i:03d}A" for i in range(200)]
+    for plate in steady:
+        index.insert("Battery Check", plate)
+    for i in range(200):
+        index.insert("Oil Change", f"RAA{i:03d}A")
+    stop = threading.Event()
+    failures = []
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            plate = f"RAA{i % 200:03d}A"
+            index.remove("Oil Change", plate)
+            index.insert("Oil Change", plate)
+            i += 1
+
+    def reader():
+        for _ in range(50):
+            records = list(index)
+            keys = [(r.task, r.plate_id, r.id) for r in records]
+            if keys != sorted(keys) or len(set(keys)) != len(keys):
+                failures.append("unordered or repeated")
+            if [r.plate_id for r in records if r.task == "Battery Check"] != steady:
+                failures.append("steady range changed")
+            if not 199 <= sum(r.task == "Oil Change" for r in records) <= 200:
+                failures.append("snapshot mixed two versions")
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    write_thread = threading.Thread(target=writer)
+    write_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    write_thread.join()
+    assert failures == []
+    index.insert("Coolant Flush", "RAA001A")  # No readers left: every retired node goes
+    assert not index.retired
+    assert index.size == 401
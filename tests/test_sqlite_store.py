@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from changefeed import ADDED, REMOVED, ChangeFeed
+from dedup import PendingTaskSet
+from sqlite_store import SQLiteTaskStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, "tasks.db")
+
+
+def fill(store):
+    store.add_task("Oil Change", "RAA001A", 2)
+    store.add_task("Battery Check", "RAA002A")  # No priority: ranks as priority 1
+    store.add_task("Coolant Flush", "RAA003A", 1)
+    store.add_task("Brake Inspection", "RAA004A", 3)
+
+
+def test_priority_order_ranks_missing_priority_as_one(path):
+    store = SQLiteTaskStore(path, order="priority", batch_size=2)
+    fill(store)
+    assert [r.plate_id for r in store.get_all_records()] == ["RAA002A", "RAA003A", "RAA001A", "RAA004A"]
+    assert store.remove_task().plate_id == "RAA002A"
+    assert [r.plate_id for r in store.remove_tasks(10)] == ["RAA003A", "RAA001A", "RAA004A"]
+    assert store.remove_task() is None
+    store.close()
+
+
+def test_fifo_order_and_size_include_the_buffer(path):
+    store = SQLiteTaskStore(path, batch_size=3)
+    fill(store)
+    assert store.size == 4
+    assert len(store.buffer) == 1
+    assert [r.plate_id for r in store.remove_tasks(2)] == ["RAA001A", "RAA002A"]
+    assert store.size == 2
+    store.close()
+
+
+def test_counts_feed_and_dedup_follow_every_change(path):
+    feed = ChangeFeed()
+    events = feed.subscribe()
+    store = SQLiteTaskStore(path, dedup=PendingTaskSet(), feed=feed)
+    fill(store)
+    assert not store.add_task("Oil Change", "RAA001A", 2)
+    assert store.counts.total == 4
+    store.remove_task()
+    store.remove_tasks(2)
+    assert store.counts.items() == [("Brake Inspection", 1)]
+    assert [(e.kind, e.plate_id) for e in events.poll()] == [
+        (ADDED, "RAA001A"), (ADDED, "RAA002A"), (ADDED, "RAA003A"), (ADDED, "RAA004A"),
+        (REMOVED, "RAA001A"), (REMOVED, "RAA002A"), (REMOVED, "RAA003A")]
+    assert store.add_task("Oil Change", "RAA001A", 2)
+    store.close()
+
+
+def test_counts_survive_a_restart(path):
+    store = SQLiteTaskStore(path)
+    fill(store)
+    store.close()
+    store = SQLiteTaskStore(path)
+    assert store.counts.total == 4
+    assert store.counts["Oil Change"] == 1
+    store.remove_task()
+    assert store.counts["Oil Change"] == 0
+    store.close()
+
+
+def test_dedup_is_seeded_from_rows_kept_by_an_earlier_run(path):
+    store = SQLiteTaskStore(path)
+    fill(store)
+    store.close()
+    dedup = PendingTaskSet()
+    store = SQLiteTaskStore(path, dedup=dedup)
+    assert len(dedup) == 4
+    assert not store.add_task("Oil Change", "RAA001A", 2)
+    assert store.remove_task().plate_id == "RAA001A"
+    assert store.add_task("Oil Change", "RAA001A", 2)
+    store.close()
@@ -0,0 +1,113 @@
+import importlib
+
+tree_module = importlib.import_module("6")
+TaskTree, TreeNode = tree_module.TaskTree, tree_module.TreeNode
+
+
+def make_tree():
+    tree = TaskTree()
+    tree.set_root(TreeNode("Maintenance"))
+    tree.root.add_child(TreeNode("Oil Change"))  # Category node, as 6.py seeds it
+    tree.add_task("Oil Change", "Engine Oil Change")
+    tree.add_task("Maintenance", "Oil Change", "RAA123A")
+    tree.add_task("Maintenance", "Brake Inspection", "RAB456B")
+    return tree
+
+
+def test_iter_nodes_follows_the_listing_order():
+    tree = make_tree()
+    rows = [f"{'  ' * depth}{node}" for depth, node in tree.iter_nodes()]
+    assert rows == tree.get_all_tasks()
+
+
+def test_removing_a_job_leaves_its_category_alone():
+    tree = make_tree()
+    job = next(node for _, node in tree.iter_nodes() if node.task == "Oil Change" and node.plate_id == "RAA123A")
+    assert tree.remove_task(job) == 1
+    assert [node.task for _, node in tree.iter_nodes()] == [
+        "Maintenance", "Oil Change", "Engine Oil Change", "Brake Inspection"]
+    assert tree.count() == 4
+
+
+def test_root_cannot_be_removed():
+    tree = make_tree()
+    assert tree.remove_task(tree.root) == 0
+    assert tree.count() == 5
+
+
+def test_counts_cover_nodes_attached_directly():
+    tree = TaskTree()
+    tree.set_root(TreeNode("Maintenance"))
+    bay = TreeNode("Bay 1")
+    bay.add_child(TreeNode("Alignment Check", "RAA123A"))  # Built before it joins the tree
+    bay.add_child(TreeNode("Alignment Check", "RAB456B"))
+    tree.root.add_child(bay)
+    tree.root.add_child(TreeNode("Oil Change", "RAC789C"))
+    assert tree.counts["Alignment Check"] == 2
+    assert tree.counts.total == 3
+    assert tree.remove_task(bay) == 3
+    assert tree.counts["Alignment Check"] == 0
+    assert tree.counts.total == 1
+
+
+def test_move_keeps_counts_per_subtree():
+    tree = make_tree()
+    bay = TreeNode("Bay 1")
+    tree.root.add_child(bay)
+    job = next(node for _, node in tree.iter_nodes() if node.plate_id == "RAB456B")
+    version = tree.counts.version
+    assert tree.move_task(job, bay)
+    assert bay.job_counts()["Brake Inspection"] == 1
+    assert tree.counts["Brake Inspection"] == 1
+    assert tree.counts.total == 2
+    assert tree.counts.version > version
+
+
+def test_bulk_delete_publishes_every_removed_job():
+    from changefeed import REMOVED, ChangeFeed
+    feed = ChangeFeed()
+    tree = TaskTree(feed=feed)
+    tree.set_root(TreeNode("Maintenance"))
+    tree.add_task("Maintenance", "Bay 1")
+    for i in range(5):
+        tree.add_task("Bay 1", "Oil Change", f"RAA00{i}A")
+    seen = []
+    feed.subscribe(lambda events: seen.extend(e for e in events if e.kind == REMOVED))
+    tree.remove_task(tree.find_task(tree.root, "Bay 1"))
+    feed.flush()
+    assert sorted(event.plate_id for event in seen) == [f"RAA00{i}A" for i in range(5)]
+    assert tree.counts.total == 0
+
+
+def test_wide_tree_benchmark_runs():
+    import benchmark
+    timings = benchmark.wide_tree_benchmark(children=2000, operations=100)
+    assert "remove" in timings
+
+
+def _height(node):
+    return 1 + max((_height(child) for child in node.children), default=0)
+
+
+def test_depth_is_kept_up_to_date_through_adds_moves_and_removes():
+    import random
+    rng = random.Random(7)
+    tree = TaskTree()
+    tree.set_root(TreeNode("Maintenance"))
+    nodes = [tree.root]
+    for i in range(300):
+        action = rng.random()
+        if action < 0.6 or len(nodes) < 3:
+            node = TreeNode(f"Task {i}")
+            rng.choice(nodes).add_child(node)
+            nodes.append(node)
+        elif action < 0.8:
+            node = rng.choice(nodes[1:])
+            tree.move_task(node, rng.choice(nodes))  # Refused when the target is inside node
+        else:
+            node = rng.choice(nodes[1:])
+            tree.remove_task(node)
+            removed = {n for _, n in tree.iter_nodes(node)}
+            nodes = [n for n in nodes if n not in removed]
+        assert tree.depth() == _height(tree.root)
+    assert all(tree.depth(node) == _height(node) for node in nodes)